@@ -1,86 +1,189 @@
 import logging
 import os
-from google.adk.agents import Agent, SequentialAgent, ParallelAgent
-from tools.tools import get_purchase_history, check_refund_eligibility, process_refund, send_email_tool
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from google.adk.agents import Agent, SequentialAgent
+
+from tools.async_tools import (
+    find_customers,
+    get_purchase_history,
+    process_refund,
+    send_email_tool,
+)
 from tools.prompts import (
-    top_level_prompt,
-    purchase_history_subagent_prompt,
-    check_eligibility_subagent_prompt_parallel,
+    check_eligibility_subagent_prompt,
+    fast_path_intake_prompt,
     process_refund_subagent_prompt,
-    root_agent_prompt
+    purchase_history_subagent_prompt,
+    refund_outcome_prompt,
+    root_agent_prompt,
+    top_level_prompt,
+)
+from tools.tools import check_refund_eligibility
+
+from .callbacks import (
+    classify_reason_with_history_before_model,
+    prefetch_purchase_history_before_agent,
+    store_structured_result_after_tool,
 )
+from .compaction import compact_context_before_model
+from .dag import DagAgent, DagNode
+from .model_cache import model_response_cache
+from .profiles import agent_model_kwargs
+from .workflow import RefundWorkflowAgent, submit_refund_request
 
 logger = logging.getLogger(__name__)
 
-GEMINI_MODEL = os.getenv("MODEL")
+# Run lookup/eligibility/refund/email in code instead of one LLM call per step
+REFUND_FAST_PATH = os.getenv("REFUND_FAST_PATH", "true").strip().lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Look up purchase history in the background as soon as intake hears a name
+PURCHASE_HISTORY_PREFETCH = os.getenv(
+    "PURCHASE_HISTORY_PREFETCH", "true"
+).strip().lower() in ("1", "true", "yes")
+# Serve repeated sub-agent model requests from the response cache
+LLM_RESPONSE_CACHE = os.getenv("LLM_RESPONSE_CACHE", "true").strip().lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+def _model_callbacks(
+    before_model_callbacks: Sequence[Callable[..., Any]] = (), cache: bool = True
+) -> dict[str, Any]:
+    """
+    Callback kwargs that compact the context first, then run
+    `before_model_callbacks`, then (with `cache`, for agents whose replies
+    depend only on their prompt) serve repeats from the response cache.
+    """
+    before: list[Callable[..., Any]] = [
+        compact_context_before_model,
+        *before_model_callbacks,
+    ]
+    kwargs: dict[str, Any] = {"before_model_callback": before}
+    if cache and LLM_RESPONSE_CACHE:
+        before.append(model_response_cache.before_model)
+        kwargs["after_model_callback"] = model_response_cache.after_model
+    return kwargs
 
 
 email_agent = Agent(
-    model=GEMINI_MODEL,
     name="EmailSenderAgent",
+    **agent_model_kwargs("EmailSenderAgent"),
     description="Sends email using Gmail API",
     instruction="""
     You are an email assistant. Use the tool to send an email to the specified recipient.
     Make sure to include a subject and a message body. Confirm once the email is sent.If you don't have the receiepnt's email id, pls ask user to provide receiepnt's email id.
+    Pass the refund_id from the refund confirmation, if there is one, so the customer gets only one email per refund.
+
+    Purchase History: {purchase_history}
+    Refund Confirmation: {refund_confirmation_message}
     """,
     tools=[send_email_tool],
-    output_key="email_status"
+    output_key="email_status",
+    **_model_callbacks(cache=False),
 )
 
 
 purchase_verifier_agent = Agent(
-    model=GEMINI_MODEL,
     name="PurchaseVerifierAgent",
+    **agent_model_kwargs("PurchaseVerifierAgent"),
     description="Verifies customer purchase history using the internal database",
     instruction=purchase_history_subagent_prompt,
-    tools=[get_purchase_history],
-    output_key="purchase_history",
+    tools=[find_customers, get_purchase_history],
+    # Writes a typed PurchaseHistory to `purchase_history` and ends the turn
+    after_tool_callback=store_structured_result_after_tool,
+    **_model_callbacks(),
 )
 
 refund_eligibility_agent = Agent(
-    model=GEMINI_MODEL,
     name="RefundEligibilityAgent",
+    **agent_model_kwargs("RefundEligibilityAgent"),
     description="Determines refund eligibility based on policies",
-    instruction=check_eligibility_subagent_prompt_parallel,
+    instruction=check_eligibility_subagent_prompt,
     tools=[check_refund_eligibility],
-    output_key="is_refund_eligible",
-)
-
-verifier_agent = ParallelAgent(
-    name="VerifierAgent",
-    description="Checks purchase history and refund eligibility in parallel",
-    sub_agents=[purchase_verifier_agent, refund_eligibility_agent],
+    # Writes a typed EligibilityDecision to `is_refund_eligible` and ends the turn
+    after_tool_callback=store_structured_result_after_tool,
+    # Clear-cut reasons ("damaged", "never arrived") are classified without the model
+    **_model_callbacks([classify_reason_with_history_before_model]),
 )
 
 refund_processor_agent = Agent(
-    model=GEMINI_MODEL,
     name="RefundProcessorAgent",
+    **agent_model_kwargs("RefundProcessorAgent"),
     description="Processes refunds or provides rejection explanations",
     instruction=top_level_prompt
     + "Specifically, your subagent has this task: "
     + process_refund_subagent_prompt,
     tools=[process_refund],
-    output_key="refund_confirmation_message",
+    # Writes a typed RefundConfirmation to `refund_confirmation_message`
+    after_tool_callback=store_structured_result_after_tool,
+    **_model_callbacks(cache=False),
+)
+
+# Each step starts as soon as the state keys it reads exist, so eligibility
+# sees the real shipping method instead of assuming INSURED
+refund_dag_agent = DagAgent(
+    name="RefundDagProcessor",
+    description="Processes customer refunds, each step starting once its inputs are ready",
+    nodes=[
+        DagNode(purchase_verifier_agent, outputs=("purchase_history",)),
+        DagNode(
+            refund_eligibility_agent,
+            inputs=("purchase_history",),
+            outputs=("is_refund_eligible",),
+        ),
+        DagNode(
+            refund_processor_agent,
+            inputs=("purchase_history", "is_refund_eligible"),
+            outputs=("refund_confirmation_message",),
+        ),
+        DagNode(
+            email_agent, inputs=("purchase_history", "refund_confirmation_message")
+        ),
+    ],
+)
+
+refund_reply_agent = Agent(
+    name="RefundReplyAgent",
+    **agent_model_kwargs("RefundReplyAgent"),
+    description="Writes the customer-facing reply for a completed refund workflow",
+    instruction=refund_outcome_prompt,
+    include_contents="none",
+    **_model_callbacks(),
 )
 
-seq_agent = SequentialAgent(
-    name="SequentialRefundProcessor",
-    description="Processes customer refunds in a fixed sequential workflow",
+fast_refund_agent = SequentialAgent(
+    name="FastRefundProcessor",
+    description="Processes customer refunds in code, then replies to the customer",
     sub_agents=[
-        verifier_agent,
-        refund_processor_agent,
-        email_agent
+        RefundWorkflowAgent(
+            name="RefundWorkflowAgent",
+            description="Runs purchase lookup, eligibility, refund and email without the LLM",
+        ),
+        refund_reply_agent,
     ],
 )
 
 ####################
 root_agent = Agent(
-    model=GEMINI_MODEL,
     name="RefundMultiAgent",
+    **agent_model_kwargs("RefundMultiAgent"),
     description="Customer refund multi LLM agent for Crabby's Taffy company",
     instruction="""
     You are a multi agent system that coordinates sub-agents. Execute the following instructions in as few "turns" as you can, only prompting the user when needed. Coordinate the sub agents behind the scenes...
     """
-    + root_agent_prompt,
-    sub_agents=[seq_agent],
+    + root_agent_prompt
+    + (fast_path_intake_prompt if REFUND_FAST_PATH else ""),
+    tools=[submit_refund_request] if REFUND_FAST_PATH else [],
+    sub_agents=[fast_refund_agent if REFUND_FAST_PATH else refund_dag_agent],
+    before_agent_callback=prefetch_purchase_history_before_agent
+    if PURCHASE_HISTORY_PREFETCH
+    else None,
+    **_model_callbacks(cache=False),
 )
@@ -0,0 +1,171 @@
+"""
+Agent, model and tool callbacks that answer from local logic instead of
+calling the LLM, keep typed records in session state, or warm caches ahead of
+the tool calls that need them.
+"""
+
+import logging
+from typing import Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.tools import BaseTool, ToolContext
+from google.genai import types
+from pydantic import BaseModel
+
+from tools.async_tools import purchase_history_prefetcher
+from tools.reason_classifier import reason_classifier
+from tools.schemas import EligibilityDecision, PurchaseHistory, RefundConfirmation
+
+logger = logging.getLogger(__name__)
+
+
+def _order_args(purchase_history: Any) -> dict[str, Any] | None:
+    """
+    Eligibility tool arguments from a stored PurchaseHistory: its one shipping
+    method and the most recent order's amount, date and customer. None if the
+    history is absent or mixes shipping methods.
+    """
+    if not isinstance(purchase_history, dict):
+        return None
+    history = PurchaseHistory.model_validate(purchase_history)
+    shipping_method = history.shipping_method()
+    if shipping_method is None:
+        return None
+    latest = history.latest() or {}
+    return {
+        "shipping_method": shipping_method,
+        "amount": latest.get("total_amount") or 0.0,
+        "order_date": latest.get("date") or "",
+        "customer_name": latest.get("customer_name") or "",
+    }
+
+
+def _answer_locally(
+    callback_context: CallbackContext,
+    llm_request: LlmRequest,
+    order_args: dict[str, Any] | None,
+) -> LlmResponse | None:
+    """
+    Walk the customer's messages newest first and stop at the first one the
+    classifier is confident about, then answer with the same tool call the
+    prompt asks for, so the decision is recorded like a model-made one.
+    Returning None lets ambiguous text go to the model.
+    """
+    contents = llm_request.contents if order_args else []
+    for content in reversed(contents or []):
+        if content.role != "user":
+            continue
+        text = " ".join(part.text for part in content.parts or [] if part.text)
+        code, confidence = reason_classifier.classify(text)
+        if not reason_classifier.is_confident(confidence):
+            continue
+        reason_classifier.record(fast_path=True)
+        logger.info(
+            f"{callback_context.agent_name}: classified reason as {code} ({confidence:.2f}) "
+            f"locally, skipping model call; {reason_classifier.stats()}"
+        )
+        call = types.FunctionCall(
+            name="check_refund_eligibility",
+            args={"reason": code, **(order_args or {})},
+        )
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(function_call=call)])
+        )
+    reason_classifier.record(fast_path=False)
+    logger.info(
+        f"{callback_context.agent_name}: reason or shipping method ambiguous, falling back "
+        f"to the model; {reason_classifier.stats()}"
+    )
+    return None
+
+
+def classify_reason_before_model(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> LlmResponse | None:
+    """
+    Answer RefundEligibilityAgent locally when the refund reason is unambiguous.
+
+    For the parallel layout, where the prompt assumes INSURED shipping.
+    """
+    return _answer_locally(
+        callback_context, llm_request, {"shipping_method": "INSURED"}
+    )
+
+
+def classify_reason_with_history_before_model(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> LlmResponse | None:
+    """
+    Answer RefundEligibilityAgent locally from the reason and the real
+    shipping method, amount and date in `purchase_history`, when the reason
+    and shipping method are unambiguous.
+    """
+    order_args = _order_args(callback_context.state.get("purchase_history"))
+    return _answer_locally(callback_context, llm_request, order_args)
+
+
+def prefetch_purchase_history_before_agent(
+    callback_context: CallbackContext,
+) -> types.Content | None:
+    """
+    Start a background purchase history lookup for names or order IDs in the
+    new user message, so the cache is warm by the time the refund workflow
+    asks for it. Never blocks the turn or replaces the agent's reply.
+    """
+    user_content = callback_context.user_content
+    text = (
+        " ".join(part.text for part in (user_content.parts or []) if part.text)
+        if user_content
+        else ""
+    )
+    if purchase_history_prefetcher.schedule(text) is not None:
+        logger.info(
+            f"{callback_context.agent_name}: prefetch scheduled; {purchase_history_prefetcher.stats()}"
+        )
+    return None
+
+
+def _structured_result(
+    tool_name: str, args: dict[str, Any], response: Any
+) -> tuple[str, BaseModel] | None:
+    record: BaseModel
+    if tool_name == "get_purchase_history":
+        record = PurchaseHistory(
+            purchaser=args.get("purchaser", ""), orders=response or []
+        )
+        return "purchase_history", record
+    if tool_name == "check_refund_eligibility":
+        record = EligibilityDecision(
+            reason_code=str(args.get("reason", "")).strip().upper(),
+            shipping_method=str(args.get("shipping_method", "")).strip().upper(),
+            eligible=bool(response),
+        )
+        return "is_refund_eligible", record
+    if tool_name == "process_refund":
+        return "refund_confirmation_message", RefundConfirmation.model_validate(
+            response
+        )
+    return None
+
+
+def store_structured_result_after_tool(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext, tool_response: Any
+) -> dict[str, Any] | None:
+    """
+    Record lookup, eligibility and refund tool results as typed state.
+
+    `purchase_history` and `is_refund_eligible` are complete once their tool
+    returns, so the agent's turn ends there instead of paying for a model
+    call that would restate the result as prose. A refund is still
+    summarized, since that reply goes to the customer.
+    """
+    result = _structured_result(tool.name, args, tool_response)
+    if result is None:
+        return None
+    key, record = result
+    tool_context.state[key] = record.model_dump()
+    if key != "refund_confirmation_message":
+        tool_context.actions.skip_summarization = True
+    logger.info(f"{tool_context.agent_name}: stored {key} from {tool.name}")
+    return None
@@ -0,0 +1,179 @@
+"""
+Token-budgeted context compaction, as a before_model callback.
+
+Every model call is held to CONTEXT_TOKEN_BUDGET. Purchase history dumps in
+older tool results and in the instruction are cut down to the orders the
+conversation refers to (session state itself is left intact), and if the call
+is still over budget the oldest turns are replaced by a short extractive
+summary. The newest CONTEXT_KEEP_TURNS turns are always sent as is,
+so long chats cost roughly the same per call as short ones.
+"""
+
+import json
+import logging
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from tools.compaction import (
+    CONTEXT_KEEP_TURNS,
+    CONTEXT_TOKEN_BUDGET,
+    compaction_stats,
+    referenced_orders,
+    summarize_turns,
+    turns_to_drop,
+)
+from tools.records import estimate_tokens
+from tools.schemas import PurchaseHistory
+
+logger = logging.getLogger(__name__)
+
+
+def _part_tokens(part: types.Part) -> int:
+    if part.text:
+        return estimate_tokens(part.text)
+    if part.function_call is not None:
+        return estimate_tokens(json.dumps(part.function_call.args or {}, default=str))
+    if part.function_response is not None:
+        return estimate_tokens(
+            json.dumps(part.function_response.response or {}, default=str)
+        )
+    return 0
+
+
+def _content_tokens(content: types.Content) -> int:
+    return sum(_part_tokens(part) for part in content.parts or [])
+
+
+def _instruction_tokens(llm_request: LlmRequest) -> int:
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    return estimate_tokens(str(instruction)) if instruction else 0
+
+
+def _user_text(content: types.Content) -> str:
+    if content.role != "user":
+        return ""
+    return " ".join(part.text for part in content.parts or [] if part.text)
+
+
+def _split_turns(contents: list[types.Content]) -> list[list[types.Content]]:
+    """
+    Group contents into turns, each starting at a user text message, so tool
+    calls are never separated from their responses.
+    """
+    turns: list[list[types.Content]] = []
+    for content in contents:
+        if _user_text(content) or not turns:
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def _trim_history_part(part: types.Part, texts: list[str]) -> types.Part:
+    response = part.function_response
+    if response is None or response.name != "get_purchase_history":
+        return part
+    orders = (response.response or {}).get("result")
+    if not isinstance(orders, list):
+        return part
+    kept = referenced_orders(orders, texts)
+    if len(kept) == len(orders):
+        return part
+    trimmed = response.model_copy(update={"response": {"result": kept}})
+    return part.model_copy(update={"function_response": trimmed})
+
+
+def _trim_old_histories(turns: list[list[types.Content]], texts: list[str]) -> None:
+    for turn in turns[:-CONTEXT_KEEP_TURNS] if CONTEXT_KEEP_TURNS else turns:
+        for i, content in enumerate(turn):
+            parts = [_trim_history_part(part, texts) for part in content.parts or []]
+            if any(
+                new is not old
+                for new, old in zip(parts, content.parts or [], strict=True)
+            ):
+                turn[i] = content.model_copy(update={"parts": parts})
+
+
+def _messages(turns: list[list[types.Content]]) -> list[tuple[str, str]]:
+    return [
+        (
+            content.role or "user",
+            " ".join(part.text for part in content.parts or [] if part.text),
+        )
+        for turn in turns
+        for content in turn
+    ]
+
+
+def _trim_instruction_history(
+    callback_context: CallbackContext, llm_request: LlmRequest, texts: list[str]
+) -> None:
+    """
+    Show only the referenced orders of `purchase_history` in this call's
+    instruction once the customer has named an order or product. Session state
+    keeps the full record, so an order mentioned later is still there.
+    """
+    stored = callback_context.state.get("purchase_history")
+    config = llm_request.config
+    instruction = config.system_instruction if config else None
+    if (
+        config is None
+        or not isinstance(stored, dict)
+        or not isinstance(instruction, str)
+    ):
+        return
+    # ADK injects state values into instructions as str(value)
+    rendered = str(stored)
+    if rendered not in instruction:
+        return
+    orders = PurchaseHistory.model_validate(stored).orders
+    kept = referenced_orders(orders, texts, fallback=False)
+    if kept and len(kept) < len(orders):
+        trimmed = str({**stored, "orders": kept})
+        config.system_instruction = instruction.replace(rendered, trimmed)
+
+
+def compact_context_before_model(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> LlmResponse | None:
+    """
+    Fit the request into CONTEXT_TOKEN_BUDGET and log tokens before and after.
+
+    Never answers the request itself; always returns None.
+    """
+    contents = list(llm_request.contents or [])
+    before = _instruction_tokens(llm_request) + sum(
+        _content_tokens(content) for content in contents
+    )
+    texts = [text for text in (_user_text(content) for content in contents) if text]
+
+    _trim_instruction_history(callback_context, llm_request, texts)
+    fixed = _instruction_tokens(llm_request)
+    turns = _split_turns(contents)
+    _trim_old_histories(turns, texts)
+    dropped = turns_to_drop(
+        [sum(_content_tokens(content) for content in turn) for turn in turns],
+        fixed,
+        CONTEXT_TOKEN_BUDGET,
+        CONTEXT_KEEP_TURNS,
+    )
+    compacted: list[types.Content] = []
+    if dropped:
+        summary = summarize_turns(_messages(turns[:dropped]))
+        if summary:
+            compacted.append(
+                types.Content(role="user", parts=[types.Part(text=summary)])
+            )
+    for turn in turns[dropped:]:
+        compacted.extend(turn)
+    llm_request.contents = compacted
+
+    after = fixed + sum(_content_tokens(content) for content in compacted)
+    compaction_stats.record(before, after)
+    if after < before:
+        logger.info(
+            f"{callback_context.agent_name}: compacted context from ~{before} to ~{after} tokens "
+            f"({dropped} turn(s) summarized); {compaction_stats.stats()}"
+        )
+    return None
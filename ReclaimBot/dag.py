@@ -0,0 +1,165 @@
+"""
+Dependency-driven scheduling of sub-agents by the state keys they read and write.
+
+Each DagNode names the session state keys its agent needs (`inputs`) and the
+keys it produces (`outputs`, defaulting to an LlmAgent's output_key). DagAgent
+starts every node as soon as all of its inputs exist, so independent nodes
+overlap and dependent ones always see their upstream results. Any BaseAgent
+can be a node, including code-only agents that call tools directly.
+"""
+
+import asyncio
+import logging
+from collections.abc import AsyncGenerator
+from typing import Any, NamedTuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from pydantic import Field, model_validator
+
+logger = logging.getLogger(__name__)
+
+
+class DagNode(NamedTuple):
+    agent: BaseAgent
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] | None = None
+
+    def produces(self) -> tuple[str, ...]:
+        if self.outputs is not None:
+            return self.outputs
+        output_key = getattr(self.agent, "output_key", None)
+        return (output_key,) if output_key else ()
+
+
+# Queue item: (node name, event or None once the node finished, error, ack)
+_QueueItem = tuple[str, Event | None, BaseException | None, asyncio.Event | None]
+
+
+class DagAgent(BaseAgent):
+    """
+    Runs `nodes` in dependency order with maximal overlap.
+
+    Inputs that some node produces must be produced again in this run, so
+    values left in the session by an earlier turn never trigger a node early;
+    inputs no node produces are read from the existing session state. Every
+    node runs in its own branch, like ParallelAgent sub-agents, and events
+    from concurrent nodes are merged through one queue. A node waits for the
+    runner to process each of its events before continuing, so its state
+    deltas are committed by the time it finishes. Nodes whose inputs never
+    appear (e.g. an upstream agent produced nothing) are skipped and logged.
+    """
+
+    nodes: list[DagNode] = Field(default_factory=list)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _sub_agents_from_nodes(cls, data: Any) -> Any:
+        if isinstance(data, dict) and "sub_agents" not in data:
+            data["sub_agents"] = [node[0] for node in data.get("nodes", [])]
+        return data
+
+    @model_validator(mode="after")
+    def _check_graph(self) -> "DagAgent":
+        producers: dict[str, str] = {}
+        for node in self.nodes:
+            for key in node.produces():
+                if key in producers:
+                    raise ValueError(
+                        f"State key `{key}` is produced by both `{producers[key]}` "
+                        f"and `{node.agent.name}`"
+                    )
+                producers[key] = node.agent.name
+        # Kahn's algorithm over produced keys; anything left over is a cycle
+        available: set[str] = set()
+        remaining = list(self.nodes)
+        while remaining:
+            ready = [
+                node
+                for node in remaining
+                if all(key in available or key not in producers for key in node.inputs)
+            ]
+            if not ready:
+                names = ", ".join(n.agent.name for n in remaining)
+                raise ValueError(f"Dependency cycle between nodes: {names}")
+            for node in ready:
+                available.update(node.produces())
+                remaining.remove(node)
+        return self
+
+    def _node_context(self, node: DagNode, ctx: InvocationContext) -> InvocationContext:
+        node_ctx = ctx.model_copy()
+        suffix = f"{self.name}.{node.agent.name}"
+        node_ctx.branch = f"{ctx.branch}.{suffix}" if ctx.branch else suffix
+        return node_ctx
+
+    async def _run_node(
+        self, node: DagNode, ctx: InvocationContext, queue: "asyncio.Queue[_QueueItem]"
+    ) -> None:
+        name = node.agent.name
+        try:
+            async for event in node.agent.run_async(self._node_context(node, ctx)):
+                processed = asyncio.Event()
+                await queue.put((name, event, None, processed))
+                await processed.wait()
+        except Exception as e:
+            await queue.put((name, None, e, None))
+            return
+        await queue.put((name, None, None, None))
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        produced_by_dag = {key for node in self.nodes for key in node.produces()}
+        produced: set[str] = set()
+        pending = {node.agent.name: node for node in self.nodes}
+        running: dict[str, asyncio.Task] = {}
+        queue: asyncio.Queue[_QueueItem] = asyncio.Queue()
+
+        def ready(node: DagNode) -> bool:
+            return all(
+                key in produced if key in produced_by_dag else key in ctx.session.state
+                for key in node.inputs
+            )
+
+        def start_ready_nodes() -> None:
+            for name, node in list(pending.items()):
+                if ready(node):
+                    del pending[name]
+                    logger.info(f"{self.name}: starting {name}")
+                    running[name] = asyncio.create_task(
+                        self._run_node(node, ctx, queue)
+                    )
+
+        nodes = {node.agent.name: node for node in self.nodes}
+        start_ready_nodes()
+        try:
+            while running:
+                name, event, error, processed = await queue.get()
+                if error is not None:
+                    raise error
+                if event is not None:
+                    produced.update(
+                        key
+                        for key in event.actions.state_delta
+                        if key in nodes[name].produces()
+                    )
+                    yield event
+                    if processed is not None:
+                        processed.set()
+                    # The runner has applied the event, so dependents can start now
+                    start_ready_nodes()
+                    continue
+                # Node finished and all of its events have been yielded
+                del running[name]
+                outputs = [key for key in nodes[name].produces() if key in produced]
+                logger.info(f"{self.name}: {name} done, produced {outputs}")
+                start_ready_nodes()
+        finally:
+            for task in running.values():
+                task.cancel()
+        if pending:
+            logger.warning(
+                f"{self.name}: skipped {sorted(pending)}, inputs never produced"
+            )
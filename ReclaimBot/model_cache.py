@@ -0,0 +1,175 @@
+"""
+Model-call cache for sub-agents, as a before_model/after_model callback pair.
+
+Requests are keyed by model, system instruction, declared tools and the
+conversation contents. Each response is stored under an exact key and a
+normalized key (case, whitespace and edge punctuation folded), so a repeated
+request is served exactly and a re-phrased one like "DAMAGED!!" vs "damaged"
+still skips the Gemini round trip. Caching is opt-in per agent: add the
+callbacks only to agents whose replies depend on nothing but their prompt.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from tools.response_cache import (
+    ResponseCache,
+    cache_key,
+    get_response_cache,
+    normalize_text,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _part_fingerprint(part: types.Part, normalize: bool) -> Any:
+    if part.text is not None:
+        return normalize_text(part.text) if normalize else part.text
+    if part.function_call is not None:
+        return ["call", part.function_call.name, part.function_call.args]
+    if part.function_response is not None:
+        return ["result", part.function_response.name, part.function_response.response]
+    # Inline data and other part kinds are keyed by their full serialized form
+    return part.model_dump(mode="json", exclude_none=True)
+
+
+def _request_fingerprint(llm_request: LlmRequest, normalize: bool) -> list[Any]:
+    config = llm_request.config
+    system_instruction = config.system_instruction if config else None
+    if not isinstance(system_instruction, str):
+        system_instruction = str(system_instruction or "")
+    tools = sorted(
+        declaration.name
+        for tool in (config.tools or [] if config else [])
+        for declaration in (getattr(tool, "function_declarations", None) or [])
+    )
+    contents = [
+        [
+            content.role,
+            [_part_fingerprint(part, normalize) for part in content.parts or []],
+        ]
+        for content in llm_request.contents or []
+    ]
+    return [
+        llm_request.model,
+        normalize_text(system_instruction) if normalize else system_instruction,
+        tools,
+        contents,
+    ]
+
+
+class ModelResponseCache:
+    """
+    Serves repeated model requests from a ResponseCache.
+
+    Use `before_model` as (or after) an agent's before_model_callback and
+    `after_model` as its after_model_callback. Only complete, error-free
+    responses are stored. Keys of a miss wait for its response for at most
+    `pending_ttl` seconds, so calls that raise before `after_model` runs do
+    not accumulate.
+    """
+
+    def __init__(self, cache: ResponseCache | None = None, pending_ttl: float = 300.0):
+        self._cache = cache
+        self.pending_ttl = pending_ttl
+        # (invocation_id, agent_name) -> (started_at, exact, normalized), oldest first
+        self._pending: OrderedDict[tuple[str, str], tuple[float, str, str]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self) -> ResponseCache:
+        return self._cache if self._cache is not None else get_response_cache()
+
+    def keys(self, llm_request: LlmRequest) -> tuple[str, str]:
+        """
+        The (exact, normalized) cache keys for a request.
+        """
+        return (
+            cache_key("exact", _request_fingerprint(llm_request, normalize=False)),
+            cache_key("normalized", _request_fingerprint(llm_request, normalize=True)),
+        )
+
+    def before_model(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        exact, normalized = self.keys(llm_request)
+        cached = self.cache.get(exact)
+        kind = "exact"
+        if cached is None:
+            cached = self.cache.get(normalized)
+            kind = "normalized"
+        if cached is not None:
+            with self._lock:
+                if kind == "exact":
+                    self.exact_hits += 1
+                else:
+                    self.normalized_hits += 1
+            logger.info(
+                f"{callback_context.agent_name}: {kind} model cache hit; {self.stats()}"
+            )
+            return LlmResponse.model_validate_json(cached)
+
+        now = time.monotonic()
+        pending_key = (callback_context.invocation_id, callback_context.agent_name)
+        with self._lock:
+            self.misses += 1
+            # Drop misses whose model call never reached after_model
+            while self._pending:
+                oldest = next(iter(self._pending))
+                if now - self._pending[oldest][0] < self.pending_ttl:
+                    break
+                del self._pending[oldest]
+            self._pending[pending_key] = (now, exact, normalized)
+            self._pending.move_to_end(pending_key)
+        return None
+
+    def after_model(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> LlmResponse | None:
+        if llm_response.partial:
+            # Streaming chunk; wait for the aggregated final response
+            return None
+        with self._lock:
+            pending = self._pending.pop(
+                (callback_context.invocation_id, callback_context.agent_name), None
+            )
+        if pending is None or llm_response.error_code or not llm_response.content:
+            return None
+        _, *keys = pending
+
+        stored = llm_response.model_copy(deep=True)
+        for part in (stored.content.parts if stored.content else None) or []:
+            # ADK assigns function call IDs per event; a replayed ID would collide
+            if part.function_call is not None:
+                part.function_call.id = None
+        value = stored.model_dump_json(exclude_none=True)
+        for key in keys:
+            self.cache.set(key, value)
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hits = self.exact_hits + self.normalized_hits
+            lookups = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "normalized_hits": self.normalized_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else None,
+                "cache": self.cache.stats(),
+            }
+
+
+model_response_cache = ModelResponseCache()
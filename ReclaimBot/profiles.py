@@ -0,0 +1,98 @@
+"""
+Per-agent model tiers from tools/model_profiles.json.
+
+`agent_model_kwargs(name)` gives an Agent its profile's model, generation
+config and thinking budget, so classification-style steps can run on a
+cheaper, faster tier than the customer-facing ones. Compare the tiers with:
+
+    python -m ReclaimBot.profiles --benchmark 10
+"""
+
+import argparse
+import json
+import time
+from typing import Any
+
+from google import genai
+from google.adk.planners import BuiltInPlanner
+from google.genai import types
+
+from tools.model_profiles import ModelProfile, get_model_profiles, summarize_runs
+from tools.prompts import root_agent_prompt
+
+
+def generate_content_config(profile: ModelProfile) -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        max_output_tokens=profile.max_output_tokens,
+        temperature=profile.temperature,
+    )
+
+
+def thinking_config(profile: ModelProfile) -> types.ThinkingConfig | None:
+    if profile.thinking_budget is None:
+        return None
+    return types.ThinkingConfig(thinking_budget=profile.thinking_budget)
+
+
+def agent_model_kwargs(agent_name: str) -> dict[str, Any]:
+    """
+    Agent kwargs (model, generate_content_config, planner) for `agent_name`.
+
+    ADK only accepts a thinking config through the agent's planner, so a
+    thinking budget is passed as a BuiltInPlanner.
+    """
+    profile = get_model_profiles().for_agent(agent_name)
+    kwargs: dict[str, Any] = {
+        "model": profile.model,
+        "generate_content_config": generate_content_config(profile),
+    }
+    thinking = thinking_config(profile)
+    if thinking is not None:
+        kwargs["planner"] = BuiltInPlanner(thinking_config=thinking)
+    return kwargs
+
+
+def benchmark(calls: int, prompt: str) -> list[dict[str, Any]]:
+    """
+    Send the same intake turn `calls` times through every profile and report
+    latency and token cost per profile.
+    """
+    client = genai.Client()
+    results = []
+    for profile in get_model_profiles().profiles.values():
+        if profile.model is None:
+            # No model set in the profile and no MODEL fallback
+            continue
+        config = generate_content_config(profile)
+        config.system_instruction = root_agent_prompt
+        config.thinking_config = thinking_config(profile)
+        runs = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            response = client.models.generate_content(
+                model=profile.model, contents=prompt, config=config
+            )
+            usage = response.usage_metadata
+            runs.append(
+                {
+                    "latency_s": time.perf_counter() - started,
+                    "input_tokens": (usage and usage.prompt_token_count) or 0,
+                    "output_tokens": (usage and usage.candidates_token_count) or 0,
+                    "thinking_tokens": (usage and usage.thoughts_token_count) or 0,
+                }
+            )
+        results.append(summarize_runs(profile, runs))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark latency and token cost per model profile."
+    )
+    parser.add_argument("--benchmark", type=int, default=5, metavar="CALLS")
+    parser.add_argument(
+        "--prompt", default="Hi, my name is David and my package arrived damaged."
+    )
+    args = parser.parse_args()
+    for result in benchmark(args.benchmark, args.prompt):
+        print(json.dumps(result))
@@ -0,0 +1,176 @@
+"""
+Deterministic refund workflow that runs the tools directly, without the LLM.
+
+The root agent only does intake: it records the customer's name and refund
+reason with `submit_refund_request`, then hands over to the fast refund
+processor. RefundWorkflowAgent runs lookup -> eligibility -> refund -> email
+from that structured state, and a single LLM call turns the outcome into the
+customer-facing reply.
+"""
+
+import logging
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.tools import ToolContext
+
+from tools import async_tools
+from tools.reason_classifier import reason_classifier
+from tools.schemas import EligibilityDecision, PurchaseHistory
+from tools.tools import ORDER_ID_PATTERN, check_refund_eligibility
+
+logger = logging.getLogger(__name__)
+
+
+REFUND_REQUEST_KEY = "refund_request"
+REFUND_OUTCOME_KEY = "refund_outcome"
+
+
+def submit_refund_request(
+    customer_name: str, reason: str, tool_context: ToolContext, order_id: str = ""
+) -> str:
+    """
+    Record the customer's refund request so the refund workflow can run.
+
+    Args:
+        customer_name: The customer's first name
+        reason: Refund reason code (DAMAGED, LOST, LATE or OTHER) or the customer's own words
+        order_id: Order ID if the customer gave one, otherwise empty
+
+    Returns:
+        Confirmation that the request was recorded
+    """
+    code, _ = reason_classifier.classify(reason)
+    tool_context.state[REFUND_REQUEST_KEY] = {
+        "customer_name": customer_name.strip(),
+        "reason": code,
+        "order_id": order_id.strip().upper(),
+    }
+    logger.info(f"Refund request recorded for {customer_name}: {reason} -> {code}")
+    return "Refund request recorded."
+
+
+def _belongs_to(order: dict[str, Any], customer_name: str) -> bool:
+    """
+    Whether `customer_name` is the order's customer: their full name or one
+    of its words, e.g. the first name intake records.
+    """
+    name = customer_name.strip().lower()
+    owner = str(order.get("customer_name") or "").strip().lower()
+    return bool(name) and (name == owner or name in owner.split())
+
+
+class RefundWorkflowAgent(BaseAgent):
+    """
+    Runs the refund tools in code from the `refund_request` state entry.
+
+    Each step is emitted as its own event carrying a state delta under the
+    same keys and record types the LLM sub-agents use (purchase_history,
+    is_refund_eligible, refund_confirmation_message, email_status), plus a
+    `refund_outcome` summary for the reply agent.
+    """
+
+    def _event(self, ctx: InvocationContext, delta: dict[str, Any]) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=delta),
+        )
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        request = ctx.session.state.get(REFUND_REQUEST_KEY) or {}
+        customer_name = request.get("customer_name", "")
+        reason = request.get("reason", "")
+        requested_order = request.get("order_id", "")
+        outcome: dict[str, Any] = {"customer_name": customer_name, "reason": reason}
+
+        lookup_key = (
+            requested_order
+            if ORDER_ID_PATTERN.search(requested_order)
+            else customer_name
+        )
+        found = await async_tools.get_purchase_history(lookup_key) if lookup_key else []
+        if requested_order:
+            found = [order for order in found if order["order_id"] == requested_order]
+        # Only refund orders of the customer who asked, whatever the lookup matched
+        orders = [order for order in found if _belongs_to(order, customer_name)]
+        history = PurchaseHistory(purchaser=lookup_key, orders=orders)
+        yield self._event(ctx, {"purchase_history": history.model_dump()})
+        if found and not customer_name:
+            outcome["status"] = "AMBIGUOUS_CUSTOMER"
+            yield self._event(ctx, {REFUND_OUTCOME_KEY: outcome})
+            return
+        if not orders:
+            if found:
+                logger.warning(f"{lookup_key!r} is not an order of {customer_name!r}")
+            outcome["status"] = "NO_PURCHASE_FOUND"
+            yield self._event(ctx, {REFUND_OUTCOME_KEY: outcome})
+            return
+
+        # A first name can match several customers; never refund a stranger's order
+        customers = sorted({order["customer_name"] for order in orders})
+        if len(customers) > 1:
+            outcome["status"] = "AMBIGUOUS_CUSTOMER"
+            logger.warning(
+                f"{lookup_key!r} matches {len(customers)} customers, asking for more detail"
+            )
+            yield self._event(ctx, {REFUND_OUTCOME_KEY: outcome})
+            return
+
+        # Histories are most recent first; without an order ID, refund the latest
+        order = orders[0]
+        outcome.update(
+            order_id=order["order_id"],
+            amount=order["total_amount"],
+            shipping_method=order["shipping_method"],
+        )
+        shipping_method = (order["shipping_method"] or "").strip().upper()
+        eligible = check_refund_eligibility(
+            reason,
+            shipping_method,
+            order["total_amount"] or 0.0,
+            order.get("date") or "",
+            order["customer_name"],
+        )
+        decision = EligibilityDecision(
+            reason_code=reason, shipping_method=shipping_method, eligible=eligible
+        )
+        yield self._event(ctx, {"is_refund_eligible": decision.model_dump()})
+        if not eligible:
+            outcome["status"] = "NOT_ELIGIBLE"
+            yield self._event(ctx, {REFUND_OUTCOME_KEY: outcome})
+            return
+
+        if order["total_amount"] is None:
+            outcome["status"] = "MISSING_AMOUNT"
+            yield self._event(ctx, {REFUND_OUTCOME_KEY: outcome})
+            return
+
+        confirmation = await async_tools.process_refund(
+            order["total_amount"], order["order_id"], order["customer_name"]
+        )
+        outcome["status"] = confirmation["status"]
+        outcome["confirmation"] = confirmation["message"]
+        yield self._event(ctx, {"refund_confirmation_message": confirmation})
+        if confirmation["status"] != "REFUNDED":
+            yield self._event(ctx, {REFUND_OUTCOME_KEY: outcome})
+            return
+
+        email_status = "No email address on file"
+        if order.get("customer_email_id"):
+            email_status = await async_tools.send_email_tool(
+                order["customer_email_id"],
+                f"Your Click Kart refund for order {order['order_id']}",
+                confirmation["message"],
+                confirmation["refund_id"] or "",
+            )
+        outcome["email_status"] = email_status
+        yield self._event(
+            ctx, {"email_status": email_status, REFUND_OUTCOME_KEY: outcome}
+        )
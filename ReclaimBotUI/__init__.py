@@ -1,5 +1,3 @@
-import os
-
 from . import agent
 
 __all__ = ["agent"]
@@ -1,29 +1,46 @@
 """
 4 - Parallel Sub-Agent with Sequential parent-workflow
 """
+
+import asyncio
 import logging
 import os
 import sys
-import re  # <-- added
-from google.adk.agents import Agent, SequentialAgent, ParallelAgent
-import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from typing import Any
+
 import gradio as gr
-from google.adk import Agent as _ADKAgent  # avoid shadowing
+from google.adk.agents import Agent, ParallelAgent, SequentialAgent
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.runners import InMemoryRunner
-from google.adk.sessions import Session
 from google.genai import types
-from dotenv import load_dotenv
+
 # import google.cloud.logging
 # from callback_logging import log_query_to_model, log_model_response
 sys.path.append(".")
-from tools.tools import get_purchase_history, check_refund_eligibility, process_refund, send_email_tool
+from ReclaimBot.callbacks import (
+    classify_reason_before_model,
+    store_structured_result_after_tool,
+)
+from ReclaimBot.compaction import compact_context_before_model
+from ReclaimBot.profiles import agent_model_kwargs
+
+# Async variants, so store/ledger/outbox I/O never blocks the shared event loop
+from tools.async_tools import (
+    find_customers,
+    get_purchase_history,
+    process_refund,
+    send_email_tool,
+)
 from tools.prompts import (
-    top_level_prompt,
-    purchase_history_subagent_prompt,
     check_eligibility_subagent_prompt_parallel,
     process_refund_subagent_prompt,
-    root_agent_prompt
+    purchase_history_subagent_prompt,
+    root_agent_prompt,
+    top_level_prompt,
 )
+from tools.tools import check_refund_eligibility
 
 # Environment setup
 os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "True"
@@ -35,33 +52,37 @@ logger = logging.getLogger(__name__)
 GEMINI_MODEL = os.getenv("MODEL")
 
 email_agent = Agent(
-    model=GEMINI_MODEL,
     name="EmailSenderAgent",
+    **agent_model_kwargs("EmailSenderAgent"),
     description="Sends email using Gmail API",
-    instruction=""" 
-    You are an email assistant. Use the tool to send an email to the specified recipient. 
-    Make sure to include a subject and a message body. Confirm once the email is sent.If you don't have the receiepnt's email id, pls ask user to provide receiepnt's email id. 
+    instruction="""
+    You are an email assistant. Use the tool to send an email to the specified recipient.
+    Make sure to include a subject and a message body. Confirm once the email is sent.If you don't have the receiepnt's email id, pls ask user to provide receiepnt's email id.
     """,
     tools=[send_email_tool],
-    output_key="email_status"
+    output_key="email_status",
+    before_model_callback=compact_context_before_model,
 )
 
 purchase_verifier_agent = Agent(
-    model=GEMINI_MODEL,
     name="PurchaseVerifierAgent",
+    **agent_model_kwargs("PurchaseVerifierAgent"),
     description="Verifies customer purchase history using the internal database",
     instruction=purchase_history_subagent_prompt,
-    tools=[get_purchase_history],
-    output_key="purchase_history",
+    tools=[find_customers, get_purchase_history],
+    after_tool_callback=store_structured_result_after_tool,
+    before_model_callback=compact_context_before_model,
 )
 
 refund_eligibility_agent = Agent(
-    model=GEMINI_MODEL,
     name="RefundEligibilityAgent",
+    **agent_model_kwargs("RefundEligibilityAgent"),
     description="Determines refund eligibility based on policies",
     instruction=check_eligibility_subagent_prompt_parallel,
     tools=[check_refund_eligibility],
-    output_key="is_refund_eligible",
+    after_tool_callback=store_structured_result_after_tool,
+    # Clear-cut reasons ("damaged", "never arrived") are classified without the model
+    before_model_callback=[compact_context_before_model, classify_reason_before_model],
 )
 
 verifier_agent = ParallelAgent(
@@ -71,58 +92,117 @@ verifier_agent = ParallelAgent(
 )
 
 refund_processor_agent = Agent(
-    model=GEMINI_MODEL,
     name="RefundProcessorAgent",
+    **agent_model_kwargs("RefundProcessorAgent"),
     description="Processes refunds or provides rejection explanations",
     instruction=top_level_prompt
     + "Specifically, your subagent has this task: "
     + process_refund_subagent_prompt,
     tools=[process_refund],
-    output_key="refund_confirmation_message",
+    after_tool_callback=store_structured_result_after_tool,
+    before_model_callback=compact_context_before_model,
 )
 
 seq_agent = SequentialAgent(
     name="SequentialRefundProcessor",
     description="Processes customer refunds in a fixed sequential workflow",
-    sub_agents=[
-        verifier_agent,
-        refund_processor_agent,
-        email_agent
-    ],
+    sub_agents=[verifier_agent, refund_processor_agent, email_agent],
 )
 
 ####################
 root_agent = Agent(
-    model=GEMINI_MODEL,
     name="RefundMultiAgent",
+    **agent_model_kwargs("RefundMultiAgent"),
     description="Customer refund multi LLM agent for Crabby's Taffy company",
     instruction="""
     You are a multi agent system that coordinates sub-agents. Execute the following instructions in as few "turns" as you can, only prompting the user when needed. Coordinate the sub agents behind the scenes...
     """
     + root_agent_prompt,
     sub_agents=[seq_agent],
+    # The shared session keeps every turn; hold each call to a token budget
+    before_model_callback=compact_context_before_model,
 )
 
 ###############################################
 app_name = "my_agent_app"
-user_id = "user1"
+# Chat requests the Gradio queue runs at once, all on the server's event loop
+UI_CONCURRENCY_LIMIT = int(os.getenv("UI_CONCURRENCY_LIMIT", "16"))
 
-# Create runner and session globally
+# One runner shared by every browser; each Gradio client gets its own ADK
+# session, keyed by its session hash, so tabs never see each other's turns
 runner = InMemoryRunner(agent=root_agent, app_name=app_name)
-session = asyncio.run(runner.session_service.create_session(app_name=app_name, user_id=user_id))
+client_sessions: dict[str, str] = {}
+client_sessions_lock = asyncio.Lock()
+
+
+async def get_session_id(client_id: str) -> str:
+    session_id = client_sessions.get(client_id)
+    if session_id is not None:
+        return session_id
+    async with client_sessions_lock:
+        if client_id not in client_sessions:
+            session = await runner.session_service.create_session(
+                app_name=app_name, user_id=client_id
+            )
+            client_sessions[client_id] = session.id
+            logger.info(
+                f"Created session for client {client_id} ({len(client_sessions)} active)"
+            )
+        return client_sessions[client_id]
+
 
-# Async function to run agent
-async def run_agent_query(user_input: str) -> str:
+async def end_session(client_id: str) -> None:
+    session_id = client_sessions.pop(client_id, None)
+    if session_id is not None:
+        await runner.session_service.delete_session(
+            app_name=app_name, user_id=client_id, session_id=session_id
+        )
+
+
+# Progress shown while each stage of the refund workflow is running
+STAGE_LABELS = {
+    "PurchaseVerifierAgent": "Verifying purchase…",
+    "RefundEligibilityAgent": "Checking eligibility…",
+    "RefundProcessorAgent": "Processing refund…",
+    "EmailSenderAgent": "Sending confirmation email…",
+}
+
+# Model output arrives as SSE chunks instead of one response per agent turn
+stream_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
+
+# Async generator that runs the agent, yielding (stage, text so far) as events arrive
+async def stream_agent_query(
+    user_input: str, client_id: str
+) -> AsyncIterator[tuple[str | None, str]]:
     content = types.Content(role="user", parts=[types.Part.from_text(text=user_input)])
-    response_text = ""
-    async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=content):
-        if event.content.parts and event.content.parts[0].text:
-            response_text += event.content.parts[0].text + "\n"
-    return response_text.strip()
+    session_id = await get_session_id(client_id)
+    done: list[str] = []
+    partial: dict[str, str] = {}
+    stage = None
+    async for event in runner.run_async(
+        user_id=client_id,
+        session_id=session_id,
+        new_message=content,
+        run_config=stream_config,
+    ):
+        stage = STAGE_LABELS.get(event.author, stage)
+        text = "".join(
+            part.text
+            for part in (event.content.parts if event.content else None) or []
+            if part.text and not part.thought
+        )
+        if not text:
+            yield stage, "\n".join(done + list(partial.values())).strip()
+            continue
+        if event.partial:
+            partial[event.author] = partial.get(event.author, "") + text
+        else:
+            # The final event repeats the whole message the chunks built up
+            partial.pop(event.author, None)
+            done.append(text)
+        yield stage, "\n".join(done + list(partial.values())).strip()
 
-# Wrapper for Gradio to run async code
-def gradio_agent_interface(user_input):
-    return asyncio.run(run_agent_query(user_input))
 
 # =========================
 # Build Gradio UI (LIGHT THEME)
@@ -135,60 +215,72 @@ theme = gr.themes.Default(
     neutral_hue="gray",
 )
 
-# --- NEW: sanitize assistant text coming back from the agent (UI-only) ---
-def sanitize_response(text: str) -> str:
-    """
-    Remove a leading boolean echo like: true / false / "true" / 'false' (optional colon/dash),
-    followed by whitespace/newline, without touching the rest of the content.
-    """
-    if not isinstance(text, str):
-        return text
-    # Case 1: boolean + newline(s)
-    text = re.sub(
-        r'^\s*["\']?(?:true|false)["\']?\s*[:\-]*\s*(?:\r?\n)+',
-        '',
-        text,
-        flags=re.IGNORECASE
-    )
-    # Case 2 (fallback): boolean + space on same line
-    text = re.sub(
-        r'^\s*["\']?(?:true|false)["\']?\s*[:\-]*\s+',
-        '',
-        text,
-        flags=re.IGNORECASE
-    )
-    return text
+
+def client_id(request: gr.Request) -> str:
+    # API calls have no session hash; give each one its own throwaway session
+    return request.session_hash or f"api-{uuid.uuid4().hex}"
+
 
 # Core chat function (UI-only; does not touch your agent code)
-def chat(user_message, messages):
+async def chat(
+    user_message: str, messages: list[dict[str, str]] | None, request: gr.Request
+) -> AsyncIterator[tuple[list[dict[str, str]], Any, Any]]:
     # messages is a list[dict] with keys {"role","content"} because Chatbot uses type='messages'
     if not user_message or not user_message.strip():
-        return messages, gr.update(value="")
-    response = asyncio.run(run_agent_query(user_message))
-    response = sanitize_response(response)  # <-- strip leading boolean echo
-    new_messages = (messages or []) + [
-        {"role": "user", "content": user_message},
-        {"role": "assistant", "content": response},
-    ]
-    return new_messages, gr.update(value="")
-
-def clear_chat():
+        yield messages or [], gr.update(value=""), gr.update()
+        return
+    history = [*(messages or []), {"role": "user", "content": user_message}]
+    yield (
+        [*history, {"role": "assistant", "content": ""}],
+        gr.update(value=""),
+        gr.update(),
+    )
+    client = client_id(request)
+    try:
+        async for stage, response in stream_agent_query(user_message, client):
+            yield (
+                [*history, {"role": "assistant", "content": response}],
+                gr.update(),
+                gr.update(value=loader_html(stage)),
+            )
+    finally:
+        if request.session_hash is None:
+            # Nothing can address a throwaway session again, so drop it now
+            await end_session(client)
+
+
+async def clear_chat(request: gr.Request) -> tuple[list[Any], list[Any]]:
+    # Start the next message in a fresh session
+    await end_session(client_id(request))
     return [], []
 
-def show_working():
+
+async def close_client(request: gr.Request) -> None:
+    await end_session(client_id(request))
+
+
+def loader_html(stage: str | None = None) -> str:
+    return f"<div class='loader'>{stage or 'Thinking…'}</div>"
+
+
+def show_working() -> tuple[Any, Any]:
     # Show loading spinner and disable the Send button
     return (
-        gr.update(visible=True),  # loading
-        gr.update(interactive=False)  # send button
+        gr.update(value=loader_html(), visible=True),  # loading
+        gr.update(interactive=False),  # send button
     )
 
-def hide_working():
+
+def hide_working() -> tuple[Any, Any]:
     return (
         gr.update(visible=False),  # loading
-        gr.update(interactive=True)  # send button
+        gr.update(interactive=True),  # send button
     )
 
-with gr.Blocks(theme=theme, css="""
+
+with gr.Blocks(
+    theme=theme,
+    css="""
 /* ---------- Light App Surface ---------- */
 .gradio-container {
   background: #f5f7fb; /* light neutral */
@@ -240,7 +332,8 @@ textarea, input, .gr-textbox {
   border-radius: 12px;
   padding: 12px;
 }
-""") as demo:
+""",
+) as demo:
     # Create state INSIDE Blocks (prevents KeyError)
     chat_state = gr.State([])  # list of {"role","content"} dictionaries
 
@@ -260,13 +353,12 @@ textarea, input, .gr-textbox {
     with gr.Row():
         # ----- Left: Chat area -----
         with gr.Column(scale=7, min_width=640):
-
             # Conversation box
             chatbot = gr.Chatbot(
                 label="Conversation",
-                height=375,               # was 500; now 375
+                height=375,  # was 500; now 375
                 show_copy_button=True,
-                type="messages",          # [{"role": "...", "content": "..."}]
+                type="messages",  # [{"role": "...", "content": "..."}]
             )
 
             # Input row BELOW the conversation box
@@ -274,7 +366,7 @@ textarea, input, .gr-textbox {
                 user_input = gr.Textbox(
                     label="Your message",
                     placeholder="Ask about refunds, purchases, or eligibility… (Press Enter to send)",
-                    lines=1,               # single-line so Enter submits
+                    lines=1,  # single-line so Enter submits
                     scale=5,
                     autofocus=True,
                 )
@@ -283,12 +375,10 @@ textarea, input, .gr-textbox {
             # Keep clear + loader below the input row
             with gr.Row():
                 clear_btn = gr.Button("Clear", variant="secondary", scale=1)
-                loading = gr.HTML("<div class='loader'>Thinking…</div>", visible=False)
+                loading = gr.HTML(loader_html(), visible=False)
 
             gr.Examples(
-                examples=[
-                    "Sample : My name is David and My Package was Damaged"
-                ],
+                examples=["Sample : My name is David and My Package was Damaged"],
                 inputs=[user_input],
                 label="Example Prompt for Refund Request",
             )
@@ -322,57 +412,38 @@ textarea, input, .gr-textbox {
     # ----- Events -----
     # Show spinner (disable button) → run chat → sync state → hide spinner
     send_btn.click(
-        fn=show_working,
-        inputs=[],
-        outputs=[loading, send_btn],
-        queue=False
+        fn=show_working, inputs=[], outputs=[loading, send_btn], queue=False
     ).then(
         fn=chat,
         inputs=[user_input, chat_state],
-        outputs=[chatbot, user_input],
-        queue=True
+        outputs=[chatbot, user_input, loading],
+        queue=True,
     ).then(
         fn=lambda hist: hist,  # keep state in sync with what's rendered
         inputs=[chatbot],
         outputs=[chat_state],
-        queue=False
-    ).then(
-        fn=hide_working,
-        inputs=[],
-        outputs=[loading, send_btn],
-        queue=False
-    )
+        queue=False,
+    ).then(fn=hide_working, inputs=[], outputs=[loading, send_btn], queue=False)
 
     # Enter to submit (works because lines=1 and we bind the submit event)
     user_input.submit(
-        fn=show_working,
-        inputs=[],
-        outputs=[loading, send_btn],
-        queue=False
+        fn=show_working, inputs=[], outputs=[loading, send_btn], queue=False
     ).then(
         fn=chat,
         inputs=[user_input, chat_state],
-        outputs=[chatbot, user_input],
-        queue=True
+        outputs=[chatbot, user_input, loading],
+        queue=True,
     ).then(
-        fn=lambda hist: hist,
-        inputs=[chatbot],
-        outputs=[chat_state],
-        queue=False
-    ).then(
-        fn=hide_working,
-        inputs=[],
-        outputs=[loading, send_btn],
-        queue=False
-    )
+        fn=lambda hist: hist, inputs=[chatbot], outputs=[chat_state], queue=False
+    ).then(fn=hide_working, inputs=[], outputs=[loading, send_btn], queue=False)
 
     clear_btn.click(
-        fn=clear_chat,
-        inputs=[],
-        outputs=[chatbot, chat_state],
-        queue=False
+        fn=clear_chat, inputs=[], outputs=[chatbot, chat_state], queue=False
     )
 
+    # Drop the client's session when its tab closes
+    demo.unload(close_client)
+
     # Footer
     gr.HTML("""
     <div style="opacity:0.6; font-size:12px; text-align:center; margin-top:8px;">
@@ -380,4 +451,5 @@ textarea, input, .gr-textbox {
     </div>
     """)
 
+demo.queue(default_concurrency_limit=UI_CONCURRENCY_LIMIT)
 demo.launch()
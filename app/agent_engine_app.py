@@ -84,12 +84,16 @@ def deploy_agent_engine_app(
     location: str,
     agent_name: str | None = None,
     requirements_file: str = ".requirements.txt",
-    extra_packages: list[str] = ["./app"],
-    env_vars: dict[str, str] = {},
+    extra_packages: list[str] | None = None,
+    env_vars: dict[str, str] | None = None,
     service_account: str | None = None,
 ) -> agent_engines.AgentEngine:
     """Deploy the agent engine app to Vertex AI."""
 
+    if env_vars is None:
+        env_vars = {}
+    if extra_packages is None:
+        extra_packages = ["./app"]
     staging_bucket_uri = f"gs://{project}-agent-engine"
     artifacts_bucket_name = f"{project}-nc-agent-logs-data"
     create_bucket_if_not_exists(
@@ -57,9 +57,7 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
         )
         self.logger = self.logging_client.logger(__name__)
         self.storage_client = storage_client or storage.Client(project=self.project_id)
-        self.bucket_name = (
-            bucket_name or f"{self.project_id}-nc-agent-logs-data"
-        )
+        self.bucket_name = bucket_name or f"{self.project_id}-nc-agent-logs-data"
         self.bucket = self.storage_client.bucket(self.bucket_name)
 
     def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
@@ -71,6 +69,8 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
         """
         for span in spans:
             span_context = span.get_span_context()
+            if span_context is None:
+                continue
             trace_id = format(span_context.trace_id, "x")
             span_id = format(span_context.span_id, "x")
             span_dict = json.loads(span.to_json())
@@ -0,0 +1,115 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from tools import tools
+from tools.cache import TTLCache
+from tools.name_index import NameIndex
+from tools.store import SQLitePurchaseStore
+
+
+def test_cache_hit_and_miss_counters() -> None:
+    cache = TTLCache(maxsize=4, ttl=60)
+    assert cache.get("david") is None
+    cache.set("david", [{"order_id": "SG002-20250610"}])
+    assert cache.get("david") == [{"order_id": "SG002-20250610"}]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+
+
+def test_cache_expires_entries() -> None:
+    cache = TTLCache(maxsize=2, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_invalidate_if_drops_matching_entries() -> None:
+    cache = TTLCache(maxsize=4, ttl=60)
+    cache.set("alexis", [{"order_id": "JD001-20250415"}])
+    cache.set("david", [{"order_id": "SG002-20250610"}])
+    removed = cache.invalidate_if(
+        lambda _, rows: any(r["order_id"] == "SG002-20250610" for r in rows)
+    )
+    assert removed == 1
+    assert cache.get("david") is None
+    assert cache.get("alexis") is not None
+
+
+def _purchase_store(monkeypatch: pytest.MonkeyPatch) -> SQLitePurchaseStore:
+    store = SQLitePurchaseStore()
+    store.load_orders(
+        [
+            {
+                "order_id": order_id,
+                "customer_name": name,
+                "date": "2025-06-03",
+                "shipping_method": "INSURED",
+                "total_amount": 8.0,
+                "customer_email_id": "customer@example.com",
+                "items": [{"product_name": "Taffy Bag", "quantity": 1, "price": 8.0}],
+            }
+            for order_id, name in [
+                ("SG002-20250610", "David"),
+                ("DV003-20250701", "Davidson"),
+            ]
+        ]
+    )
+    index = NameIndex()
+    index.refresh(store.iter_customer_names)
+    monkeypatch.setattr(tools, "get_purchase_store", lambda: store)
+    monkeypatch.setattr(tools, "customer_index", index)
+    monkeypatch.setattr(tools, "purchase_history_cache", TTLCache(maxsize=16, ttl=60))
+    return store
+
+
+def test_batch_lookup_warms_exact_single_lookups(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    store = _purchase_store(monkeypatch)
+    histories = tools.get_purchase_histories(["David", "SG002-20250610"])
+    assert [order["order_id"] for order in histories["David"]] == ["SG002-20250610"]
+    assert histories["SG002-20250610"] == histories["David"]
+
+    monkeypatch.setattr(store, "iter_customer_history", None)  # must not be called
+    monkeypatch.setattr(store, "iter_order_history", None)
+    assert tools.get_purchase_history("david") == histories["David"]
+    assert tools.get_purchase_history("SG002-20250610") == histories["David"]
+
+
+def test_batch_misses_do_not_shadow_fragment_lookups(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _purchase_store(monkeypatch)
+    assert tools.get_purchase_histories(["dav"]) == {"dav": []}
+    # "dav" is a fragment of two customers, so the single lookup still finds both
+    orders = tools.get_purchase_history("dav")
+    assert {order["order_id"] for order in orders} == {
+        "SG002-20250610",
+        "DV003-20250701",
+    }
+    # and a cached fragment match is not reused as an exact batch result
+    assert tools.get_purchase_histories(["dav"]) == {"dav": []}
@@ -0,0 +1,176 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from google.adk.events import EventActions
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from tools.reason_classifier import ReasonClassifier
+
+# Importing the ReclaimBot package builds its agents, which need a model name
+os.environ.setdefault("MODEL", "gemini-2.5-flash")
+from ReclaimBot import callbacks
+from ReclaimBot.callbacks import (
+    classify_reason_with_history_before_model,
+    store_structured_result_after_tool,
+)
+
+
+def _order(order_id: str, shipping_method: str) -> dict[str, Any]:
+    return {
+        "order_id": order_id,
+        "customer_name": "David",
+        "date": "2025-06-03",
+        "shipping_method": shipping_method,
+        "total_amount": 16.0,
+        "items": [["Taffy Bag", 2, 8.0]],
+    }
+
+
+def _context(orders: list[dict[str, Any]]) -> Any:
+    return SimpleNamespace(
+        agent_name="RefundEligibilityAgent",
+        state={"purchase_history": {"purchaser": "david", "orders": orders}},
+    )
+
+
+def _request(*messages: str) -> LlmRequest:
+    return LlmRequest(
+        contents=[
+            types.Content(role="user", parts=[types.Part(text=text)])
+            for text in messages
+        ]
+    )
+
+
+@pytest.fixture
+def classifier(monkeypatch: pytest.MonkeyPatch) -> ReasonClassifier:
+    classifier = ReasonClassifier(threshold=0.8)
+    monkeypatch.setattr(callbacks, "reason_classifier", classifier)
+    return classifier
+
+
+def test_confident_reason_is_answered_with_the_order_details(
+    classifier: ReasonClassifier,
+) -> None:
+    context = _context([_order("SG002-20250610", "insured")])
+    response = classify_reason_with_history_before_model(
+        context, _request("Hi, I'm David", "the box arrived crushed")
+    )
+
+    assert response is not None and response.content is not None
+    call = (response.content.parts or [])[0].function_call
+    assert call is not None
+    assert call.name == "check_refund_eligibility"
+    assert call.args == {
+        "reason": "DAMAGED",
+        "shipping_method": "INSURED",
+        "amount": 16.0,
+        "order_date": "2025-06-03",
+        "customer_name": "David",
+    }
+    assert (classifier.classified, classifier.fast_path) == (1, 1)
+
+
+def test_ambiguous_reason_goes_to_the_model(classifier: ReasonClassifier) -> None:
+    context = _context([_order("SG002-20250610", "INSURED")])
+    for text in ("It came late and the box was crushed", "one item is missing"):
+        assert (
+            classify_reason_with_history_before_model(context, _request(text)) is None
+        )
+    assert (classifier.classified, classifier.fast_path) == (2, 0)
+
+
+def test_mixed_shipping_history_goes_to_the_model(
+    classifier: ReasonClassifier,
+) -> None:
+    context = _context(
+        [_order("SG002-20250610", "INSURED"), _order("SG001-20250501", "STANDARD")]
+    )
+    response = classify_reason_with_history_before_model(
+        context, _request("the box arrived crushed")
+    )
+    assert response is None
+    assert (classifier.classified, classifier.fast_path) == (1, 0)
+
+
+@pytest.mark.parametrize(
+    ("tool_name", "args", "response", "key", "stored", "skip_summarization"),
+    [
+        (
+            "get_purchase_history",
+            {"purchaser": "david"},
+            [_order("SG002-20250610", "INSURED")],
+            "purchase_history",
+            {"purchaser": "david", "orders": [_order("SG002-20250610", "INSURED")]},
+            True,
+        ),
+        (
+            "check_refund_eligibility",
+            {"reason": " damaged", "shipping_method": "insured"},
+            True,
+            "is_refund_eligible",
+            {"reason_code": "DAMAGED", "shipping_method": "INSURED", "eligible": True},
+            True,
+        ),
+        (
+            "process_refund",
+            {"amount": 16.0, "order_id": "SG002-20250610"},
+            {
+                "status": "REFUNDED",
+                "order_id": "SG002-20250610",
+                "amount": 16.0,
+                "refund_id": "REF-SG002-20250610-1600",
+                "message": "Refund successful",
+            },
+            "refund_confirmation_message",
+            {
+                "status": "REFUNDED",
+                "order_id": "SG002-20250610",
+                "amount": 16.0,
+                "refund_id": "REF-SG002-20250610-1600",
+                "message": "Refund successful",
+            },
+            # The refund message goes to the customer, so it is still summarized
+            None,
+        ),
+    ],
+)
+def test_tool_results_are_stored_as_typed_state(
+    tool_name: str,
+    args: dict[str, Any],
+    response: Any,
+    key: str,
+    stored: dict[str, Any],
+    skip_summarization: bool | None,
+) -> None:
+    tool = SimpleNamespace(name=tool_name)
+    context = SimpleNamespace(state={}, actions=EventActions(), agent_name="Agent")
+
+    assert store_structured_result_after_tool(tool, args, context, response) is None  # type: ignore[arg-type]
+    assert context.state == {key: stored}
+    assert context.actions.skip_summarization is skip_summarization
+
+
+def test_other_tool_results_are_left_alone() -> None:
+    tool = SimpleNamespace(name="send_email_tool")
+    context = SimpleNamespace(state={}, actions=EventActions(), agent_name="Agent")
+    store_structured_result_after_tool(tool, {}, context, "queued")  # type: ignore[arg-type]
+    assert context.state == {}
+    assert context.actions.skip_summarization is None
@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from tools import claims_pipeline, tools
+from tools.cache import TTLCache
+from tools.claims_pipeline import ClaimsPipeline, read_checkpoint
+from tools.ledger import SQLiteRefundLedger
+from tools.store import SQLitePurchaseStore
+
+CUSTOMERS = ["Alexis", "David", "Mya", "Sam", "Dana", "Noor"]
+# Orders exported without a total can't be refunded automatically
+NO_TOTAL = {"Noor"}
+
+
+@pytest.fixture
+def claims_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    store = SQLitePurchaseStore()
+    store.load_orders(
+        [
+            {
+                "order_id": f"C{i:03d}-20250603",
+                "customer_name": name,
+                "date": "2025-06-03",
+                "shipping_method": "INSURED",
+                "total_amount": None if name in NO_TOTAL else 8.0,
+                "customer_email_id": f"{name.lower()}@example.com",
+                "items": [{"product_name": "Taffy Bag", "quantity": 1, "price": 8.0}],
+            }
+            for i, name in enumerate(CUSTOMERS)
+        ]
+    )
+    ledger = SQLiteRefundLedger()
+    monkeypatch.setattr(tools, "get_purchase_store", lambda: store)
+    monkeypatch.setattr(tools, "get_refund_ledger", lambda: ledger)
+    monkeypatch.setattr(claims_pipeline, "get_refund_ledger", lambda: ledger)
+    monkeypatch.setattr(tools, "purchase_history_cache", TTLCache(maxsize=16, ttl=60))
+
+    path = tmp_path / "claims.jsonl"
+    path.write_text(
+        "".join(
+            json.dumps(
+                {"claim_id": f"claim-{i}", "customer_name": name, "reason": "damaged"}
+            )
+            + "\n"
+            for i, name in enumerate(CUSTOMERS)
+        )
+    )
+    return str(path)
+
+
+def _results(path: Path) -> list[dict[str, Any]]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class CrashingPipeline(ClaimsPipeline):
+    def _refund(self, decision: dict[str, Any]) -> dict[str, Any]:
+        if decision["claim_id"] == "claim-3":
+            raise RuntimeError("worker lost")
+        return super()._refund(decision)
+
+
+def test_resume_after_crash_writes_each_claim_once(
+    claims_path: str, tmp_path: Path
+) -> None:
+    results_path = tmp_path / "results.jsonl"
+    with pytest.raises(RuntimeError):
+        CrashingPipeline(chunk_size=2, workers=1).run(claims_path, str(results_path))
+    assert read_checkpoint(str(results_path) + ".ckpt") == (
+        2,
+        results_path.stat().st_size,
+    )
+
+    # A torn write of the next chunk is dropped on resume
+    with open(results_path, "a") as f:
+        f.write('{"claim_id": "claim-2", "status": "REFU')
+    counts = ClaimsPipeline(chunk_size=2, workers=1).run(claims_path, str(results_path))
+
+    results = _results(results_path)
+    assert [result["claim_id"] for result in results] == [
+        f"claim-{i}" for i in range(6)
+    ]
+    # claim-2 was refunded before the crash; the ledger stops a second refund
+    assert [result["status"] for result in results] == [
+        "REFUNDED",
+        "REFUNDED",
+        "ALREADY_REFUNDED",
+        "REFUNDED",
+        "REFUNDED",
+        "MISSING_AMOUNT",
+    ]
+    assert counts == {"ALREADY_REFUNDED": 1, "MISSING_AMOUNT": 1, "REFUNDED": 2}
+    assert read_checkpoint(str(results_path) + ".ckpt")[0] == 6
+
+
+def test_pending_chunks_are_bounded(claims_path: str, tmp_path: Path) -> None:
+    pipeline = ClaimsPipeline(chunk_size=1, workers=1, max_pending_chunks=2)
+    read = []
+    with_histories = pipeline._with_histories
+
+    def tracking(
+        chunks: Iterable[list[dict[str, Any]]],
+    ) -> Iterator[list[dict[str, Any]]]:
+        for chunk in with_histories(chunks):
+            read.append(chunk[0]["claim_id"])
+            yield chunk
+
+    written = []
+    refund = pipeline._refund
+
+    def tracking_refund(decision: dict[str, Any]) -> dict[str, Any]:
+        # Never more than max_pending_chunks read ahead of the chunk being written
+        written.append(decision["claim_id"])
+        assert len(read) - len(written) < pipeline.max_pending_chunks
+        return refund(decision)
+
+    pipeline._with_histories = tracking  # type: ignore[method-assign]
+    pipeline._refund = tracking_refund  # type: ignore[method-assign]
+    pipeline.run(claims_path, str(tmp_path / "results.jsonl"))
+    assert written == [f"claim-{i}" for i in range(6)]
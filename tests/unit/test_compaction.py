@@ -0,0 +1,70 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from tools.compaction import (
+    CompactionStats,
+    referenced_orders,
+    summarize_turns,
+    turns_to_drop,
+)
+
+ORDERS = [
+    {"order_id": "DM003-20250612", "items": [["Sea Salt Taffy", 1, 4.0]]},
+    {"order_id": "DM002-20250611", "items": [["Chocolate Crab", 2, 6.0]]},
+    {"order_id": "DM001-20250610", "items": [["Mint Chews", 1, 3.0]]},
+]
+
+
+def test_referenced_orders_by_id_or_product() -> None:
+    assert referenced_orders(ORDERS, ["refund dm001-20250610 please"]) == [ORDERS[2]]
+    assert referenced_orders(ORDERS, ["the chocolate crab was melted"]) == [ORDERS[1]]
+
+
+def test_referenced_orders_falls_back_to_most_recent() -> None:
+    assert referenced_orders(ORDERS, ["my package was damaged"]) == [ORDERS[0]]
+    assert referenced_orders(ORDERS, ["my package was damaged"], fallback=False) == []
+    assert referenced_orders([], ["anything"]) == []
+
+
+def test_turns_to_drop_keeps_recent_turns() -> None:
+    assert (
+        turns_to_drop([100, 100, 100], fixed_tokens=50, budget=1000, keep_last=2) == 0
+    )
+    assert (
+        turns_to_drop([400, 300, 200, 100], fixed_tokens=100, budget=500, keep_last=2)
+        == 2
+    )
+    # Still over budget, but the newest turns are never dropped
+    assert (
+        turns_to_drop([400, 300, 200], fixed_tokens=100, budget=100, keep_last=2) == 1
+    )
+
+
+def test_summarize_turns_truncates_and_skips_empty_messages() -> None:
+    summary = summarize_turns(
+        [("user", "Hi,   I'm David"), ("model", ""), ("model", "x" * 500)]
+    )
+    lines = summary.splitlines()
+    assert lines[0] == "Summary of the earlier conversation:"
+    assert lines[1] == "- user: Hi, I'm David"
+    assert len(lines) == 3 and lines[2].endswith("…")
+    assert summarize_turns([("model", "")]) == ""
+
+
+def test_compaction_stats_track_tokens_saved() -> None:
+    stats = CompactionStats()
+    stats.record(1000, 400)
+    stats.record(200, 200)
+    assert stats.stats()["compacted"] == 1
+    assert stats.stats()["saved_ratio"] == 1 - 600 / 1200
@@ -0,0 +1,60 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from types import SimpleNamespace
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+# Importing the ReclaimBot package builds its agents, which need a model name
+os.environ.setdefault("MODEL", "gemini-2.5-flash")
+from ReclaimBot.compaction import compact_context_before_model
+
+HISTORY = {
+    "purchaser": "dana",
+    "orders": [
+        {"order_id": "DM003-20250612", "items": [["Sea Salt Taffy", 1, 4.0]]},
+        {"order_id": "DM002-20250611", "items": [["Chocolate Crab", 2, 6.0]]},
+    ],
+}
+
+
+def _request(state: dict, text: str) -> LlmRequest:
+    return LlmRequest(
+        contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+        config=types.GenerateContentConfig(
+            system_instruction=f"Decide the refund.\nPurchase History: {state['purchase_history']}"
+        ),
+    )
+
+
+def test_instruction_history_is_trimmed_without_touching_state() -> None:
+    state = {"purchase_history": HISTORY}
+    context = SimpleNamespace(state=state, agent_name="RefundEligibilityAgent")
+
+    request = _request(state, "the chocolate crab was melted")
+    assert compact_context_before_model(context, request) is None  # type: ignore[arg-type]
+    assert request.config is not None
+    instruction = request.config.system_instruction
+    assert isinstance(instruction, str)
+    assert "DM002-20250611" in instruction
+    assert "DM003-20250612" not in instruction
+    assert state["purchase_history"] == HISTORY
+
+    # A later call that names the other order still sees it
+    request = _request(state, "actually the sea salt taffy order")
+    compact_context_before_model(context, request)  # type: ignore[arg-type]
+    assert request.config is not None
+    assert "DM003-20250612" in str(request.config.system_instruction)
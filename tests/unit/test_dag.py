@@ -0,0 +1,171 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+# Importing the ReclaimBot package builds its agents, which need a model name
+os.environ.setdefault("MODEL", "gemini-2.5-flash")
+from ReclaimBot.dag import DagAgent, DagNode
+
+# What the stub agents did, in order, and the session state each one saw
+log: list[str] = []
+seen: dict[str, dict[str, Any]] = {}
+
+
+@pytest.fixture(autouse=True)
+def _reset_records() -> None:
+    log.clear()
+    seen.clear()
+
+
+class StubAgent(BaseAgent):
+    """
+    Records what it saw in state, sleeps, then writes `output` (if any).
+    """
+
+    output: str | None = None
+    delay: float = 0.0
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        log.append(f"start {self.name}")
+        seen[self.name] = dict(ctx.session.state)
+        await asyncio.sleep(self.delay)
+        log.append(f"end {self.name}")
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(
+                state_delta={self.output: self.name} if self.output else {}
+            ),
+        )
+
+
+def _run(agent: BaseAgent) -> dict[str, Any]:
+    async def main() -> dict[str, Any]:
+        runner = InMemoryRunner(agent=agent, app_name="dag_test")
+        session = await runner.session_service.create_session(
+            app_name="dag_test", user_id="user"
+        )
+        message = types.Content(role="user", parts=[types.Part(text="refund please")])
+        async for _ in runner.run_async(
+            user_id="user", session_id=session.id, new_message=message
+        ):
+            pass
+        final = await runner.session_service.get_session(
+            app_name="dag_test", user_id="user", session_id=session.id
+        )
+        assert final is not None
+        return dict(final.state)
+
+    return asyncio.run(main())
+
+
+def test_nodes_run_in_dependency_order() -> None:
+    dag = DagAgent(
+        name="Dag",
+        nodes=[
+            # Listed out of order on purpose
+            DagNode(
+                StubAgent(name="Refund", output="refund"),
+                inputs=("history", "eligible"),
+                outputs=("refund",),
+            ),
+            DagNode(
+                StubAgent(name="Eligibility", output="eligible"),
+                inputs=("history",),
+                outputs=("eligible",),
+            ),
+            DagNode(StubAgent(name="Verifier", output="history"), outputs=("history",)),
+        ],
+    )
+    state = _run(dag)
+    assert log == [
+        "start Verifier",
+        "end Verifier",
+        "start Eligibility",
+        "end Eligibility",
+        "start Refund",
+        "end Refund",
+    ]
+    # Each node sees its upstream results already committed to the session
+    assert seen["Eligibility"]["history"] == "Verifier"
+    assert seen["Refund"]["eligible"] == "Eligibility"
+    assert state["refund"] == "Refund"
+
+
+def test_independent_nodes_overlap() -> None:
+    dag = DagAgent(
+        name="Dag",
+        nodes=[
+            DagNode(
+                StubAgent(name="Email", output="email", delay=0.05), outputs=("email",)
+            ),
+            DagNode(
+                StubAgent(name="Audit", output="audit", delay=0.05), outputs=("audit",)
+            ),
+        ],
+    )
+    state = _run(dag)
+    # Both start before either finishes
+    assert log[:2] == ["start Email", "start Audit"]
+    assert state["email"] == "Email" and state["audit"] == "Audit"
+
+
+def test_nodes_whose_inputs_never_appear_are_skipped() -> None:
+    dag = DagAgent(
+        name="Dag",
+        nodes=[
+            # Declares `history` but produces nothing, like a failed lookup
+            DagNode(StubAgent(name="Verifier"), outputs=("history",)),
+            DagNode(
+                StubAgent(name="Eligibility", output="eligible"),
+                inputs=("history",),
+            ),
+        ],
+    )
+    state = _run(dag)
+    assert log == ["start Verifier", "end Verifier"]
+    assert "eligible" not in state
+
+
+def test_cycles_and_duplicate_producers_are_rejected() -> None:
+    with pytest.raises(ValueError, match="Dependency cycle"):
+        DagAgent(
+            name="Dag",
+            nodes=[
+                DagNode(StubAgent(name="A"), inputs=("b",), outputs=("a",)),
+                DagNode(StubAgent(name="B"), inputs=("a",), outputs=("b",)),
+            ],
+        )
+    with pytest.raises(ValueError, match="produced by both"):
+        DagAgent(
+            name="Dag",
+            nodes=[
+                DagNode(StubAgent(name="A"), outputs=("a",)),
+                DagNode(StubAgent(name="B"), outputs=("a",)),
+            ],
+        )
@@ -0,0 +1,116 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import date, timedelta
+
+import pytest
+
+from tools import tools
+from tools.eligibility import check_refund_eligibility_batch
+from tools.ledger import SQLiteRefundLedger
+from tools.policy import CompiledPolicy, compile_policy
+from tools.tools import check_refund_eligibility
+
+REASONS = ["DAMAGED", " lost", "LATE", "NEVER_ARRIVED", "damaged", "OTHER"]
+SHIPPING = ["INSURED", "insured ", "INSURED", "STANDARD", "INSURED", "INSURED"]
+
+
+def test_batch_matches_scalar_policy() -> None:
+    result = check_refund_eligibility_batch(REASONS, SHIPPING)
+    assert result.eligible.tolist() == [
+        check_refund_eligibility(r, s) for r, s in zip(REASONS, SHIPPING, strict=True)
+    ]
+
+
+def test_batch_summary_aggregates_by_category() -> None:
+    summary = check_refund_eligibility_batch(REASONS, SHIPPING).summary()
+    assert summary["total"] == 6
+    assert summary["eligible"] == 3
+    assert summary["eligible_by_reason"]["DAMAGED"] == 2
+    assert summary["eligible_by_reason"]["LOST"] == 1
+    assert summary["eligible_by_shipping_method"] == {"INSURED": 3, "STANDARD": 0}
+
+
+def test_batch_matches_scalar_with_limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    policy = compile_policy(
+        {
+            "rules": [{"reasons": ["DAMAGED"], "shipping_methods": ["INSURED"]}],
+            "max_amount": 50,
+            "max_order_age_days": 30,
+        }
+    )
+
+    class FixedStore:
+        def current(self) -> CompiledPolicy:
+            return policy
+
+    monkeypatch.setattr(tools, "get_policy_store", lambda: FixedStore())
+    recent = date.today().isoformat()
+    old = (date.today() - timedelta(days=45)).isoformat()
+    orders = [
+        (20.0, recent),
+        (80.0, recent),
+        (20.0, old),
+        (0.0, ""),
+        (80.0, ""),
+        (20.0, "June 3, 2025"),
+    ]
+
+    batch = check_refund_eligibility_batch(
+        ["DAMAGED"] * len(orders),
+        ["INSURED"] * len(orders),
+        [amount for amount, _ in orders],
+        [order_date or None for _, order_date in orders],
+        policy=policy,
+    )
+    scalar = [
+        check_refund_eligibility("DAMAGED", "INSURED", amount, order_date)
+        for amount, order_date in orders
+    ]
+    assert scalar == [True, False, False, True, False, True]
+    assert batch.eligible.tolist() == scalar
+
+
+def test_batch_matches_scalar_with_customer_limit(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    policy = compile_policy(
+        {
+            "rules": [{"reasons": ["DAMAGED"], "shipping_methods": ["INSURED"]}],
+            "max_refunds_per_customer": 1,
+        }
+    )
+
+    class FixedStore:
+        def current(self) -> CompiledPolicy:
+            return policy
+
+    ledger = SQLiteRefundLedger()
+    ledger.record("SG002-20250610", "REF-SG002-20250610-1600", 16.0, "David")
+    monkeypatch.setattr(tools, "get_policy_store", lambda: FixedStore())
+    monkeypatch.setattr(tools, "get_refund_ledger", lambda: ledger)
+    customers = ["David", "Alexis", "david", ""]
+
+    batch = check_refund_eligibility_batch(
+        ["DAMAGED"] * len(customers),
+        ["INSURED"] * len(customers),
+        prior_refunds=[ledger.refund_count(name) for name in customers],
+        policy=policy,
+    )
+    scalar = [
+        check_refund_eligibility("DAMAGED", "INSURED", customer_name=name)
+        for name in customers
+    ]
+    assert scalar == [False, True, False, True]
+    assert batch.eligible.tolist() == scalar
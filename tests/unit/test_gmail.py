@@ -0,0 +1,51 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+from typing import Any
+
+import pytest
+
+from tools import tools
+from tools.gmail import build_message
+
+
+def test_build_message_encodes_headers_and_body() -> None:
+    raw = build_message("david@example.com", "Refund", "Your refund is on its way")[
+        "raw"
+    ]
+    decoded = base64.urlsafe_b64decode(raw).decode()
+    assert "to: david@example.com" in decoded
+    assert "subject: Refund" in decoded
+    assert "Your refund is on its way" in decoded
+
+
+def test_send_email_reuses_shared_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    sent: list[Any] = []
+
+    class FakeClient:
+        def send(self, to: str, subject: str, body: str) -> str:
+            sent.append((to, subject, body))
+            return f"msg-{len(sent)}"
+
+    monkeypatch.setattr(tools, "gmail_client", FakeClient())
+    assert (
+        tools.send_email("a@example.com", "s", "b")
+        == "Email sent to a@example.com with ID: msg-1"
+    )
+    assert (
+        tools.send_email("b@example.com", "s", "b")
+        == "Email sent to b@example.com with ID: msg-2"
+    )
+    assert len(sent) == 2
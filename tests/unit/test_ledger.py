@@ -0,0 +1,105 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlite3
+import threading
+from pathlib import Path
+
+from tools.ledger import SQLiteRefundLedger
+
+
+def test_second_refund_for_same_order_is_rejected() -> None:
+    ledger = SQLiteRefundLedger()
+    record, created = ledger.record("SG002-20250610", "REF-SG002-20250610-1600", 16.0)
+    assert created
+    again, created = ledger.record("SG002-20250610", "REF-SG002-20250610-1600", 16.0)
+    assert not created
+    assert again == record
+
+
+def test_concurrent_refunds_are_group_committed(tmp_path: Path) -> None:
+    ledger = SQLiteRefundLedger(str(tmp_path / "ledger.db"), linger=0.01)
+    created = []
+    threads = [
+        threading.Thread(
+            target=lambda i=i: created.append(
+                ledger.record(f"O{i % 50}", f"R{i}", 1.0)[1]
+            )
+        )
+        for i in range(200)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert created.count(True) == 50
+    assert ledger.committed_rows == 50
+    assert ledger.commits < 50
+
+    reopened = SQLiteRefundLedger(str(tmp_path / "ledger.db"))
+    assert reopened.get("O7") is not None
+    assert not reopened.record("O7", "R-again", 1.0)[1]
+
+
+def test_refund_written_by_another_process_does_not_fail_the_batch(
+    tmp_path: Path,
+) -> None:
+    path = str(tmp_path / "ledger.db")
+    agent = SQLiteRefundLedger(path)
+    # Opened before the agent's refund, so it is not in this ledger's memory
+    pipeline = SQLiteRefundLedger(path, linger=0.05)
+    first, _ = agent.record("SG002-20250610", "REF-SG002-20250610-1600", 16.0)
+
+    results = {}
+    threads = [
+        threading.Thread(
+            target=lambda order_id=order_id: results.update(
+                {order_id: pipeline.record(order_id, f"REF-{order_id}", 16.0)}
+            )
+        )
+        for order_id in ("SG002-20250610", "JD001-20250415")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results["SG002-20250610"] == (first, False)
+    assert results["JD001-20250415"][1]
+    assert pipeline.get("SG002-20250610") == first
+    assert (pipeline.commits, pipeline.committed_rows) == (1, 1)
+
+
+def test_refunds_are_counted_per_customer(tmp_path: Path) -> None:
+    path = tmp_path / "ledger.db"
+    with sqlite3.connect(path) as conn:
+        # A ledger file from before refunds were counted per customer
+        conn.execute(
+            "CREATE TABLE refunds (order_id TEXT PRIMARY KEY, refund_id TEXT NOT NULL, "
+            "amount REAL NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO refunds VALUES ('JD001-20250415', 'R0', 23.0, 0)")
+    conn.close()
+
+    ledger = SQLiteRefundLedger(str(path))
+    ledger.record("SG002-20250610", "R1", 16.0, "David")
+    ledger.record("SG002-20250610", "R1-again", 16.0, "David")
+    ledger.record("SG003-20250611", "R2", 8.0, "David")
+    assert ledger.refund_count("david ") == 2
+    assert ledger.refund_count("Alexis") == 0
+
+    reopened = SQLiteRefundLedger(str(path))
+    assert reopened.refund_count("David") == 2
+    assert reopened.get("JD001-20250415") is not None
@@ -0,0 +1,104 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from types import SimpleNamespace
+from typing import Any
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from tools.response_cache import ResponseCache
+
+# Importing the ReclaimBot package builds its agents, which need a model name
+os.environ.setdefault("MODEL", "gemini-2.5-flash")
+from ReclaimBot.model_cache import ModelResponseCache
+
+
+def _context(invocation_id: str = "inv-1") -> Any:
+    return SimpleNamespace(invocation_id=invocation_id, agent_name="RefundAgent")
+
+
+def _request(text: str) -> LlmRequest:
+    return LlmRequest(
+        model="gemini-2.5-flash",
+        contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+        config=types.GenerateContentConfig(system_instruction="Classify the reason."),
+    )
+
+
+def _response(text: str) -> LlmResponse:
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=text)])
+    )
+
+
+def _call(cache: ModelResponseCache, text: str, response: LlmResponse) -> Any:
+    """
+    One model turn: the cached response, or None after storing `response`.
+    """
+    cached = cache.before_model(_context(), _request(text))
+    if cached is None:
+        cache.after_model(_context(), response)
+    return cached
+
+
+def test_repeated_and_rephrased_requests_skip_the_model() -> None:
+    cache = ModelResponseCache(ResponseCache())
+    assert _call(cache, "My box arrived DAMAGED!!", _response("DAMAGED")) is None
+
+    exact = _call(cache, "My box arrived DAMAGED!!", _response("unused"))
+    assert exact.content.parts[0].text == "DAMAGED"
+    normalized = _call(cache, "my box arrived   damaged", _response("unused"))
+    assert normalized.content.parts[0].text == "DAMAGED"
+    assert (cache.exact_hits, cache.normalized_hits, cache.misses) == (1, 1, 1)
+
+
+def test_partial_and_error_responses_are_not_stored() -> None:
+    cache = ModelResponseCache(ResponseCache())
+    partial = _response("DAM")
+    partial.partial = True
+    assert _call(cache, "damaged", partial) is None
+    error = LlmResponse(error_code="RESOURCE_EXHAUSTED", error_message="quota")
+    assert _call(cache, "damaged", error) is None
+    assert _call(cache, "damaged", _response("DAMAGED")) is None
+    assert len(cache.cache) == 2  # the exact and normalized keys of the last call
+
+
+def test_replayed_function_calls_have_no_id() -> None:
+    cache = ModelResponseCache(ResponseCache())
+    call = types.FunctionCall(
+        id="adk-123", name="check_refund_eligibility", args={"reason": "DAMAGED"}
+    )
+    response = LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(function_call=call)])
+    )
+    _call(cache, "damaged", response)
+
+    replayed = _call(cache, "damaged", _response("unused"))
+    assert replayed.content.parts[0].function_call.name == "check_refund_eligibility"
+    assert replayed.content.parts[0].function_call.id is None
+    assert call.id == "adk-123"  # the live response is left as is
+
+
+def test_misses_without_a_response_expire() -> None:
+    cache = ModelResponseCache(ResponseCache(), pending_ttl=0.0)
+    # The first model call raised, so after_model never ran for it
+    cache.before_model(_context("inv-1"), _request("damaged"))
+    cache.before_model(_context("inv-2"), _request("lost"))
+    assert list(cache._pending) == [("inv-2", "RefundAgent")]
+
+    cache.after_model(_context("inv-2"), _response("LOST"))
+    assert not cache._pending
+    assert len(cache.cache) == 2
@@ -0,0 +1,87 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import pytest
+
+from tools.model_profiles import DEFAULT_PROFILES_PATH, load_profiles, summarize_runs
+
+SPEC = {
+    "default_profile": "standard",
+    "profiles": {
+        "fast": {
+            "model": "flash-lite",
+            "max_output_tokens": 256,
+            "temperature": 0,
+            "thinking_budget": 0,
+            "input_usd_per_mtok": 0.1,
+            "output_usd_per_mtok": 0.4,
+        },
+        "standard": {"model": None, "temperature": 0.7},
+    },
+    "agents": {"RefundEligibilityAgent": "fast"},
+}
+
+
+def test_agents_get_their_profile_or_the_default() -> None:
+    profiles = load_profiles(SPEC, default_model="flash")
+    fast = profiles.for_agent("RefundEligibilityAgent")
+    assert (
+        fast.model,
+        fast.max_output_tokens,
+        fast.temperature,
+        fast.thinking_budget,
+    ) == (
+        "flash-lite",
+        256,
+        0.0,
+        0,
+    )
+    standard = profiles.for_agent("RefundProcessorAgent")
+    assert standard.model == "flash"
+    assert standard.max_output_tokens is None and standard.thinking_budget is None
+
+
+def test_unknown_profile_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        load_profiles({**SPEC, "agents": {"RefundEligibilityAgent": "turbo"}})
+    with pytest.raises(ValueError):
+        load_profiles({"profiles": {}})
+
+
+def test_shipped_profiles_are_valid() -> None:
+    with open(DEFAULT_PROFILES_PATH) as f:
+        profiles = load_profiles(json.load(f), default_model="gemini-2.5-flash")
+    assert profiles.for_agent("RefundEligibilityAgent").name == "fast"
+
+
+def test_summarize_runs_reports_latency_and_cost() -> None:
+    fast = load_profiles(SPEC).profiles["fast"]
+    runs = [
+        {
+            "latency_s": latency,
+            "input_tokens": 1000,
+            "output_tokens": 100,
+            "thinking_tokens": 0,
+        }
+        for latency in (0.2, 0.4, 0.3, 1.0)
+    ]
+    summary = summarize_runs(fast, runs)
+    assert summary["calls"] == 4
+    assert summary["p50_latency_s"] == 0.3
+    assert summary["p95_latency_s"] == 1.0
+    assert summary["usd_per_call"] == pytest.approx(
+        (1000 * 0.1 + 100 * 0.4) / 1_000_000
+    )
@@ -0,0 +1,98 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from collections.abc import Iterator
+
+import pytest
+
+from tools import tools
+from tools.name_index import NameIndex
+
+
+def build_index() -> NameIndex:
+    index = NameIndex()
+    index.add_many(["David", "Davidson Park", "Alexis", "Alex Morgan"])
+    return index
+
+
+def test_search_ranks_exact_then_prefix_then_fuzzy() -> None:
+    matches = build_index().search("david")
+    assert matches[0] == ("David", 1.0)
+    assert matches[1][0] == "Davidson Park"
+    assert matches[1][1] >= NameIndex.CONFIDENT_SCORE
+
+
+def test_search_tolerates_typos() -> None:
+    matches = build_index().search("alexsis")
+    assert matches[0][0] == "Alexis"
+
+
+def test_resolve_only_returns_unambiguous_names() -> None:
+    index = build_index()
+    assert index.resolve("David") == "David"
+    assert index.resolve("morgan") == "Alex Morgan"
+    assert index.resolve("ale") is None
+    assert index.resolve("zzz") is None
+
+
+def test_refresh_adds_only_new_names() -> None:
+    index = build_index()
+    assert index.refresh(lambda: ["David", "Priya"]) == 1
+    assert len(index) == 5
+    assert not index.is_stale(60)
+
+
+def test_failed_refresh_backs_off() -> None:
+    index = NameIndex()
+
+    def unavailable() -> Iterator[str]:
+        raise RuntimeError("store unavailable")
+
+    with pytest.raises(RuntimeError):
+        index.refresh(unavailable)
+    assert not index.is_stale(60, retry_after=30)
+    assert index.is_stale(60, retry_after=0)
+    index.refresh(lambda: ["David"])
+    assert index.failed_at is None
+
+
+def test_stale_index_refreshes_off_the_request_path(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    index = build_index()
+    index.refresh(lambda: [])
+    release = threading.Event()
+    scans = []
+
+    class SlowStore:
+        def iter_customer_names(self) -> Iterator[str]:
+            scans.append(1)
+            release.wait(5)
+            yield "Priya"
+
+    monkeypatch.setattr(tools, "customer_index", index)
+    monkeypatch.setattr(tools, "get_purchase_store", lambda: SlowStore())
+    monkeypatch.setattr(tools, "CUSTOMER_INDEX_MAX_AGE", 0.0)
+    monkeypatch.setattr(tools, "_customer_index_refresh", None)
+
+    # Served from the current names while the scan is still running
+    assert tools.find_customers("david")[0]["customer_name"] == "David"
+    assert tools.find_customers("alexis")[0]["customer_name"] == "Alexis"
+    pending = tools._customer_index_refresh
+    assert pending is not None and not pending.done()
+    release.set()
+    pending.result(timeout=5)
+    assert scans == [1]
+    assert index.resolve("priya") == "Priya"
@@ -0,0 +1,199 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from tools import tools
+from tools.gmail import GmailClient
+from tools.outbox import (
+    EmailOutbox,
+    EmailSender,
+    GmailBatchSender,
+    MemorySender,
+    OutgoingEmail,
+)
+
+
+def test_enqueue_is_idempotent_and_drains_in_batches() -> None:
+    sender = MemorySender()
+    outbox = EmailOutbox(sender, batch_size=2)
+    for i in range(3):
+        outbox.enqueue(f"c{i}@example.com", "Refund", "Done", idempotency_key=f"k{i}")
+    outbox.enqueue("c0@example.com", "Refund", "Done", idempotency_key="k0")
+    assert outbox.depth() == 3
+
+    assert outbox.drain_once() == 2
+    assert outbox.drain_once() == 1
+    assert outbox.drain_once() == 0
+    assert [email.idempotency_key for email in sender.delivered] == ["k0", "k1", "k2"]
+    assert outbox.stats()["sent"] == 3
+    assert outbox.depth() == 0
+
+
+def test_failed_sends_back_off_then_give_up() -> None:
+    class FailingSender(EmailSender):
+        def send_batch(self, emails: list[OutgoingEmail]) -> dict[str, Any]:
+            return {email.idempotency_key: RuntimeError("503") for email in emails}
+
+    outbox = EmailOutbox(FailingSender(), max_attempts=2, base_backoff=0)
+    outbox.enqueue("c@example.com", "Refund", "Done")
+    assert outbox.drain_once() == 1
+    assert outbox.stats()["retried"] == 1
+    assert outbox.drain_once() == 1
+    assert outbox.stats()["failed"] == 1
+    assert outbox.depth() == 0
+
+
+def test_background_worker_delivers_queued_mail() -> None:
+    sender = MemorySender()
+    outbox = EmailOutbox(sender, poll_interval=0.01)
+    outbox.start()
+    try:
+        for i in range(200):
+            outbox.enqueue(f"c{i}@example.com", "Refund", "Done")
+        deadline = time.monotonic() + 5
+        while outbox.depth() and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        outbox.stop(timeout=1)
+    assert len(sender.delivered) == 200
+
+
+def test_unkeyed_duplicates_are_only_dropped_within_the_window(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    outbox = EmailOutbox(MemorySender(), dedupe_window=60)
+    monkeypatch.setattr(time, "time", lambda: 1000.0)
+    first = outbox.enqueue("c@example.com", "Refund", "Done")
+    assert outbox.enqueue("c@example.com", "Refund", "Done") == first
+    monkeypatch.setattr(time, "time", lambda: 1100.0)
+    assert outbox.enqueue("c@example.com", "Refund", "Done") != first
+    assert outbox.depth() == 2
+
+
+def test_processes_sharing_a_queue_never_send_a_message_twice(
+    tmp_path: Path,
+) -> None:
+    path = str(tmp_path / "outbox.db")
+    other = EmailOutbox(MemorySender(), path=path)
+    attempted_meanwhile = []
+
+    class ConcurrentSender(MemorySender):
+        def send_batch(self, emails: list[OutgoingEmail]) -> dict[str, Any]:
+            # Another process drains the same file while this batch is in flight
+            attempted_meanwhile.append(other.drain_once())
+            return super().send_batch(emails)
+
+    sender = ConcurrentSender()
+    outbox = EmailOutbox(sender, path=path)
+    for i in range(3):
+        outbox.enqueue(f"c{i}@example.com", "Refund", "Done", idempotency_key=f"k{i}")
+
+    assert outbox.drain_once() == 3
+    assert attempted_meanwhile == [0]
+    assert other.drain_once() == 0
+    assert len(sender.delivered) == 3
+    assert outbox.depth() == 0
+
+
+def test_rows_of_a_crashed_worker_are_sent_after_the_lease(tmp_path: Path) -> None:
+    class Crash(BaseException):
+        pass
+
+    class CrashingSender(EmailSender):
+        def send_batch(self, emails: list[OutgoingEmail]) -> dict[str, Any]:
+            raise Crash()
+
+    path = str(tmp_path / "outbox.db")
+    crashed = EmailOutbox(CrashingSender(), path=path, lease=0.05)
+    crashed.enqueue("c@example.com", "Refund", "Done", idempotency_key="k0")
+    with pytest.raises(Crash):
+        crashed.drain_once()
+
+    sender = MemorySender()
+    survivor = EmailOutbox(sender, path=path)
+    assert survivor.drain_once() == 0  # still leased to the crashed worker
+    time.sleep(0.06)
+    assert survivor.drain_once() == 1
+    assert [email.idempotency_key for email in sender.delivered] == ["k0"]
+
+
+def test_email_sender_requires_send_batch() -> None:
+    class Incomplete(EmailSender):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()  # type: ignore[abstract]
+
+
+def test_refund_emails_are_sent_once_per_refund(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    outbox = EmailOutbox(MemorySender())
+    monkeypatch.setattr(tools, "get_email_outbox", lambda: outbox)
+    tools.send_email_tool(
+        "c@example.com", "Refund", "Done", refund_id="REF-SG002-20250610-1600"
+    )
+    tools.send_email_tool(
+        "c@example.com", "Refund", "Done!", refund_id="REF-SG002-20250610-1600"
+    )
+    assert outbox.depth() == 1
+
+
+def test_gmail_batch_sender_records_send_latency() -> None:
+    class FakeBatch:
+        def __init__(self, callback: Any) -> None:
+            self.callback = callback
+            self.request_ids: list[str] = []
+
+        def add(self, request: Any, request_id: str) -> None:
+            self.request_ids.append(request_id)
+
+        def execute(self) -> None:
+            for request_id in self.request_ids:
+                if request_id == "bad":
+                    self.callback(request_id, None, RuntimeError("400"))
+                else:
+                    self.callback(request_id, {"id": f"msg-{request_id}"}, None)
+
+    class FakeService:
+        def new_batch_http_request(self, callback: Any) -> FakeBatch:
+            return FakeBatch(callback)
+
+        def users(self) -> "FakeService":
+            return self
+
+        def messages(self) -> "FakeService":
+            return self
+
+        def send(self, userId: str, body: dict[str, str]) -> None:
+            return None
+
+    class FakeClient(GmailClient):
+        def service(self) -> Any:
+            return FakeService()
+
+    client = FakeClient()
+    emails = [
+        OutgoingEmail(key, "c@example.com", "Refund", "Done")
+        for key in ("k1", "k2", "bad")
+    ]
+    results = GmailBatchSender(client).send_batch(emails)
+    assert results["k1"] == "msg-k1"
+    assert isinstance(results["bad"], RuntimeError)
+    assert client.stats()["sent"] == 2
@@ -0,0 +1,65 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+from datetime import date, timedelta
+from pathlib import Path
+
+from tools.policy import PolicyStore, compile_policy
+
+SPEC = {
+    "rules": [
+        {"reasons": ["DAMAGED", "LOST"], "shipping_methods": ["INSURED"]},
+        {"reasons": ["LATE"], "shipping_methods": ["express"]},
+    ],
+    "max_amount": 100,
+    "max_order_age_days": 30,
+    "max_refunds_per_customer": 2,
+}
+
+
+def test_compiled_policy_decision_table_and_limits() -> None:
+    policy = compile_policy(SPEC)
+    assert policy.evaluate("damaged", " INSURED")
+    assert policy.evaluate("LATE", "EXPRESS")
+    assert not policy.evaluate("LATE", "INSURED")
+    assert not policy.evaluate("DAMAGED", "INSURED", amount=150.0)
+    old = (date.today() - timedelta(days=45)).isoformat()
+    assert not policy.evaluate("DAMAGED", "INSURED", order_date=old)
+    assert policy.evaluate("DAMAGED", "INSURED", prior_refunds=1)
+    assert not policy.evaluate("DAMAGED", "INSURED", prior_refunds=2)
+
+
+def test_unparsable_order_date_counts_as_unknown() -> None:
+    policy = compile_policy(SPEC)
+    assert policy.evaluate("DAMAGED", "INSURED", order_date="June 3, 2025")
+    assert policy.evaluate("DAMAGED", "INSURED", order_date="")
+
+
+def test_policy_store_hot_reloads_and_keeps_last_good(tmp_path: Path) -> None:
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps(SPEC))
+    store = PolicyStore(str(path), check_interval=0)
+    assert not store.current().evaluate("OTHER", "INSURED")
+
+    path.write_text(
+        json.dumps({"rules": [{"reasons": ["OTHER"], "shipping_methods": ["INSURED"]}]})
+    )
+    os.utime(path, (1, 1))
+    assert store.current().evaluate("OTHER", "INSURED")
+
+    path.write_text("{not json")
+    os.utime(path, (2, 2))
+    assert store.current().evaluate("OTHER", "INSURED")
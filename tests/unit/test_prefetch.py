@@ -0,0 +1,91 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+
+from tools import tools
+from tools.prefetch import Prefetcher
+
+
+def test_schedule_fetches_extracted_keys_in_background() -> None:
+    fetched: list[str] = []
+
+    async def extract(text: str) -> list[str]:
+        return [word for word in text.split() if word.istitle()]
+
+    async def fetch(key: str) -> None:
+        await asyncio.sleep(0.01)
+        fetched.append(key)
+
+    prefetcher = Prefetcher(extract, fetch)
+
+    async def main() -> None:
+        task = prefetcher.schedule("hi, my name is David")
+        assert task is not None
+        assert fetched == []  # schedule does not wait for the lookup
+        await prefetcher.drain()
+
+    asyncio.run(main())
+    assert fetched == ["David"]
+    assert prefetcher.stats() == {
+        "scheduled": 1,
+        "fetched": 1,
+        "failed": 0,
+        "in_flight": 0,
+    }
+
+
+def test_failures_are_counted_not_raised() -> None:
+    async def extract(text: str) -> list[str]:
+        return ["david", "sam"]
+
+    async def fetch(key: str) -> None:
+        if key == "sam":
+            raise RuntimeError("store unavailable")
+
+    prefetcher = Prefetcher(extract, fetch)
+
+    async def main() -> None:
+        prefetcher.schedule("David and Sam")
+        await prefetcher.drain()
+
+    asyncio.run(main())
+    assert prefetcher.stats()["fetched"] == 1
+    assert prefetcher.stats()["failed"] == 1
+
+
+def test_schedule_without_loop_or_text_is_a_no_op() -> None:
+    async def extract(text: str) -> list[str]:
+        raise AssertionError("should not run")
+
+    prefetcher = Prefetcher(extract, extract)
+    assert prefetcher.schedule("My name is David") is None
+    assert prefetcher.schedule("   ") is None
+    assert prefetcher.stats()["scheduled"] == 0
+
+
+def test_mentioned_purchasers_matches_whole_name_words(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    index = tools.NameIndex()
+    index.refresh(lambda: ["David Miller", "Mya Lopez"])
+    monkeypatch.setattr(tools, "customer_index", index)
+
+    assert tools.mentioned_purchasers("Hi, my name is David") == ["David"]
+    assert tools.mentioned_purchasers("my order SG002-20250610 was late") == [
+        "SG002-20250610"
+    ]
+    assert tools.mentioned_purchasers("it never arrived") == []
@@ -0,0 +1,55 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from tools.reason_classifier import ReasonClassifier
+
+
+def test_common_reasons_are_confident() -> None:
+    classifier = ReasonClassifier(threshold=0.8)
+    cases = {
+        "The box arrived broken": "DAMAGED",
+        "my taffy melted": "DAMAGED",
+        "It never arrived": "LOST",
+        "I didn't receive my order": "LOST",
+        "the delivery was late": "LATE",
+        "It tasted gross": "OTHER",
+        "never arrived": "LOST",
+        "damaged": "DAMAGED",
+        "my package went missing": "LOST",
+    }
+    for text, expected in cases.items():
+        code, confidence = classifier.classify(text)
+        assert code == expected, text
+        assert classifier.is_confident(confidence), text
+
+
+def test_ambiguous_and_negated_text() -> None:
+    classifier = ReasonClassifier(threshold=0.8)
+    _, confidence = classifier.classify("It came late and the box was crushed")
+    assert not classifier.is_confident(confidence)
+    assert classifier.classify("Hi, my name is Mark") == ("OTHER", 0.0)
+    assert classifier.classify("It wasn't damaged, it just showed up late")[0] == "LATE"
+    _, confidence = classifier.classify("one item is missing from the box")
+    assert not classifier.is_confident(confidence)
+
+
+def test_fast_path_stats() -> None:
+    classifier = ReasonClassifier()
+    classifier.record(fast_path=True)
+    classifier.record(fast_path=True)
+    classifier.record(fast_path=False)
+    stats = classifier.stats()
+    assert stats["classified"] == 3
+    assert stats["fast_path"] == 2
+    assert round(stats["fast_path_rate"], 2) == 0.67
@@ -0,0 +1,79 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from tools.records import Item, estimate_tokens, group_orders, orders_to_state
+
+ROWS = [
+    {
+        "customer_name": "David",
+        "order_id": "SG002-20250610",
+        "date": "2025-06-03",
+        "product_name": "Peanut Butter Taffy 0.5lb Bag",
+        "quantity": 1,
+        "price": 8.0,
+        "shipping_method": "INSURED",
+        "total_amount": 16.0,
+        "customer_email_id": "david@example.com",
+    },
+    {
+        "customer_name": "David",
+        "order_id": "SG002-20250610",
+        "date": "2025-06-03",
+        "product_name": "Sour Apple Taffy 0.5lb Bag",
+        "quantity": 1,
+        "price": 8.0,
+        "shipping_method": "INSURED",
+        "total_amount": 16.0,
+        "customer_email_id": "david@example.com",
+    },
+    {
+        "customer_name": "David",
+        "order_id": "SG001-20250101",
+        "date": "2025-01-01",
+        "product_name": "Assorted Taffy 1lb Box",
+        "quantity": 2,
+        "price": 15.0,
+        "shipping_method": "STANDARD",
+        "total_amount": 30.0,
+        "customer_email_id": "david@example.com",
+    },
+]
+
+
+def test_group_orders_packs_items_per_order() -> None:
+    orders = group_orders(ROWS)
+    assert [order.order_id for order in orders] == ["SG002-20250610", "SG001-20250101"]
+    assert orders[0].items == (
+        Item("Peanut Butter Taffy 0.5lb Bag", 1, 8.0),
+        Item("Sour Apple Taffy 0.5lb Bag", 1, 8.0),
+    )
+    assert orders[0].shipping_method == "INSURED"
+
+
+def test_orders_to_state_is_smaller_than_rows() -> None:
+    state = orders_to_state(group_orders(ROWS))
+    assert state[0]["items"] == [
+        ["Peanut Butter Taffy 0.5lb Bag", 1, 8.0],
+        ["Sour Apple Taffy 0.5lb Bag", 1, 8.0],
+    ]
+    assert estimate_tokens(state) < estimate_tokens(ROWS)
+
+
+def test_orders_to_state_respects_token_budget() -> None:
+    orders = group_orders(ROWS)
+    state = orders_to_state(
+        orders, max_tokens=estimate_tokens(orders_to_state(orders[:1]))
+    )
+    assert [record["order_id"] for record in state] == ["SG002-20250610"]
+    assert len(orders_to_state(orders, max_tokens=1)) == 1
@@ -0,0 +1,71 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from pathlib import Path
+
+import pytest
+
+from tools.response_cache import ResponseCache, cache_key, normalize_text
+
+
+def test_normalize_text_folds_common_rephrasings() -> None:
+    assert normalize_text("  My package was DAMAGED!! ") == normalize_text(
+        "my package   was damaged"
+    )
+    assert cache_key("gemini", "damaged") != cache_key("gemini", "lost")
+
+
+def test_evicts_least_recently_used_to_stay_within_bytes() -> None:
+    cache = ResponseCache(max_bytes=30)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    assert cache.get("a") == "x" * 10  # "b" is now least recently used
+    cache.set("c", "z" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+    assert cache.stats()["bytes"] == 22  # two 10-char values plus 1-char keys
+    assert cache.stats()["evictions"] == 1
+
+
+def test_rejects_values_larger_than_the_bound() -> None:
+    cache = ResponseCache(max_bytes=10)
+    assert cache.set("a", "x" * 20) is False
+    assert len(cache) == 0
+
+
+def test_entries_expire_after_ttl() -> None:
+    cache = ResponseCache(ttl=0.01)
+    cache.set("a", "response")
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_persisted_entries_survive_restart(tmp_path: Path) -> None:
+    path = str(tmp_path / "responses.db")
+    first = ResponseCache(path=path)
+    first.set("a", "response")
+    first.set("b", "other")
+    first.get("a")
+
+    second = ResponseCache(path=path)
+    assert second.get("a") == "response"
+    assert second.stats()["hit_rate"] == pytest.approx(1.0)
+
+
+def test_max_bytes_must_be_positive() -> None:
+    with pytest.raises(ValueError):
+        ResponseCache(max_bytes=0)
@@ -0,0 +1,58 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from pydantic import ValidationError
+
+from tools.schemas import EligibilityDecision, PurchaseHistory, RefundConfirmation
+
+
+def test_purchase_history_single_shipping_method() -> None:
+    orders = [
+        {"order_id": "DM001-20250610", "shipping_method": "insured"},
+        {"order_id": "DM002-20250611", "shipping_method": "INSURED"},
+    ]
+    assert (
+        PurchaseHistory(purchaser="david", orders=orders).shipping_method() == "INSURED"
+    )
+
+    mixed = [*orders, {"order_id": "DM003-20250612", "shipping_method": "STANDARD"}]
+    assert PurchaseHistory(purchaser="david", orders=mixed).shipping_method() is None
+    assert PurchaseHistory(purchaser="nobody").shipping_method() is None
+
+
+def test_records_round_trip_through_state() -> None:
+    decision = EligibilityDecision(
+        reason_code="DAMAGED", shipping_method="INSURED", eligible=True
+    )
+    assert EligibilityDecision.model_validate(decision.model_dump()) == decision
+
+    confirmation = RefundConfirmation(
+        status="REFUNDED",
+        order_id="DM001-20250610",
+        amount=12.5,
+        refund_id="REF-1",
+        message="ok",
+    )
+    assert RefundConfirmation.model_validate(confirmation.model_dump()) == confirmation
+
+
+def test_refund_confirmation_rejects_unknown_status() -> None:
+    with pytest.raises(ValidationError):
+        RefundConfirmation(
+            status="MAYBE",  # type: ignore[arg-type]
+            order_id="DM001-20250610",
+            amount=1.0,
+            message="?",
+        )
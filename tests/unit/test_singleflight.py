@@ -0,0 +1,125 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tools import async_tools, tools
+from tools.cache import TTLCache
+from tools.name_index import NameIndex
+from tools.singleflight import SingleFlight
+
+
+def test_concurrent_threads_share_one_call() -> None:
+    flight = SingleFlight()
+    calls = []
+    results = []
+    release = threading.Event()
+
+    def fetch() -> str:
+        calls.append(1)
+        release.wait(5)
+        return "history"
+
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("david", fetch)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["history"] * 5
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_propagate_to_every_waiter() -> None:
+    flight = SingleFlight()
+
+    def fail() -> None:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("david", fail)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_concurrent_coroutines_share_one_call() -> None:
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "history"
+
+    async def main() -> list:
+        return await asyncio.gather(
+            *(flight.do_async("david", fetch) for _ in range(5))
+        )
+
+    assert asyncio.run(main()) == ["history"] * 5
+    assert len(calls) == 1
+    assert flight.coalesced == 4
+
+
+def test_concurrent_async_history_lookups_share_one_store_call(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls = []
+
+    class SlowStore:
+        def get_customer_history(self, customer_name: str, max_rows: int) -> list:
+            calls.append(customer_name)
+            time.sleep(0.05)
+            return [
+                {
+                    "order_id": "SG002-20250610",
+                    "customer_name": "David",
+                    "date": "2025-06-03",
+                    "product_name": "Taffy Bag",
+                    "quantity": 1,
+                    "price": 8.0,
+                    "shipping_method": "INSURED",
+                    "total_amount": 8.0,
+                    "customer_email_id": "david@example.com",
+                }
+            ]
+
+    index = NameIndex()
+    index.refresh(lambda: ["David"])
+    flight = SingleFlight()
+    monkeypatch.setattr(tools, "get_purchase_store", lambda: SlowStore())
+    monkeypatch.setattr(tools, "customer_index", index)
+    monkeypatch.setattr(tools, "purchase_history_cache", TTLCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(tools, "purchase_history_flight", flight)
+
+    async def main() -> list:
+        return await asyncio.gather(
+            *(async_tools.get_purchase_history("David") for _ in range(5))
+        )
+
+    results = asyncio.run(main())
+    assert calls == ["David"]
+    assert all(result == results[0] for result in results)
+    assert results[0][0]["order_id"] == "SG002-20250610"
+    assert flight.coalesced == 4
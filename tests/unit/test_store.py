@@ -0,0 +1,130 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from tools.store import SQLitePurchaseStore
+
+ORDERS = [
+    {
+        "order_id": "JD001-20250415",
+        "customer_name": "Alexis",
+        "date": "2025-04-15",
+        "shipping_method": "STANDARD",
+        "total_amount": 23.0,
+        "customer_email_id": "alexis@example.com",
+        "items": [
+            {"product_name": "Assorted Taffy 1lb Box", "quantity": 1, "price": 15.0},
+            {"product_name": "Watermelon Taffy 0.5lb Bag", "quantity": 1, "price": 8.0},
+        ],
+    },
+    {
+        "order_id": "SG002-20250610",
+        "customer_name": "David",
+        "date": "2025-06-03",
+        "shipping_method": "INSURED",
+        "total_amount": 16.0,
+        "customer_email_id": "david@example.com",
+        "items": [
+            {
+                "product_name": "Peanut Butter Taffy 0.5lb Bag",
+                "quantity": 1,
+                "price": 8.0,
+            },
+            {"product_name": "Sour Apple Taffy 0.5lb Bag", "quantity": 1, "price": 8.0},
+        ],
+    },
+]
+
+
+def test_sqlite_store_returns_flattened_line_items() -> None:
+    store = SQLitePurchaseStore()
+    assert store.load_orders(ORDERS) == 2
+    history = store.get_purchase_history("dav")
+    assert [row["product_name"] for row in history] == [
+        "Peanut Butter Taffy 0.5lb Bag",
+        "Sour Apple Taffy 0.5lb Bag",
+    ]
+    assert history[0] == {
+        "customer_name": "David",
+        "order_id": "SG002-20250610",
+        "date": "2025-06-03",
+        "product_name": "Peanut Butter Taffy 0.5lb Bag",
+        "quantity": 1,
+        "price": 8.0,
+        "shipping_method": "INSURED",
+        "total_amount": 16.0,
+        "customer_email_id": "david@example.com",
+    }
+
+
+def test_sqlite_store_escapes_like_wildcards() -> None:
+    store = SQLitePurchaseStore()
+    store.load_orders(ORDERS)
+    assert store.get_purchase_history("%") == []
+
+
+def test_sqlite_store_round_trips_orders() -> None:
+    store = SQLitePurchaseStore()
+    store.load_orders(ORDERS)
+    store.load_orders(ORDERS[:1])
+    assert list(store.iter_orders()) == ORDERS
+
+
+def test_sqlite_store_caps_rows_most_recent_first() -> None:
+    store = SQLitePurchaseStore()
+    store.load_orders([{**order, "customer_name": "Dana"} for order in ORDERS])
+    history = store.get_purchase_history("dana", max_rows=3)
+    assert [row["order_id"] for row in history] == [
+        "SG002-20250610",
+        "SG002-20250610",
+        "JD001-20250415",
+    ]
+
+
+def test_sqlite_store_looks_up_single_order() -> None:
+    store = SQLitePurchaseStore()
+    store.load_orders(ORDERS)
+    history = store.get_order_history("JD001-20250415")
+    assert {row["order_id"] for row in history} == {"JD001-20250415"}
+    assert len(history) == 2
+    assert store.get_order_history("JD001") == []
+
+
+def test_sqlite_store_exact_customer_lookup_and_names() -> None:
+    store = SQLitePurchaseStore()
+    store.load_orders(
+        [
+            *ORDERS,
+            {**ORDERS[1], "order_id": "DV003-20250701", "customer_name": "Davidson"},
+        ]
+    )
+    assert list(store.iter_customer_names()) == ["Alexis", "David", "Davidson"]
+    history = store.get_customer_history("DAVID")
+    assert {row["customer_name"] for row in history} == {"David"}
+
+
+def test_sqlite_store_batch_history_matches_names_and_orders() -> None:
+    store = SQLitePurchaseStore()
+    store.load_orders(
+        [
+            *ORDERS,
+            {**ORDERS[1], "order_id": "DV003-20250701", "customer_name": "Davidson"},
+        ]
+    )
+    rows = list(store.iter_batch_history(["DAVID"], ["JD001-20250415"]))
+    assert {(row["customer_name"], row["order_id"]) for row in rows} == {
+        ("David", "SG002-20250610"),
+        ("Alexis", "JD001-20250415"),
+    }
+    assert len(rows) == 4
+    assert list(store.iter_batch_history([], [])) == []
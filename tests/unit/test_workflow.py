@@ -0,0 +1,156 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from tools import tools
+from tools.cache import TTLCache
+from tools.ledger import SQLiteRefundLedger
+from tools.name_index import NameIndex
+from tools.outbox import EmailOutbox, MemorySender
+from tools.singleflight import SingleFlight
+from tools.store import SQLitePurchaseStore
+
+# Importing the ReclaimBot package builds its agents, which need a model name
+os.environ.setdefault("MODEL", "gemini-2.5-flash")
+from ReclaimBot.workflow import RefundWorkflowAgent, submit_refund_request
+
+
+def _order(
+    order_id: str, customer_name: str, total_amount: float | None = 16.0
+) -> dict[str, Any]:
+    return {
+        "order_id": order_id,
+        "customer_name": customer_name,
+        "date": "2025-06-03",
+        "shipping_method": "INSURED",
+        "total_amount": total_amount,
+        "customer_email_id": f"{customer_name.split()[0].lower()}@example.com",
+        "items": [{"product_name": "Taffy Bag", "quantity": 2, "price": 8.0}],
+    }
+
+
+ORDERS = [
+    _order("JD001-20250415", "Alexis"),
+    _order("SG002-20250610", "David"),
+    _order("SS003-20250612", "Sam Smith"),
+    _order("SJ004-20250613", "Sam Jones"),
+    _order("MY005-20250614", "Mya", total_amount=None),
+]
+
+
+@pytest.fixture
+def outbox(monkeypatch: pytest.MonkeyPatch) -> EmailOutbox:
+    store = SQLitePurchaseStore()
+    store.load_orders(ORDERS)
+    ledger = SQLiteRefundLedger()
+    outbox = EmailOutbox(MemorySender())
+    monkeypatch.setattr(tools, "get_purchase_store", lambda: store)
+    monkeypatch.setattr(tools, "get_refund_ledger", lambda: ledger)
+    monkeypatch.setattr(tools, "get_email_outbox", lambda: outbox)
+    monkeypatch.setattr(tools, "customer_index", NameIndex())
+    monkeypatch.setattr(tools, "purchase_history_cache", TTLCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(tools, "purchase_history_flight", SingleFlight())
+    return outbox
+
+
+def _run(request: dict[str, str]) -> dict[str, Any]:
+    async def main() -> dict[str, Any]:
+        runner = InMemoryRunner(
+            agent=RefundWorkflowAgent(name="refund_workflow"), app_name="workflow_test"
+        )
+        session = await runner.session_service.create_session(
+            app_name="workflow_test", user_id="user", state={"refund_request": request}
+        )
+        message = types.Content(role="user", parts=[types.Part(text="refund please")])
+        async for _ in runner.run_async(
+            user_id="user", session_id=session.id, new_message=message
+        ):
+            pass
+        final = await runner.session_service.get_session(
+            app_name="workflow_test", user_id="user", session_id=session.id
+        )
+        assert final is not None
+        return dict(final.state)
+
+    return asyncio.run(main())
+
+
+def test_submit_refund_request_records_normalized_request() -> None:
+    context = SimpleNamespace(state={})
+    submit_refund_request(
+        " David ",
+        "the box arrived crushed",
+        context,  # type: ignore[arg-type]
+        order_id=" sg002-20250610",
+    )
+    assert context.state["refund_request"] == {
+        "customer_name": "David",
+        "reason": "DAMAGED",
+        "order_id": "SG002-20250610",
+    }
+
+
+def test_refunds_and_emails_the_requesting_customer(outbox: EmailOutbox) -> None:
+    state = _run({"customer_name": "David", "reason": "DAMAGED", "order_id": ""})
+    outcome = state["refund_outcome"]
+    assert outcome["status"] == "REFUNDED"
+    assert outcome["order_id"] == "SG002-20250610"
+    assert state["is_refund_eligible"]["eligible"] is True
+    assert state["refund_confirmation_message"]["amount"] == 16.0
+    assert "queued" in state["email_status"]
+    assert outbox.depth() == 1
+
+
+def test_order_of_another_customer_is_not_refunded(outbox: EmailOutbox) -> None:
+    state = _run(
+        {"customer_name": "Alexis", "reason": "DAMAGED", "order_id": "SG002-20250610"}
+    )
+    assert state["refund_outcome"]["status"] == "NO_PURCHASE_FOUND"
+    assert state["purchase_history"]["orders"] == []
+    assert "refund_confirmation_message" not in state
+    assert tools.get_refund_ledger().get("SG002-20250610") is None
+    assert outbox.depth() == 0
+
+
+def test_name_shared_by_several_customers_is_ambiguous(outbox: EmailOutbox) -> None:
+    state = _run({"customer_name": "Sam", "reason": "DAMAGED", "order_id": ""})
+    assert state["refund_outcome"]["status"] == "AMBIGUOUS_CUSTOMER"
+    assert "is_refund_eligible" not in state
+    assert outbox.depth() == 0
+
+
+def test_order_without_total_is_left_for_review(outbox: EmailOutbox) -> None:
+    state = _run({"customer_name": "Mya", "reason": "DAMAGED", "order_id": ""})
+    assert state["refund_outcome"]["status"] == "MISSING_AMOUNT"
+    assert "refund_confirmation_message" not in state
+    assert tools.get_refund_ledger().get("MY005-20250614") is None
+
+
+def test_second_request_for_an_order_is_not_refunded_again(
+    outbox: EmailOutbox,
+) -> None:
+    request = {"customer_name": "David", "reason": "DAMAGED", "order_id": ""}
+    assert _run(request)["refund_outcome"]["status"] == "REFUNDED"
+    state = _run(request)
+    assert state["refund_outcome"]["status"] == "ALREADY_REFUNDED"
+    assert "email_status" not in state
+    assert outbox.depth() == 1
@@ -0,0 +1,115 @@
+"""
+Non-blocking versions of the ReclaimBot tools.
+
+The synchronous tools in `tools.tools` block on BigQuery and Gmail I/O. These
+coroutine versions keep the same names and arguments, so prompts refer to them
+unchanged, but run the blocking work on a bounded thread pool so sub-agents of
+a ParallelAgent can overlap their I/O instead of stalling the event loop.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from tools import tools
+from tools.prefetch import Prefetcher
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Bounded pool so a burst of sessions cannot open unlimited store/Gmail calls
+io_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TOOL_IO_WORKERS", "8")),
+    thread_name_prefix="reclaimbot-io",
+)
+
+
+async def _offload(fn: Callable[..., T], *args: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(fn, *args))
+
+
+async def find_customers(name: str) -> list[dict[str, Any]]:
+    """
+    Find customers whose name matches a (possibly partial or misspelled) name.
+
+    Args:
+        name: Customer name or name fragment
+
+    Returns:
+        Candidate customers with a match score between 0 and 1, best first
+    """
+    return await _offload(tools.find_customers, name)
+
+
+async def get_purchase_history(
+    purchaser: str, max_rows: int = tools.MAX_PURCHASE_HISTORY_ROWS
+) -> list[dict[str, Any]]:
+    """
+    Retrieve purchase history for a given customer/order ID.
+
+    Args:
+        purchaser: Customer name or order ID fragment
+        max_rows: Maximum number of line items to return, most recent first
+
+    Returns:
+        One record per order with its items packed as
+        [product_name, quantity, price] lists, most recent first
+    """
+    # Coalesce on the loop first so identical concurrent lookups take one
+    # pool thread instead of one each.
+    key = (purchaser.strip().lower(), max_rows)
+    return await tools.purchase_history_flight.do_async(
+        key, lambda: _offload(tools.get_purchase_history, purchaser, max_rows)
+    )
+
+
+async def process_refund(
+    amount: float, order_id: str, customer_name: str = ""
+) -> dict[str, Any]:
+    """
+    Process a refund for the given amount and order.
+
+    Args:
+        amount: Refund amount in dollars
+        order_id: Order ID to refund
+        customer_name: The order's customer_name, counted towards their
+            refund limit
+
+    Returns:
+        Refund status (REFUNDED, ALREADY_REFUNDED or FAILED), order ID,
+        amount, refund ID and a customer-facing message
+    """
+    return await _offload(tools.process_refund, amount, order_id, customer_name)
+
+
+async def send_email_tool(to: str, subject: str, body: str, refund_id: str = "") -> str:
+    """
+    Queue an email to a customer for background delivery.
+
+    Args:
+        to: Recipient email address
+        subject: Email subject line
+        body: Plain-text email body
+        refund_id: Refund ID the email confirms, if any; only one email is
+            sent per refund ID
+
+    Returns:
+        Confirmation that the email was queued, with its message key
+    """
+    return await _offload(tools.send_email_tool, to, subject, body, refund_id)
+
+
+async def _mentioned_purchasers(text: str) -> list[str]:
+    return await _offload(tools.mentioned_purchasers, text)
+
+
+# Warms the purchase history cache while intake is still talking to the customer
+purchase_history_prefetcher = Prefetcher(
+    extract=_mentioned_purchasers, fetch=get_purchase_history
+)
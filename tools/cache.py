@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+
+class TTLCache:
+    """
+    Thread-safe, bounded in-process cache with per-entry TTL and LRU eviction.
+
+    Entries expire `ttl` seconds after they were stored. When the cache is full,
+    the least recently used entry is evicted to make room for a new one.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the cached value for `key`, or `default` if missing or expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store `value` under `key`, evicting the least recently used entry if full.
+        """
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (expires_at, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """
+        Drop a single entry. Returns True if the key was present.
+        """
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def invalidate_if(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """
+        Drop every entry for which `predicate(key, value)` is true.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            stale = [
+                key for key, (_, value) in self._data.items() if predicate(key, value)
+            ]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, float | None]:
+        """
+        Snapshot of the cache counters, suitable for logging.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
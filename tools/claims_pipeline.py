@@ -0,0 +1,268 @@
+"""
+Offline bulk processing of refund claims without the conversational agent.
+
+Streams a CSV or JSONL export of claims through batched purchase-history
+lookups, refund eligibility and the refund ledger, and appends one JSON line
+per claim to a results file. Each chunk's results are written in one go and
+then checkpointed together with the results file size, so an interrupted run
+drops any partly written chunk and resumes where it stopped:
+
+    python -m tools.claims_pipeline claims.jsonl results.jsonl
+
+Each claim needs a `reason` and either a `customer_name` or an `order_id`;
+an optional `claim_id` is echoed back in the results.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Any
+
+from tools import tools
+from tools.eligibility import check_refund_eligibility_batch
+from tools.ledger import get_refund_ledger
+
+logger = logging.getLogger(__name__)
+
+
+def read_claims(path: str) -> Iterator[dict[str, Any]]:
+    """
+    Yield claims from a .csv or .jsonl file, one dict per claim.
+    """
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def chunked(
+    items: Iterable[dict[str, Any]], size: int
+) -> Iterator[list[dict[str, Any]]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def evaluate_chunk(claims: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Pick the order each claim refers to and decide its eligibility.
+
+    Runs in a worker process; claims arrive with their `history` attached,
+    plus `prior_refunds`, the ledger's refund count per customer in it.
+    """
+    decisions = []
+    matched = []
+    for claim in claims:
+        history = claim.pop("history")
+        prior_refunds = claim.pop("prior_refunds", {})
+        decision = {
+            "claim_id": claim.get("claim_id"),
+            "customer_name": claim.get("customer_name"),
+            "reason": claim.get("reason"),
+            "order_id": None,
+            "eligible": False,
+            "amount": None,
+            "status": "NO_PURCHASE_FOUND",
+        }
+        decisions.append(decision)
+        order_id = (claim.get("order_id") or "").strip().upper()
+        orders = [o for o in history if not order_id or o["order_id"] == order_id]
+        if orders:
+            # Histories are most recent first; without an order_id, claim the latest
+            order = orders[0]
+            matched.append(
+                (decision, order, prior_refunds.get(order["customer_name"], 0))
+            )
+
+    if matched:
+        result = check_refund_eligibility_batch(
+            [decision["reason"] or "" for decision, _, _ in matched],
+            [order.get("shipping_method") or "" for _, order, _ in matched],
+            [order.get("total_amount") or 0.0 for _, order, _ in matched],
+            [order.get("date") for _, order, _ in matched],
+            [count for _, _, count in matched],
+        )
+        for (decision, order, _), eligible in zip(
+            matched, result.eligible.tolist(), strict=True
+        ):
+            decision["customer_name"] = order["customer_name"]
+            decision["order_id"] = order["order_id"]
+            decision["amount"] = order["total_amount"]
+            decision["eligible"] = eligible
+            if not eligible:
+                decision["status"] = "NOT_ELIGIBLE"
+            elif order["total_amount"] is None:
+                # Nothing to refund from; left for manual review, as in the workflow
+                decision["status"] = "MISSING_AMOUNT"
+            else:
+                decision["status"] = "ELIGIBLE"
+    return decisions
+
+
+def read_checkpoint(path: str) -> tuple[int, int | None]:
+    """
+    Claims already processed and the results file size they account for.
+
+    The size is None for a missing checkpoint or one that only holds a count.
+    """
+    if not os.path.exists(path):
+        return 0, None
+    with open(path) as f:
+        checkpoint = json.loads(f.read().strip() or "0")
+    if isinstance(checkpoint, int):
+        return checkpoint, None
+    return checkpoint["claims"], checkpoint["results_bytes"]
+
+
+def write_checkpoint(path: str, claims: int, results_bytes: int) -> None:
+    """
+    Replace the checkpoint atomically, so a crash leaves the old or the new one.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"claims": claims, "results_bytes": results_bytes}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _quiet_worker() -> None:
+    # Per-call INFO logs would dominate the runtime at this volume
+    logging.getLogger(tools.__name__).setLevel(logging.WARNING)
+
+
+class ClaimsPipeline:
+    """
+    Generator pipeline: read -> batch lookup -> vectorized eligibility (process pool) ->
+    refund (thread pool, so ledger writes share group commits) -> write.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        workers: int | None = None,
+        refund_threads: int = 32,
+        max_pending_chunks: int | None = None,
+    ):
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.refund_threads = refund_threads
+        # Chunks submitted to the process pool but not yet written; bounds memory
+        # and read-ahead while keeping every worker busy
+        self.max_pending_chunks = max_pending_chunks or 2 * self.workers
+
+    def _with_histories(
+        self, chunks: Iterable[list[dict[str, Any]]]
+    ) -> Iterator[list[dict[str, Any]]]:
+        for chunk in chunks:
+            keys = [
+                claim.get("order_id") or claim.get("customer_name") or ""
+                for claim in chunk
+            ]
+            histories = tools.get_purchase_histories(sorted(set(keys)))
+            ledger = get_refund_ledger()
+            for claim, key in zip(chunk, keys, strict=True):
+                claim["history"] = histories.get(key, [])
+                # Counted before the chunk is refunded, so claims in one chunk
+                # share the count their customer had when it was read
+                claim["prior_refunds"] = {
+                    name: ledger.refund_count(name)
+                    for name in {order["customer_name"] for order in claim["history"]}
+                }
+            yield chunk
+
+    def _refund(self, decision: dict[str, Any]) -> dict[str, Any]:
+        if decision["status"] != "ELIGIBLE":
+            return decision
+        if get_refund_ledger().get(decision["order_id"]) is not None:
+            decision["status"] = "ALREADY_REFUNDED"
+            return decision
+        confirmation = tools.process_refund(
+            decision["amount"], decision["order_id"], decision["customer_name"]
+        )
+        decision["message"] = confirmation["message"]
+        decision["status"] = confirmation["status"]
+        return decision
+
+    def run(self, claims_path: str, results_path: str) -> dict[str, int]:
+        """
+        Process every claim not yet covered by the checkpoint.
+
+        Returns:
+            Counts of processed claims by status
+        """
+        _quiet_worker()
+        checkpoint_path = results_path + ".ckpt"
+        done, results_bytes = read_checkpoint(checkpoint_path)
+        if done:
+            logger.info(f"Resuming after {done} already processed claim(s)")
+        if results_bytes is not None and os.path.exists(results_path):
+            # Drop results of a chunk that was being written when the last run stopped
+            os.truncate(results_path, results_bytes)
+
+        counts: dict[str, int] = {}
+        started = time.perf_counter()
+        chunks = chunked(islice(read_claims(claims_path), done, None), self.chunk_size)
+        with (
+            ProcessPoolExecutor(self.workers, initializer=_quiet_worker) as processes,
+            ThreadPoolExecutor(self.refund_threads) as threads,
+            open(results_path, "a") as results,
+        ):
+
+            def commit(decisions: list[dict[str, Any]]) -> None:
+                nonlocal done
+                lines = []
+                for decision in threads.map(self._refund, decisions):
+                    lines.append(json.dumps(decision) + "\n")
+                    counts[decision["status"]] = counts.get(decision["status"], 0) + 1
+                results.write("".join(lines))
+                results.flush()
+                os.fsync(results.fileno())
+                done += len(decisions)
+                write_checkpoint(checkpoint_path, done, results.tell())
+
+            # Results are committed in submission order, so the checkpoint
+            # always covers a prefix of the input
+            pending: deque[Future[list[dict[str, Any]]]] = deque()
+            for chunk in self._with_histories(chunks):
+                pending.append(processes.submit(evaluate_chunk, chunk))
+                if len(pending) >= self.max_pending_chunks:
+                    commit(pending.popleft().result())
+            while pending:
+                commit(pending.popleft().result())
+
+        elapsed = time.perf_counter() - started
+        processed = sum(counts.values())
+        logger.info(
+            f"Processed {processed} claim(s) in {elapsed:.1f}s "
+            f"({processed / elapsed * 60 if elapsed else 0:.0f}/min): {counts}"
+        )
+        return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Process a file of refund claims offline."
+    )
+    parser.add_argument("claims", help="Input claims file (.csv or .jsonl)")
+    parser.add_argument("results", help="Output results file (.jsonl), appended to")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    ClaimsPipeline(chunk_size=args.chunk_size, workers=args.workers).run(
+        args.claims, args.results
+    )
+
+
+if __name__ == "__main__":
+    main()
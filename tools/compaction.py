@@ -0,0 +1,120 @@
+import logging
+import os
+import threading
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from tools.tools import ORDER_ID_PATTERN
+
+logger = logging.getLogger(__name__)
+
+
+# Approximate prompt-token budget for one model call (instruction + contents)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+# Most recent turns that are always sent verbatim
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "2"))
+# Characters kept per message in the summary of dropped turns
+SUMMARY_CHARS_PER_MESSAGE = 160
+
+
+def referenced_orders(
+    orders: Sequence[dict[str, Any]], texts: Iterable[str], fallback: bool = True
+) -> list[dict[str, Any]]:
+    """
+    The orders the conversation refers to by order ID or product name.
+
+    Args:
+        orders: Compact order records, most recent first
+        texts: Conversation text to look for references in
+        fallback: When nothing is referenced, return the most recent order
+            (the one a refund defaults to) instead of an empty list
+
+    Returns:
+        The referenced orders, in their original sequence
+    """
+    if not orders:
+        return []
+    text = " ".join(texts).lower()
+    mentioned_ids = {order_id.upper() for order_id in ORDER_ID_PATTERN.findall(text)}
+    kept = [
+        order
+        for order in orders
+        if str(order.get("order_id", "")).upper() in mentioned_ids
+        or any(
+            isinstance(item, list | tuple) and item and str(item[0]).lower() in text
+            for item in order.get("items") or []
+        )
+    ]
+    if kept or not fallback:
+        return kept
+    return list(orders[:1])
+
+
+def turns_to_drop(
+    turn_tokens: Sequence[int], fixed_tokens: int, budget: int, keep_last: int
+) -> int:
+    """
+    How many of the oldest turns to drop so the call fits in `budget`.
+
+    The newest `keep_last` turns are never dropped, even if the call stays
+    over budget.
+    """
+    total = fixed_tokens + sum(turn_tokens)
+    droppable = max(0, len(turn_tokens) - keep_last)
+    dropped = 0
+    while total > budget and dropped < droppable:
+        total -= turn_tokens[dropped]
+        dropped += 1
+    return dropped
+
+
+def summarize_turns(messages: Iterable[tuple[str, str]]) -> str:
+    """
+    Extractive summary of dropped turns: each message's role and opening text.
+    """
+    lines = []
+    for role, text in messages:
+        text = " ".join(text.split())
+        if not text:
+            continue
+        if len(text) > SUMMARY_CHARS_PER_MESSAGE:
+            text = text[: SUMMARY_CHARS_PER_MESSAGE - 1] + "…"
+        lines.append(f"- {role}: {text}")
+    if not lines:
+        return ""
+    return "Summary of the earlier conversation:\n" + "\n".join(lines)
+
+
+class CompactionStats:
+    """
+    Running totals of prompt tokens before and after compaction.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.compacted = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def record(self, before: int, after: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.compacted += after < before
+            self.tokens_before += before
+            self.tokens_after += after
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "compacted": self.compacted,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "saved_ratio": 1 - self.tokens_after / self.tokens_before
+                if self.tokens_before
+                else None,
+            }
+
+
+compaction_stats = CompactionStats()
@@ -0,0 +1,285 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+LEDGER_TABLE = "refund_db.refund_ledger"
+
+
+class RefundRecord(NamedTuple):
+    order_id: str
+    refund_id: str
+    amount: float
+    created_at: float
+    customer_name: str = ""
+
+
+class RefundLedger(ABC):
+    """
+    Durable record of issued refunds, at most one per order_id.
+
+    Implementations keep every recorded order_id in memory, along with a
+    refund count per customer, so the duplicate check and the per-customer
+    limit are dict lookups and never wait on storage.
+    """
+
+    def __init__(self) -> None:
+        self._records: dict[str, RefundRecord] = {}
+        self._customer_counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, record: RefundRecord, delta: int = 1) -> None:
+        if delta > 0:
+            self._records[record.order_id] = record
+        else:
+            self._records.pop(record.order_id, None)
+        if record.customer_name:
+            key = record.customer_name.strip().lower()
+            self._customer_counts[key] = self._customer_counts.get(key, 0) + delta
+
+    def get(self, order_id: str) -> RefundRecord | None:
+        """
+        Return the refund already recorded for `order_id`, if any.
+        """
+        return self._records.get(order_id)
+
+    def refund_count(self, customer_name: str) -> int:
+        """
+        Number of refunds recorded for `customer_name` (case-insensitive).
+        """
+        return self._customer_counts.get(customer_name.strip().lower(), 0)
+
+    def record(
+        self, order_id: str, refund_id: str, amount: float, customer_name: str = ""
+    ) -> tuple[RefundRecord, bool]:
+        """
+        Record a refund unless the order has already been refunded.
+
+        Returns only once the new entry is durable.
+
+        Args:
+            order_id: Order being refunded
+            refund_id: Refund identifier to store
+            amount: Refund amount in dollars
+            customer_name: Customer the order belongs to, counted towards
+                their per-customer refund limit
+
+        Returns:
+            The ledger entry for the order and whether it was created by this call
+        """
+        with self._lock:
+            existing = self._records.get(order_id)
+            if existing is not None:
+                return existing, False
+            record = RefundRecord(
+                order_id, refund_id, amount, time.time(), customer_name
+            )
+            self._remember(record)
+        try:
+            stored = self._persist(record)
+        except Exception:
+            with self._lock:
+                self._remember(record, -1)
+            raise
+        if stored != record:
+            # Another process sharing the storage refunded this order first
+            with self._lock:
+                self._remember(record, -1)
+                self._remember(stored)
+            return stored, False
+        return record, True
+
+    @abstractmethod
+    def _persist(self, record: RefundRecord) -> RefundRecord:
+        """
+        Durably store a new record, raising if it could not be written.
+
+        Returns the record now stored for the order: `record` itself, or the
+        one another writer stored first.
+        """
+
+
+class _Commit:
+    __slots__ = ("done", "error", "stored")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.error: Exception | None = None
+        self.stored: RefundRecord | None = None
+
+
+class SQLiteRefundLedger(RefundLedger):
+    """
+    Local refund ledger in a WAL-mode SQLite file with group commit.
+
+    Concurrent `record` calls hand their rows to a single writer thread, which
+    commits everything pending in one transaction (one fsync) and then
+    releases all of those callers together. Rows another process already
+    wrote for the same order are skipped, not failed, so one conflict never
+    rolls back the rest of the group.
+    """
+
+    COLUMNS = "order_id, refund_id, amount, created_at, customer_name"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS refunds (
+            order_id TEXT PRIMARY KEY,
+            refund_id TEXT NOT NULL,
+            amount REAL NOT NULL,
+            created_at REAL NOT NULL,
+            customer_name TEXT NOT NULL DEFAULT ''
+        );
+    """
+
+    def __init__(
+        self, path: str = ":memory:", max_batch: int = 500, linger: float = 0.002
+    ):
+        super().__init__()
+        self.path = path
+        self.max_batch = max_batch
+        self.linger = linger
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = FULL")
+        self._conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(refunds)")}
+        if "customer_name" not in columns:
+            # Ledgers written before refunds were counted per customer
+            self._conn.execute(
+                "ALTER TABLE refunds ADD COLUMN customer_name TEXT NOT NULL DEFAULT ''"
+            )
+        for row in self._conn.execute(f"SELECT {self.COLUMNS} FROM refunds"):
+            self._remember(RefundRecord(*row))
+
+        self._pending: list[tuple[RefundRecord, _Commit]] = []
+        self._pending_lock = threading.Condition()
+        self.commits = 0
+        self.committed_rows = 0
+        self._writer = threading.Thread(
+            target=self._write_loop, name="refund-ledger", daemon=True
+        )
+        self._writer.start()
+
+    def _persist(self, record: RefundRecord) -> RefundRecord:
+        commit = _Commit()
+        with self._pending_lock:
+            self._pending.append((record, commit))
+            self._pending_lock.notify()
+        commit.done.wait()
+        if commit.error is not None:
+            raise commit.error
+        assert commit.stored is not None
+        return commit.stored
+
+    def _insert(self, record: RefundRecord) -> RefundRecord:
+        cursor = self._conn.execute(
+            f"INSERT OR IGNORE INTO refunds ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+            record,
+        )
+        if cursor.rowcount:
+            return record
+        row = self._conn.execute(
+            f"SELECT {self.COLUMNS} FROM refunds WHERE order_id = ?",
+            (record.order_id,),
+        ).fetchone()
+        return RefundRecord(*row)
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._pending_lock:
+                while not self._pending:
+                    self._pending_lock.wait()
+            # Give concurrent writers a moment to join this commit
+            time.sleep(self.linger)
+            with self._pending_lock:
+                batch = self._pending[: self.max_batch]
+                del self._pending[: self.max_batch]
+
+            error: Exception | None = None
+            try:
+                with self._conn:
+                    stored = [self._insert(record) for record, _ in batch]
+                self.commits += 1
+                self.committed_rows += sum(
+                    row is record
+                    for row, (record, _) in zip(stored, batch, strict=True)
+                )
+            except Exception as e:
+                logger.error(f"Refund ledger commit of {len(batch)} row(s) failed: {e}")
+                error = e
+                stored = [record for record, _ in batch]
+            for row, (_, commit) in zip(stored, batch, strict=True):
+                commit.stored = row
+                commit.error = error
+                commit.done.set()
+
+
+class BigQueryRefundLedger(RefundLedger):
+    """
+    Refund ledger kept in the BigQuery `refund_db.refund_ledger` table.
+
+    Existing order_ids are loaded once at startup; new refunds are streamed in
+    with the order_id as insert ID so retried inserts are de-duplicated.
+    """
+
+    def __init__(self, project: str | None = None, table: str = LEDGER_TABLE):
+        super().__init__()
+        from google.cloud import bigquery
+
+        self.client = bigquery.Client(project=project)
+        self.table = f"{self.client.project}.{table}"
+        query = (
+            "SELECT order_id, refund_id, amount, "
+            "UNIX_SECONDS(created_at) AS created_at, customer_name "
+            f"FROM `{self.table}`"
+        )
+        for row in self.client.query(query).result():
+            self._remember(
+                RefundRecord(
+                    row["order_id"],
+                    row["refund_id"],
+                    row["amount"],
+                    float(row["created_at"]),
+                    row["customer_name"] or "",
+                )
+            )
+
+    def _persist(self, record: RefundRecord) -> RefundRecord:
+        errors = self.client.insert_rows_json(
+            self.table,
+            [
+                {
+                    "order_id": record.order_id,
+                    "refund_id": record.refund_id,
+                    "amount": record.amount,
+                    "created_at": record.created_at,
+                    "customer_name": record.customer_name,
+                }
+            ],
+            row_ids=[record.order_id],
+        )
+        if errors:
+            raise RuntimeError(f"BigQuery ledger insert failed: {errors}")
+        return record
+
+
+@lru_cache(maxsize=1)
+def get_refund_ledger() -> RefundLedger:
+    """
+    Build the process-wide refund ledger selected by the REFUND_LEDGER env var.
+
+    REFUND_LEDGER is either "sqlite" (default, file from REFUND_LEDGER_PATH)
+    or "bigquery".
+    """
+    backend = os.getenv("REFUND_LEDGER", "sqlite").strip().lower()
+    if backend == "sqlite":
+        return SQLiteRefundLedger(os.getenv("REFUND_LEDGER_PATH", "refund_ledger.db"))
+    if backend == "bigquery":
+        return BigQueryRefundLedger(project=os.getenv("GOOGLE_CLOUD_PROJECT"))
+    raise ValueError(f"Unknown REFUND_LEDGER backend: {backend}")
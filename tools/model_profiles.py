@@ -0,0 +1,135 @@
+import json
+import logging
+import math
+import os
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Any, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PROFILES_PATH = os.path.join(os.path.dirname(__file__), "model_profiles.json")
+
+
+class ModelProfile(NamedTuple):
+    """
+    Model and generation settings for one tier of agents.
+
+    None leaves a setting at the model's default; a None model falls back to
+    the MODEL env var. Prices are only used to estimate benchmark cost.
+    """
+
+    name: str
+    model: str | None
+    max_output_tokens: int | None = None
+    temperature: float | None = None
+    thinking_budget: int | None = None
+    input_usd_per_mtok: float = 0.0
+    output_usd_per_mtok: float = 0.0
+
+    def cost(self, input_tokens: float, output_tokens: float) -> float:
+        """
+        Estimated cost in USD; thinking tokens are billed as output.
+        """
+        return (
+            input_tokens * self.input_usd_per_mtok
+            + output_tokens * self.output_usd_per_mtok
+        ) / 1_000_000
+
+
+class ModelProfiles(NamedTuple):
+    profiles: dict[str, ModelProfile]
+    agents: dict[str, str]
+    default_profile: str
+
+    def for_agent(self, agent_name: str) -> ModelProfile:
+        """
+        The profile assigned to `agent_name`, or the default profile.
+        """
+        return self.profiles[self.agents.get(agent_name, self.default_profile)]
+
+
+def load_profiles(
+    spec: dict[str, Any], default_model: str | None = None
+) -> ModelProfiles:
+    """
+    Build ModelProfiles from a declarative spec (see model_profiles.json).
+
+    Raises:
+        ValueError: If the spec is malformed or refers to an unknown profile
+    """
+    raw_profiles = spec.get("profiles")
+    if not isinstance(raw_profiles, dict) or not raw_profiles:
+        raise ValueError("model profiles need a non-empty 'profiles' object")
+
+    def optional(settings: dict[str, Any], key: str, cast: Any) -> Any:
+        value = settings.get(key)
+        return None if value is None else cast(value)
+
+    profiles = {
+        name: ModelProfile(
+            name=name,
+            model=settings.get("model") or default_model,
+            max_output_tokens=optional(settings, "max_output_tokens", int),
+            temperature=optional(settings, "temperature", float),
+            thinking_budget=optional(settings, "thinking_budget", int),
+            input_usd_per_mtok=float(settings.get("input_usd_per_mtok") or 0.0),
+            output_usd_per_mtok=float(settings.get("output_usd_per_mtok") or 0.0),
+        )
+        for name, settings in raw_profiles.items()
+    }
+    agents = dict(spec.get("agents") or {})
+    default_profile = spec.get("default_profile") or next(iter(profiles))
+    for profile in [default_profile, *agents.values()]:
+        if profile not in profiles:
+            raise ValueError(f"Unknown model profile: {profile}")
+    return ModelProfiles(profiles, agents, default_profile)
+
+
+@lru_cache(maxsize=1)
+def get_model_profiles() -> ModelProfiles:
+    """
+    Process-wide profiles from MODEL_PROFILES_PATH, defaulting models to MODEL.
+    """
+    path = os.getenv("MODEL_PROFILES_PATH", DEFAULT_PROFILES_PATH)
+    with open(path) as f:
+        profiles = load_profiles(json.load(f), default_model=os.getenv("MODEL"))
+    logger.info(f"Loaded {len(profiles.profiles)} model profile(s) from {path}")
+    return profiles
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarize_runs(
+    profile: ModelProfile, runs: list[dict[str, float]]
+) -> dict[str, Any]:
+    """
+    Latency and token cost for one profile's benchmark runs.
+
+    Args:
+        profile: The profile that was benchmarked
+        runs: One dict per call with latency_s, input_tokens, output_tokens
+            and thinking_tokens
+
+    Returns:
+        Per-call averages, latency percentiles and estimated cost in USD
+    """
+    if not runs:
+        return {"profile": profile.name, "model": profile.model, "calls": 0}
+    latencies = [run["latency_s"] for run in runs]
+    input_tokens = sum(run["input_tokens"] for run in runs)
+    output_tokens = sum(run["output_tokens"] + run["thinking_tokens"] for run in runs)
+    return {
+        "profile": profile.name,
+        "model": profile.model,
+        "calls": len(runs),
+        "p50_latency_s": round(_percentile(latencies, 0.5), 3),
+        "p95_latency_s": round(_percentile(latencies, 0.95), 3),
+        "avg_input_tokens": round(input_tokens / len(runs), 1),
+        "avg_output_tokens": round(output_tokens / len(runs), 1),
+        "usd_per_call": profile.cost(input_tokens, output_tokens) / len(runs),
+    }
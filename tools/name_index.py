@@ -0,0 +1,134 @@
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Character trigrams of a lower-cased, space-padded string.
+
+    Padding gives short fragments like "al" usable trigrams (" al", "al ").
+    """
+    padded = f"  {text.strip().lower()} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """
+    In-memory trigram index over customer names for fuzzy resolution.
+
+    Names are added incrementally; searching only scores names that share at
+    least one trigram with the query, so lookups do not scan every customer.
+    """
+
+    # Scores at or above this mean the query is a whole name or a name prefix
+    CONFIDENT_SCORE = 0.8
+
+    def __init__(self) -> None:
+        self._names: dict[str, str] = {}
+        self._grams: dict[str, set[str]] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self.refreshed_at: float | None = None
+        self.failed_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str) -> bool:
+        """
+        Index a customer name. Returns False if it was already indexed.
+        """
+        key = name.strip().lower()
+        if not key:
+            return False
+        with self._lock:
+            if key in self._names:
+                return False
+            grams = trigrams(key)
+            self._names[key] = name.strip()
+            self._grams[key] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(key)
+            return True
+
+    def add_many(self, names: Iterable[str]) -> int:
+        """
+        Index several names, returning how many were new.
+        """
+        return sum(self.add(name) for name in names)
+
+    def refresh(self, fetch_names: Callable[[], Iterable[str]]) -> int:
+        """
+        Pull names from `fetch_names` and index the ones not seen before.
+
+        A failure is recorded in `failed_at` and re-raised.
+        """
+        try:
+            added = self.add_many(fetch_names())
+        except Exception:
+            self.failed_at = time.monotonic()
+            raise
+        self.refreshed_at = time.monotonic()
+        self.failed_at = None
+        return added
+
+    def is_stale(self, max_age: float, retry_after: float = 0.0) -> bool:
+        """
+        Whether the index is due a refresh: never loaded or older than
+        `max_age`, and no refresh failed within the last `retry_after` seconds.
+        """
+        now = time.monotonic()
+        if self.failed_at is not None and now - self.failed_at < retry_after:
+            return False
+        return self.refreshed_at is None or now - self.refreshed_at > max_age
+
+    def search(self, query: str, limit: int = 5) -> list[tuple[str, float]]:
+        """
+        Rank indexed names against a query fragment.
+
+        An exact match scores 1.0, a name with a word starting with the query
+        scores at least CONFIDENT_SCORE, and anything else is scored by
+        trigram overlap.
+
+        Args:
+            query: Customer name or name fragment
+            limit: Maximum number of candidates to return
+
+        Returns:
+            (customer_name, score) pairs, best first
+        """
+        key = query.strip().lower()
+        if not key:
+            return []
+        query_grams = trigrams(key)
+        with self._lock:
+            candidates: set[str] = set()
+            for gram in query_grams:
+                candidates |= self._postings.get(gram, set())
+            scored = []
+            for candidate in candidates:
+                grams = self._grams[candidate]
+                overlap = len(query_grams & grams) / len(query_grams | grams)
+                if candidate == key:
+                    score = 1.0
+                elif any(word.startswith(key) for word in candidate.split()):
+                    score = self.CONFIDENT_SCORE + (1 - self.CONFIDENT_SCORE) * overlap
+                else:
+                    score = self.CONFIDENT_SCORE * overlap
+                scored.append((self._names[candidate], round(score, 4)))
+        scored.sort(key=lambda pair: (-pair[1], pair[0]))
+        return scored[:limit]
+
+    def resolve(self, query: str) -> str | None:
+        """
+        Return the single customer the query unambiguously refers to, if any.
+        """
+        matches = self.search(query, limit=2)
+        if not matches:
+            return None
+        best_name, best_score = matches[0]
+        if best_score == 1.0:
+            return best_name
+        confident = [name for name, score in matches if score >= self.CONFIDENT_SCORE]
+        return best_name if confident == [best_name] else None
@@ -0,0 +1,376 @@
+import hashlib
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from email.mime.text import MIMEText
+from functools import lru_cache
+from typing import Any, NamedTuple
+
+from tools.gmail import GmailClient, build_message, gmail_client
+
+logger = logging.getLogger(__name__)
+
+
+class OutgoingEmail(NamedTuple):
+    idempotency_key: str
+    to: str
+    subject: str
+    body: str
+
+
+class EmailSender(ABC):
+    """
+    Delivers a batch of queued emails.
+    """
+
+    @abstractmethod
+    def send_batch(self, emails: list[OutgoingEmail]) -> dict[str, Any]:
+        """
+        Send `emails` and return, per idempotency key, either the provider
+        message ID or the exception that made that message fail.
+        """
+
+
+class GmailBatchSender(EmailSender):
+    """
+    Sends each outbox batch in one HTTP round trip using Gmail batch requests.
+
+    Gmail accepts at most 100 calls per batch request and throttles large
+    ones, which is why `EmailOutbox.batch_size` defaults to 50.
+    """
+
+    def __init__(self, client: GmailClient = gmail_client):
+        self.client = client
+
+    def send_batch(self, emails: list[OutgoingEmail]) -> dict[str, Any]:
+        results: dict[str, Any] = {}
+
+        def on_response(request_id: str, response: Any, exception: Exception) -> None:
+            results[request_id] = exception if exception is not None else response["id"]
+
+        started = time.perf_counter()
+        service = self.client.service()
+        connected = time.perf_counter()
+        batch = service.new_batch_http_request(callback=on_response)
+        for email in emails:
+            batch.add(
+                service.users()
+                .messages()
+                .send(
+                    userId="me", body=build_message(email.to, email.subject, email.body)
+                ),
+                request_id=email.idempotency_key,
+            )
+        batch.execute()
+        delivered = sum(
+            not isinstance(result, Exception) for result in results.values()
+        )
+        if delivered:
+            self.client.record_timing(
+                connected - started, time.perf_counter() - connected, delivered
+            )
+        return results
+
+
+class SMTPSender(EmailSender):
+    """
+    Sends over plain SMTP, e.g. to a local debugging server for offline runs.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 1025,
+        sender: str = "reclaimbot@localhost",
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    def send_batch(self, emails: list[OutgoingEmail]) -> dict[str, Any]:
+        results: dict[str, Any] = {}
+        with smtplib.SMTP(self.host, self.port) as smtp:
+            for email in emails:
+                message = MIMEText(email.body)
+                message["From"] = self.sender
+                message["To"] = email.to
+                message["Subject"] = email.subject
+                message["Message-ID"] = f"<{email.idempotency_key}@reclaimbot>"
+                try:
+                    smtp.send_message(message)
+                    results[email.idempotency_key] = email.idempotency_key
+                except smtplib.SMTPException as e:
+                    results[email.idempotency_key] = e
+        return results
+
+
+class MemorySender(EmailSender):
+    """
+    In-process stand-in that records every delivered email.
+    """
+
+    def __init__(self) -> None:
+        self.delivered: list[OutgoingEmail] = []
+
+    def send_batch(self, emails: list[OutgoingEmail]) -> dict[str, Any]:
+        self.delivered.extend(emails)
+        return {email.idempotency_key: email.idempotency_key for email in emails}
+
+
+class EmailOutbox:
+    """
+    Durable SQLite-backed queue of outgoing emails drained by a worker thread.
+
+    `enqueue` only writes a row, so callers return immediately. The worker
+    sends pending rows in batches, retries failures with exponential backoff
+    and marks messages failed after `max_attempts`. Each message carries an
+    idempotency key; enqueueing the same key twice is a no-op and a message
+    already marked sent is never sent again. Without a caller-supplied key,
+    identical emails are only deduplicated within `dedupe_window` seconds, so
+    a later legitimate resend still goes out.
+
+    Several processes may share one queue file: a batch is claimed by marking
+    its rows `sending` in the transaction that selects them, with a `lease`
+    after which rows of a worker that died mid-send are picked up again.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            created_at REAL NOT NULL,
+            sent_at REAL,
+            message_id TEXT,
+            last_error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_outbox_pending
+            ON outbox(status, next_attempt_at);
+    """
+
+    def __init__(
+        self,
+        sender: EmailSender,
+        path: str = ":memory:",
+        batch_size: int = 50,
+        max_attempts: int = 5,
+        base_backoff: float = 1.0,
+        poll_interval: float = 1.0,
+        dedupe_window: float = 3600.0,
+        lease: float = 300.0,
+    ):
+        self.sender = sender
+        self.path = path
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.poll_interval = poll_interval
+        self.dedupe_window = dedupe_window
+        self.lease = lease
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker: threading.Thread | None = None
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._send_latency = 0.0
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.executescript(self.SCHEMA)
+
+    def enqueue(
+        self, to: str, subject: str, body: str, idempotency_key: str | None = None
+    ) -> str:
+        """
+        Queue an email for background delivery.
+
+        Args:
+            to: Recipient email address
+            subject: Email subject line
+            body: Plain-text email body
+            idempotency_key: Deduplication key, e.g. the refund ID the email is
+                about; if None, derived from the content and the current
+                `dedupe_window`
+
+        Returns:
+            The idempotency key of the queued (or already queued) message
+        """
+        now = time.time()
+        if idempotency_key is None:
+            window = int(now // self.dedupe_window) if self.dedupe_window > 0 else now
+            idempotency_key = hashlib.sha256(
+                "\x1f".join((to, subject, body, str(window))).encode()
+            ).hexdigest()[:32]
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR IGNORE INTO outbox
+                    (idempotency_key, recipient, subject, body, next_attempt_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (idempotency_key, to, subject, body, now, now),
+            )
+        self._wake.set()
+        return idempotency_key
+
+    def drain_once(self) -> int:
+        """
+        Send one batch of due messages. Returns how many were attempted.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            # Take the write lock before selecting, so no other process can
+            # claim the same rows in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                """
+                SELECT idempotency_key, recipient, subject, body, attempts, created_at
+                FROM outbox
+                WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+                """,
+                (now, self.batch_size),
+            ).fetchall()
+            self._conn.executemany(
+                """
+                UPDATE outbox SET status = 'sending', next_attempt_at = ?
+                WHERE idempotency_key = ?
+                """,
+                [(now + self.lease, row[0]) for row in rows],
+            )
+        if not rows:
+            return 0
+
+        emails = [OutgoingEmail(*row[:4]) for row in rows]
+        try:
+            results = self.sender.send_batch(emails)
+        except Exception as e:
+            results = {email.idempotency_key: e for email in emails}
+
+        finished = time.time()
+        with self._lock, self._conn:
+            for key, _, _, _, attempts, created_at in rows:
+                result = results.get(key, RuntimeError("no response for message"))
+                if not isinstance(result, Exception):
+                    self._conn.execute(
+                        """
+                        UPDATE outbox SET status = 'sent', sent_at = ?, message_id = ?,
+                            attempts = attempts + 1
+                        WHERE idempotency_key = ?
+                        """,
+                        (finished, str(result), key),
+                    )
+                    self.sent += 1
+                    self._send_latency += finished - created_at
+                elif attempts + 1 >= self.max_attempts:
+                    self._conn.execute(
+                        """
+                        UPDATE outbox SET status = 'failed', attempts = attempts + 1,
+                            last_error = ?
+                        WHERE idempotency_key = ?
+                        """,
+                        (str(result), key),
+                    )
+                    self.failed += 1
+                    logger.error(
+                        f"Giving up on email {key} after {attempts + 1} attempts: {result}"
+                    )
+                else:
+                    self._conn.execute(
+                        """
+                        UPDATE outbox SET status = 'pending', attempts = attempts + 1,
+                            next_attempt_at = ?, last_error = ?
+                        WHERE idempotency_key = ?
+                        """,
+                        (finished + self.base_backoff * 2**attempts, str(result), key),
+                    )
+                    self.retried += 1
+                    logger.warning(f"Email {key} failed, will retry: {result}")
+        return len(rows)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.drain_once():
+                    continue
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self) -> None:
+        """
+        Start the background worker thread if it is not already running.
+        """
+        if self._worker is None or not self._worker.is_alive():
+            self._stop.clear()
+            self._worker = threading.Thread(
+                target=self._run, name="email-outbox", daemon=True
+            )
+            self._worker.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def depth(self) -> int:
+        """
+        Number of messages still waiting to be sent, including claimed ones.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')"
+            ).fetchone()[0]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "depth": self.depth(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "avg_send_latency_s": self._send_latency / self.sent if self.sent else None,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_email_outbox() -> EmailOutbox:
+    """
+    Build and start the process-wide outbox.
+
+    EMAIL_SENDER selects delivery: "gmail" (default), "smtp" (SMTP_HOST /
+    SMTP_PORT) or "memory". The queue file comes from EMAIL_OUTBOX_PATH and
+    EMAIL_DEDUPE_WINDOW sets how long identical unkeyed emails are sent once.
+    """
+    backend = os.getenv("EMAIL_SENDER", "gmail").strip().lower()
+    if backend == "gmail":
+        sender: EmailSender = GmailBatchSender()
+    elif backend == "smtp":
+        sender = SMTPSender(
+            os.getenv("SMTP_HOST", "localhost"), int(os.getenv("SMTP_PORT", "1025"))
+        )
+    elif backend == "memory":
+        sender = MemorySender()
+    else:
+        raise ValueError(f"Unknown EMAIL_SENDER backend: {backend}")
+    outbox = EmailOutbox(
+        sender,
+        path=os.getenv("EMAIL_OUTBOX_PATH", "email_outbox.db"),
+        dedupe_window=float(os.getenv("EMAIL_DEDUPE_WINDOW", "3600")),
+    )
+    outbox.start()
+    return outbox
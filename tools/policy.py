@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date
+from functools import lru_cache
+from typing import Any, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(__file__), "refund_policy.json")
+
+
+class CompiledPolicy(NamedTuple):
+    """
+    Refund policy compiled into a decision table plus numeric limits.
+
+    `table` holds every eligible (REASON, SHIPPING_METHOD) pair, so the core
+    check is one set membership test. A limit of None means unlimited.
+    """
+
+    table: frozenset[tuple[str, str]]
+    max_amount: float | None
+    max_order_age_days: int | None
+    max_refunds_per_customer: int | None = None
+
+    def evaluate(
+        self,
+        reason: str,
+        shipping_method: str,
+        amount: float | None = None,
+        order_date: str | date | None = None,
+        prior_refunds: int | None = None,
+    ) -> bool:
+        """
+        Decide eligibility; limits are only checked when the value is known.
+
+        `prior_refunds` is how many refunds the order's customer already got.
+        An `order_date` that is not an ISO date counts as unknown.
+        """
+        if (reason.strip().upper(), shipping_method.strip().upper()) not in self.table:
+            return False
+        if (
+            self.max_amount is not None
+            and amount is not None
+            and amount > self.max_amount
+        ):
+            return False
+        if (
+            self.max_refunds_per_customer is not None
+            and prior_refunds is not None
+            and prior_refunds >= self.max_refunds_per_customer
+        ):
+            return False
+        if self.max_order_age_days is not None and order_date is not None:
+            if isinstance(order_date, str):
+                order_date = parse_order_date(order_date)
+            if (
+                order_date is not None
+                and (date.today() - order_date).days > self.max_order_age_days
+            ):
+                return False
+        return True
+
+
+def parse_order_date(value: str | None) -> date | None:
+    """
+    The date of an ISO "YYYY-MM-DD[...]" string, or None if blank or not a date.
+
+    Order dates can come from the LLM, so anything unparsable is treated as
+    unknown rather than failing the eligibility check.
+    """
+    try:
+        return date.fromisoformat((value or "")[:10])
+    except ValueError:
+        return None
+
+
+def compile_policy(spec: dict[str, Any]) -> CompiledPolicy:
+    """
+    Compile a declarative policy (see refund_policy.json) into a CompiledPolicy.
+
+    Raises:
+        ValueError: If the spec is malformed
+    """
+    rules = spec.get("rules")
+    if not isinstance(rules, list):
+        raise ValueError("refund policy needs a 'rules' list")
+    table = frozenset(
+        (reason.strip().upper(), shipping.strip().upper())
+        for rule in rules
+        for reason in rule["reasons"]
+        for shipping in rule["shipping_methods"]
+    )
+
+    def limit(key: str, cast: Any) -> Any:
+        value = spec.get(key)
+        return None if value is None else cast(value)
+
+    return CompiledPolicy(
+        table=table,
+        max_amount=limit("max_amount", float),
+        max_order_age_days=limit("max_order_age_days", int),
+        max_refunds_per_customer=limit("max_refunds_per_customer", int),
+    )
+
+
+class PolicyStore:
+    """
+    Serves the compiled policy from a JSON file and hot-reloads it on change.
+
+    The file's mtime is checked at most every `check_interval` seconds. A new
+    version is compiled off to the side and swapped in with one assignment,
+    so readers always see a complete policy; an invalid file is logged and
+    the previous policy stays active.
+    """
+
+    def __init__(self, path: str = DEFAULT_POLICY_PATH, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime: float | None = None
+        self._checked_at = 0.0
+        self._policy = self._load()
+
+    def _load(self) -> CompiledPolicy:
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path) as f:
+            policy = compile_policy(json.load(f))
+        self._mtime = mtime
+        logger.info(
+            f"Loaded refund policy from {self.path} ({len(policy.table)} eligible pairs)"
+        )
+        return policy
+
+    def current(self) -> CompiledPolicy:
+        """
+        The active policy, reloading first if the file changed.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._policy
+        with self._lock:
+            if now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                try:
+                    if os.stat(self.path).st_mtime != self._mtime:
+                        self._policy = self._load()
+                except Exception as e:
+                    logger.error(f"Keeping previous refund policy, reload failed: {e}")
+        return self._policy
+
+
+@lru_cache(maxsize=1)
+def get_policy_store() -> PolicyStore:
+    """
+    Process-wide policy store for the file named by REFUND_POLICY_PATH.
+    """
+    return PolicyStore(
+        os.getenv("REFUND_POLICY_PATH", DEFAULT_POLICY_PATH),
+        check_interval=float(os.getenv("REFUND_POLICY_CHECK_INTERVAL", "5")),
+    )
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import threading
+from collections.abc import Awaitable, Callable
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """
+    Warm lookups in the background for keys mentioned in user messages.
+
+    `extract` pulls lookup keys (customer names, order IDs) out of free text
+    and `fetch` performs the lookup; its own cache and request coalescing make
+    the result available to whoever asks for the same key later. Both run in a
+    fire-and-forget task, so the caller never waits on them, and failures are
+    logged rather than raised.
+    """
+
+    def __init__(
+        self,
+        extract: Callable[[str], Awaitable[list[str]]],
+        fetch: Callable[[str], Awaitable[Any]],
+    ):
+        self.extract = extract
+        self.fetch = fetch
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._lock = threading.Lock()
+        self.scheduled = 0
+        self.fetched = 0
+        self.failed = 0
+
+    def schedule(self, text: str) -> Optional["asyncio.Task[None]"]:
+        """
+        Start prefetching for `text` on the running loop and return the task.
+
+        Returns None for blank text or when no event loop is running.
+        """
+        if not text or not text.strip():
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        task = loop.create_task(self._run(text))
+        # Keep a reference so the task is not garbage collected mid-flight
+        with self._lock:
+            self._tasks.add(task)
+            self.scheduled += 1
+        task.add_done_callback(self._discard)
+        return task
+
+    def _discard(self, task: "asyncio.Task[None]") -> None:
+        with self._lock:
+            self._tasks.discard(task)
+
+    async def _fetch(self, key: str) -> None:
+        try:
+            await self.fetch(key)
+            with self._lock:
+                self.fetched += 1
+            logger.info(f"Prefetched purchase history for: {key}")
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.warning(f"Prefetch failed for {key}: {e}")
+
+    async def _run(self, text: str) -> None:
+        try:
+            keys = await self.extract(text)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.warning(f"Prefetch key extraction failed: {e}")
+            return
+        await asyncio.gather(*(self._fetch(key) for key in keys))
+
+    async def drain(self) -> None:
+        """
+        Wait for every prefetch started on this loop to finish.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            tasks = [task for task in self._tasks if task.get_loop() is loop]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "scheduled": self.scheduled,
+                "fetched": self.fetched,
+                "failed": self.failed,
+                "in_flight": len(self._tasks),
+            }
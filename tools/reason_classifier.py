@@ -0,0 +1,129 @@
+import os
+import re
+import threading
+from re import Pattern
+
+REASON_CODES = ("DAMAGED", "LOST", "LATE", "OTHER")
+
+# (pattern, weight) per reason code; weights near 1.0 are unambiguous phrases
+LEXICON: dict[str, list[tuple[str, float]]] = {
+    "DAMAGED": [
+        (r"damag\w*", 1.0),
+        (r"broke\w*", 1.0),
+        (r"crush\w*", 1.0),
+        (r"smash\w*", 1.0),
+        (r"shatter\w*", 1.0),
+        (r"melt\w*", 1.0),
+        (r"torn|ripped", 0.9),
+        (r"leak\w*", 0.9),
+        (r"dent\w*", 0.8),
+        (r"(?:was|came|arrived) opened|already open", 0.9),
+    ],
+    "LOST": [
+        (r"never (?:arrived|came|showed up|got (?:it|here)|received|delivered)", 1.0),
+        (
+            r"(?:did ?n[o']t|has ?n[o']t|have ?n[o']t) (?:arrive|come|receive|get)\w*",
+            1.0,
+        ),
+        (r"not (?:been )?(?:arrived|delivered|received)", 1.0),
+        (r"lost", 1.0),
+        (r"(?:package|parcel|order|box|delivery) (?:is|was|went) missing", 1.0),
+        # "one item is missing from the box" is a short shipment, not a lost one
+        (r"missing", 0.6),
+        (r"stolen", 0.9),
+    ],
+    "LATE": [
+        (r"late", 1.0),
+        (r"delay\w*", 1.0),
+        (r"took (?:too|so) long", 1.0),
+        (r"arrived after", 0.9),
+        (r"behind schedule", 0.9),
+    ],
+    "OTHER": [
+        (r"taste\w*|tasting|tasty", 1.0),
+        (r"gross", 1.0),
+        (r"(?:did ?n[o']t|do ?n[o']t) (?:like|want)", 1.0),
+        (r"changed? my mind", 1.0),
+        (r"wrong (?:flavou?r|item|size|colou?r)", 0.9),
+    ],
+}
+
+_NEGATION = re.compile(r"\b(?:not|no|never|isn'?t|wasn'?t|without)\s+(?:\w+\s+)?$")
+
+COMPILED: dict[str, list[tuple[Pattern[str], float]]] = {
+    code: [
+        (re.compile(rf"\b(?:{pattern})\b", re.IGNORECASE), weight)
+        for pattern, weight in patterns
+    ]
+    for code, patterns in LEXICON.items()
+}
+
+
+class ReasonClassifier:
+    """
+    Maps free-text refund reasons to DAMAGED / LOST / LATE / OTHER locally.
+
+    Confidence is the best pattern weight for the winning code, scaled down by
+    how much evidence points at other codes; text that matches nothing is
+    OTHER with confidence 0. Counts how often callers could skip the LLM.
+    """
+
+    def __init__(self, threshold: float = 0.8):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.classified = 0
+        self.fast_path = 0
+
+    def classify(self, text: str) -> tuple[str, float]:
+        """
+        Classify a refund reason.
+
+        Args:
+            text: The customer's stated reason, or a reason code
+
+        Returns:
+            (reason_code, confidence between 0 and 1)
+        """
+        normalized = text.strip().upper().replace(" ", "_")
+        if normalized in REASON_CODES or normalized == "NEVER_ARRIVED":
+            return ("LOST" if normalized == "NEVER_ARRIVED" else normalized), 1.0
+
+        scores: dict[str, float] = {}
+        for code, patterns in COMPILED.items():
+            for pattern, weight in patterns:
+                for match in pattern.finditer(text):
+                    # "not damaged" is not evidence for DAMAGED
+                    if _NEGATION.search(text[: match.start()]):
+                        continue
+                    scores[code] = max(scores.get(code, 0.0), weight)
+        if not scores:
+            return "OTHER", 0.0
+        code = max(scores, key=lambda c: scores[c])
+        total = sum(scores.values())
+        return code, round(scores[code] * scores[code] / total, 4)
+
+    def is_confident(self, confidence: float) -> bool:
+        return confidence >= self.threshold
+
+    def record(self, fast_path: bool) -> None:
+        """
+        Count one classification request and whether it skipped the LLM.
+        """
+        with self._lock:
+            self.classified += 1
+            self.fast_path += fast_path
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            return {
+                "classified": self.classified,
+                "fast_path": self.fast_path,
+                "fast_path_rate": self.fast_path / self.classified
+                if self.classified
+                else 0.0,
+            }
+
+
+reason_classifier = ReasonClassifier(
+    float(os.getenv("REASON_CLASSIFIER_THRESHOLD", "0.8"))
+)
@@ -0,0 +1,110 @@
+import json
+from collections.abc import Iterable
+from typing import Any, NamedTuple
+
+# Rough characters-per-token ratio for Gemini on JSON payloads
+CHARS_PER_TOKEN = 4
+
+
+class Item(NamedTuple):
+    product_name: str
+    quantity: int
+    price: float
+
+
+class Order(NamedTuple):
+    """
+    One purchase with its line items packed into a tuple.
+
+    The store returns one row per line item with every order column repeated;
+    grouping them into tuples keeps each order column stored once.
+    """
+
+    order_id: str
+    customer_name: str
+    date: str | None
+    shipping_method: str | None
+    total_amount: float | None
+    customer_email_id: str | None
+    items: tuple[Item, ...]
+
+
+def group_orders(rows: Iterable[dict[str, Any]]) -> tuple[Order, ...]:
+    """
+    Collapse flattened line-item rows into one Order per order_id.
+
+    Args:
+        rows: Line-item records as returned by a PurchaseStore
+
+    Returns:
+        Orders in the order they first appear in `rows`
+    """
+    heads: dict[str, dict[str, Any]] = {}
+    items: dict[str, list[Item]] = {}
+    for row in rows:
+        order_id = row["order_id"]
+        if order_id not in heads:
+            heads[order_id] = row
+            items[order_id] = []
+        items[order_id].append(Item(row["product_name"], row["quantity"], row["price"]))
+    return tuple(
+        Order(
+            order_id=order_id,
+            customer_name=head["customer_name"],
+            date=head.get("date"),
+            shipping_method=head.get("shipping_method"),
+            total_amount=head.get("total_amount"),
+            customer_email_id=head.get("customer_email_id"),
+            items=tuple(items[order_id]),
+        )
+        for order_id, head in heads.items()
+    )
+
+
+def order_to_dict(order: Order) -> dict[str, Any]:
+    """
+    Compact dict form of an order; items become [product_name, quantity, price].
+    """
+    record = order._asdict()
+    record["items"] = [list(item) for item in order.items]
+    return record
+
+
+def estimate_tokens(payload: Any) -> int:
+    """
+    Approximate the prompt tokens a JSON-serializable payload will cost.
+    """
+    text = (
+        payload
+        if isinstance(payload, str)
+        else json.dumps(payload, separators=(",", ":"))
+    )
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def orders_to_state(
+    orders: Iterable[Order], max_tokens: int | None = None
+) -> list[dict[str, Any]]:
+    """
+    Convert orders to compact dicts, keeping as many as fit in `max_tokens`.
+
+    Orders are taken in the given sequence (most recent first from the store),
+    so the oldest orders are the ones dropped when over budget.
+
+    Args:
+        orders: Orders to serialize
+        max_tokens: Approximate token budget for the result (no cap if None)
+
+    Returns:
+        List of compact order dicts
+    """
+    records: list[dict[str, Any]] = []
+    used = 0
+    for order in orders:
+        record = order_to_dict(order)
+        cost = estimate_tokens(record)
+        if max_tokens is not None and records and used + cost > max_tokens:
+            break
+        records.append(record)
+        used += cost
+    return records
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " .,!?;:'\"`"
+
+
+def normalize_text(text: str) -> str:
+    """
+    Fold case, collapse whitespace and trim edge punctuation.
+
+    "My package was DAMAGED!! " and "my package was damaged" normalize to the
+    same string, so common re-phrasings share a cache entry.
+    """
+    return _WHITESPACE.sub(" ", text.casefold()).strip(_EDGE_PUNCTUATION)
+
+
+def cache_key(*parts: Any) -> str:
+    """
+    Stable digest of JSON-serializable parts, used as a response cache key.
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe cache of serialized model responses bounded by total bytes.
+
+    Entries expire `ttl` seconds after they were stored; when adding an entry
+    would exceed `max_bytes`, least recently used entries are evicted first.
+    With `path` set, entries are written through to a SQLite file and loaded
+    back on start, so repeated runs reuse earlier responses. Expiry uses wall
+    clock time because persisted entries outlive the process.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float = 3600.0,
+        path: str | None = None,
+    ):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be a positive integer")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self._open(path)
+
+    def _open(self, path: str) -> None:
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS model_responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        now = time.time()
+        self._conn.execute("DELETE FROM model_responses WHERE expires_at <= ?", (now,))
+        rows = self._conn.execute(
+            "SELECT key, value, expires_at FROM model_responses ORDER BY expires_at"
+        ).fetchall()
+        with self._lock:
+            for key, value, expires_at in rows:
+                self._store(key, value, expires_at)
+        logger.info(f"Loaded {len(self._data)} cached model response(s) from {path}")
+
+    @staticmethod
+    def _size(key: str, value: str) -> int:
+        return len(key) + len(value.encode("utf-8"))
+
+    def _drop(self, key: str) -> None:
+        _, value = self._data.pop(key)
+        self._bytes -= self._size(key, value)
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM model_responses WHERE key = ?", (key,))
+
+    def _store(self, key: str, value: str, expires_at: float) -> bool:
+        size = self._size(key, value)
+        if size > self.max_bytes:
+            return False
+        if key in self._data:
+            self._drop(key)
+        while self._bytes + size > self.max_bytes:
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+        self._data[key] = (expires_at, value)
+        self._bytes += size
+        return True
+
+    def get(self, key: str) -> str | None:
+        """
+        Return the cached value for `key`, or None if missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> bool:
+        """
+        Store `value` under `key`, evicting least recently used entries to fit.
+
+        Returns False if the value alone is larger than `max_bytes`.
+        """
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            if not self._store(key, value, expires_at):
+                return False
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO model_responses (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM model_responses")
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, float | None]:
+        """
+        Snapshot of the cache counters, suitable for logging.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> ResponseCache:
+    """
+    Build the process-wide model response cache from the environment.
+
+    LLM_RESPONSE_CACHE_PATH enables on-disk persistence (memory only when
+    unset); LLM_RESPONSE_CACHE_MAX_BYTES and LLM_RESPONSE_CACHE_TTL bound it.
+    """
+    return ResponseCache(
+        max_bytes=int(os.getenv("LLM_RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+        ttl=float(os.getenv("LLM_RESPONSE_CACHE_TTL", "3600")),
+        path=os.getenv("LLM_RESPONSE_CACHE_PATH") or None,
+    )
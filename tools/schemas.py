@@ -0,0 +1,63 @@
+"""
+Typed records the refund agents hand to each other through session state.
+
+Each model is stored with `.model_dump()` under the state key named in its
+docstring, so later prompts see compact JSON and code reads fields instead
+of parsing prose or bare "true"/"false" strings.
+"""
+
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field
+
+RefundStatus = Literal["REFUNDED", "ALREADY_REFUNDED", "FAILED"]
+
+
+class PurchaseHistory(BaseModel):
+    """
+    State key `purchase_history`: the orders found for one lookup.
+    """
+
+    purchaser: str = Field(description="Customer name or order ID that was looked up")
+    orders: list[dict[str, Any]] = Field(
+        default_factory=list,
+        description="Compact order records, items as [product_name, quantity, price]",
+    )
+
+    def shipping_method(self) -> str | None:
+        """
+        The one shipping method across the orders, or None if absent or mixed.
+        """
+        methods = {
+            str(order.get("shipping_method") or "").upper() for order in self.orders
+        }
+        methods.discard("")
+        return methods.pop() if len(methods) == 1 else None
+
+    def latest(self) -> dict[str, Any] | None:
+        """
+        The most recent order, which a refund defaults to.
+        """
+        return self.orders[0] if self.orders else None
+
+
+class EligibilityDecision(BaseModel):
+    """
+    State key `is_refund_eligible`: the policy decision for a refund request.
+    """
+
+    reason_code: str = Field(description="DAMAGED, LOST, LATE or OTHER")
+    shipping_method: str
+    eligible: bool
+
+
+class RefundConfirmation(BaseModel):
+    """
+    State key `refund_confirmation_message`: the result of issuing a refund.
+    """
+
+    status: RefundStatus
+    order_id: str
+    amount: float
+    refund_id: str | None = None
+    message: str = Field(description="Customer-facing confirmation text")
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+
+class _Call:
+    __slots__ = ("error", "event", "result")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one underlying call.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight wait for and share its result (or exception). Works for threads via
+    `do` and for asyncio callers via `do_async`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._tasks: dict[tuple[int, Hashable], asyncio.Future[Any]] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run `fn()` unless a call for `key` is already in flight, then share it.
+        """
+        with self._lock:
+            existing = self._calls.get(key)
+            leader = existing is None
+            if existing is None:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                call = existing
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await `fn()` unless a call for `key` is already in flight on this loop.
+
+        A waiter being cancelled does not cancel the shared call for the others.
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
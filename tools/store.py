@@ -0,0 +1,481 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import date
+from functools import lru_cache
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+PURCHASE_TABLE = "refund_db.new_purchase_history"
+
+
+class PurchaseStore(ABC):
+    """
+    Read interface over the purchase history table.
+
+    Every implementation returns the same flattened shape: one dict per line
+    item carrying the order columns alongside the item columns, most recent
+    orders first.
+    """
+
+    @abstractmethod
+    def iter_purchase_history(
+        self, purchaser: str, max_rows: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Stream line items for customers whose name contains `purchaser`.
+
+        Args:
+            purchaser: Normalized (stripped, lower-cased) customer name fragment
+            max_rows: Stop after this many line items (no cap if None)
+
+        Yields:
+            Line-item records containing order details
+        """
+
+    def get_purchase_history(
+        self, purchaser: str, max_rows: int | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Retrieve up to `max_rows` line items for customers matching `purchaser`.
+        """
+        return list(self.iter_purchase_history(purchaser, max_rows))
+
+    @abstractmethod
+    def iter_order_history(
+        self, order_id: str, max_rows: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Stream the line items of a single order using an exact order_id match.
+
+        Args:
+            order_id: Full order ID, e.g. "SG002-20250610"
+            max_rows: Stop after this many line items (no cap if None)
+
+        Yields:
+            Line-item records containing order details
+        """
+
+    def get_order_history(
+        self, order_id: str, max_rows: int | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Retrieve up to `max_rows` line items of the order `order_id`.
+        """
+        return list(self.iter_order_history(order_id, max_rows))
+
+    @abstractmethod
+    def iter_customer_history(
+        self, customer_name: str, max_rows: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Stream line items for exactly one customer (case-insensitive match).
+
+        Args:
+            customer_name: Full customer name, e.g. as resolved by the name index
+            max_rows: Stop after this many line items (no cap if None)
+
+        Yields:
+            Line-item records containing order details
+        """
+
+    def get_customer_history(
+        self, customer_name: str, max_rows: int | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Retrieve up to `max_rows` line items of the customer `customer_name`.
+        """
+        return list(self.iter_customer_history(customer_name, max_rows))
+
+    @abstractmethod
+    def iter_batch_history(
+        self, customer_names: Sequence[str], order_ids: Sequence[str]
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Stream line items for many customers and orders with a single query.
+
+        Args:
+            customer_names: Full customer names, matched case-insensitively
+            order_ids: Exact order IDs
+
+        Yields:
+            Line-item records of every matching customer or order, most
+            recent orders first
+        """
+
+    @abstractmethod
+    def iter_customer_names(self) -> Iterator[str]:
+        """
+        Yield each distinct customer name once.
+        """
+
+    @abstractmethod
+    def iter_orders(self) -> Iterator[dict[str, Any]]:
+        """
+        Yield every order as a nested record with an `items` list.
+        """
+
+
+class BigQueryPurchaseStore(PurchaseStore):
+    """
+    Purchase history served from the `refund_db.new_purchase_history` table.
+
+    Queries use a fixed text with named parameters so repeated lookups can be
+    answered from BigQuery's result cache, and results are paged rather than
+    materialized in one go.
+
+    Order lookups filter on `order_id = @order_id`; with the table clustered on
+    order_id (`CREATE TABLE ... CLUSTER BY order_id`) BigQuery prunes blocks
+    instead of scanning the whole table.
+    """
+
+    LINE_ITEM_QUERY = """
+        SELECT
+            customer_name,
+            order_id,
+            date,
+            item.product_name,
+            item.quantity,
+            item.price,
+            shipping_method,
+            total_amount,
+            customer_email_id
+        FROM
+            `{table}`,
+            UNNEST(items) AS item
+        WHERE
+          {where}
+        ORDER BY date DESC, order_id
+    """
+
+    def __init__(
+        self,
+        project: str | None = None,
+        table: str = PURCHASE_TABLE,
+        maximum_bytes_billed: int | None = None,
+        page_size: int = 100,
+    ):
+        from google.cloud import bigquery
+
+        self._bigquery = bigquery
+        self.client = bigquery.Client(project=project)
+        self.table = f"{self.client.project}.{table}"
+        self.maximum_bytes_billed = maximum_bytes_billed
+        self.page_size = page_size
+        self._history_query = self._line_item_query(
+            "LOWER(customer_name) LIKE CONCAT('%', @purchaser, '%')"
+        )
+        self._order_query = self._line_item_query("order_id = @order_id")
+        self._customer_query = self._line_item_query(
+            "LOWER(customer_name) = @customer_name"
+        )
+        self._batch_query = self._line_item_query(
+            "LOWER(customer_name) IN UNNEST(@customer_names)"
+            " OR order_id IN UNNEST(@order_ids)"
+        )
+
+    def _line_item_query(self, where: str) -> str:
+        return self.LINE_ITEM_QUERY.format(table=self.table, where=where)
+
+    def _job_config(self, parameters: list[Any]) -> Any:
+        return self._bigquery.QueryJobConfig(
+            query_parameters=parameters,
+            use_query_cache=True,
+            maximum_bytes_billed=self.maximum_bytes_billed,
+        )
+
+    def _iter_rows(
+        self, query: str, parameters: list[Any], max_rows: int | None
+    ) -> Iterator[dict[str, Any]]:
+        query_job = self.client.query(query, job_config=self._job_config(parameters))
+        rows = query_job.result(page_size=self.page_size, max_results=max_rows)
+        for row in rows:
+            row_dict = dict(row)
+            # Convert date to string if it's a date object
+            if isinstance(row_dict.get("date"), date):
+                row_dict["date"] = row_dict["date"].isoformat()
+            yield row_dict
+
+    def _string_param(self, name: str, value: str) -> Any:
+        return self._bigquery.ScalarQueryParameter(name, "STRING", value)
+
+    def iter_purchase_history(
+        self, purchaser: str, max_rows: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        return self._iter_rows(
+            self._history_query, [self._string_param("purchaser", purchaser)], max_rows
+        )
+
+    def iter_order_history(
+        self, order_id: str, max_rows: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        return self._iter_rows(
+            self._order_query, [self._string_param("order_id", order_id)], max_rows
+        )
+
+    def iter_customer_history(
+        self, customer_name: str, max_rows: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        return self._iter_rows(
+            self._customer_query,
+            [self._string_param("customer_name", customer_name.lower())],
+            max_rows,
+        )
+
+    def iter_batch_history(
+        self, customer_names: Sequence[str], order_ids: Sequence[str]
+    ) -> Iterator[dict[str, Any]]:
+        parameters = [
+            self._bigquery.ArrayQueryParameter(
+                "customer_names", "STRING", [name.lower() for name in customer_names]
+            ),
+            self._bigquery.ArrayQueryParameter("order_ids", "STRING", list(order_ids)),
+        ]
+        return self._iter_rows(self._batch_query, parameters, None)
+
+    def iter_customer_names(self) -> Iterator[str]:
+        query_job = self.client.query(
+            f"SELECT DISTINCT customer_name FROM `{self.table}`",
+            job_config=self._job_config([]),
+        )
+        for row in query_job.result(page_size=self.page_size):
+            yield row["customer_name"]
+
+    def iter_orders(self) -> Iterator[dict[str, Any]]:
+        query_job = self.client.query(
+            f"SELECT * FROM `{self.table}`", job_config=self._job_config([])
+        )
+        for row in query_job.result(page_size=self.page_size):
+            order = dict(row)
+            if isinstance(order.get("date"), date):
+                order["date"] = order["date"].isoformat()
+            order["items"] = [dict(item) for item in order.get("items") or []]
+            yield order
+
+
+class SQLitePurchaseStore(PurchaseStore):
+    """
+    Embedded purchase history store backed by a local SQLite file.
+
+    Orders and line items live in separate tables, indexed on the lower-cased
+    customer name and on order_id, so lookups stay local to the agent process.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id TEXT PRIMARY KEY,
+            customer_name TEXT NOT NULL,
+            customer_name_lower TEXT NOT NULL,
+            date TEXT,
+            shipping_method TEXT,
+            total_amount REAL,
+            customer_email_id TEXT
+        );
+        CREATE TABLE IF NOT EXISTS order_items (
+            order_id TEXT NOT NULL REFERENCES orders(order_id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            product_name TEXT,
+            quantity INTEGER,
+            price REAL,
+            PRIMARY KEY (order_id, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_orders_customer_name
+            ON orders(customer_name_lower);
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA foreign_keys = ON")
+            self._conn.executescript(self.SCHEMA)
+
+    def load_orders(self, orders: Iterable[dict[str, Any]]) -> int:
+        """
+        Insert or replace nested order records (as yielded by `iter_orders`).
+
+        Args:
+            orders: Order records with an `items` list of line items
+
+        Returns:
+            Number of orders written
+        """
+        count = 0
+        with self._lock, self._conn:
+            for order in orders:
+                self._conn.execute(
+                    "DELETE FROM order_items WHERE order_id = ?", (order["order_id"],)
+                )
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        order["order_id"],
+                        order["customer_name"],
+                        order["customer_name"].lower(),
+                        str(order.get("date")) if order.get("date") else None,
+                        order.get("shipping_method"),
+                        order.get("total_amount"),
+                        order.get("customer_email_id"),
+                    ),
+                )
+                self._conn.executemany(
+                    "INSERT INTO order_items VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            order["order_id"],
+                            position,
+                            item.get("product_name"),
+                            item.get("quantity"),
+                            item.get("price"),
+                        )
+                        for position, item in enumerate(order.get("items") or [])
+                    ],
+                )
+                count += 1
+        return count
+
+    LINE_ITEM_QUERY = """
+        SELECT
+            o.customer_name,
+            o.order_id,
+            o.date,
+            i.product_name,
+            i.quantity,
+            i.price,
+            o.shipping_method,
+            o.total_amount,
+            o.customer_email_id
+        FROM orders AS o
+        JOIN order_items AS i ON i.order_id = o.order_id
+        WHERE {where}
+        ORDER BY o.date DESC, o.order_id, i.position
+        LIMIT ?
+    """
+
+    def _iter_rows(
+        self, where: str, params: Sequence[Any], max_rows: int | None
+    ) -> Iterator[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                self.LINE_ITEM_QUERY.format(where=where),
+                (*params, -1 if max_rows is None else max_rows),
+            ).fetchall()
+        for row in rows:
+            yield dict(row)
+
+    def iter_purchase_history(
+        self, purchaser: str, max_rows: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        pattern = (
+            "%"
+            + purchaser.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            + "%"
+        )
+        return self._iter_rows(
+            "o.customer_name_lower LIKE ? ESCAPE '\\'", (pattern,), max_rows
+        )
+
+    def iter_order_history(
+        self, order_id: str, max_rows: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        # order_id is the primary key, so this is a single index probe
+        return self._iter_rows("o.order_id = ?", (order_id,), max_rows)
+
+    def iter_customer_history(
+        self, customer_name: str, max_rows: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        return self._iter_rows(
+            "o.customer_name_lower = ?", (customer_name.lower(),), max_rows
+        )
+
+    def iter_batch_history(
+        self, customer_names: Sequence[str], order_ids: Sequence[str]
+    ) -> Iterator[dict[str, Any]]:
+        # json_each keeps this a single statement however many keys are passed
+        return self._iter_rows(
+            "o.customer_name_lower IN (SELECT value FROM json_each(?))"
+            " OR o.order_id IN (SELECT value FROM json_each(?))",
+            (
+                json.dumps([name.lower() for name in customer_names]),
+                json.dumps(list(order_ids)),
+            ),
+            None,
+        )
+
+    def iter_customer_names(self) -> Iterator[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT customer_name FROM orders ORDER BY customer_name"
+            ).fetchall()
+        for row in rows:
+            yield row["customer_name"]
+
+    def iter_orders(self) -> Iterator[dict[str, Any]]:
+        with self._lock:
+            orders = self._conn.execute(
+                """
+                SELECT order_id, customer_name, date, shipping_method,
+                       total_amount, customer_email_id
+                FROM orders ORDER BY order_id
+                """
+            ).fetchall()
+            items = self._conn.execute(
+                """
+                SELECT order_id, product_name, quantity, price
+                FROM order_items ORDER BY order_id, position
+                """
+            ).fetchall()
+        items_by_order: dict[str, list[dict[str, Any]]] = {}
+        for item in items:
+            item_dict = dict(item)
+            items_by_order.setdefault(item_dict.pop("order_id"), []).append(item_dict)
+        for order in orders:
+            order_dict = dict(order)
+            order_dict["items"] = items_by_order.get(order_dict["order_id"], [])
+            yield order_dict
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+@lru_cache(maxsize=1)
+def get_purchase_store() -> PurchaseStore:
+    """
+    Build the process-wide purchase store selected by the PURCHASE_STORE env var.
+
+    PURCHASE_STORE is either "bigquery" (default) or "sqlite"; the SQLite file
+    location comes from PURCHASE_STORE_PATH.
+    """
+    backend = os.getenv("PURCHASE_STORE", "bigquery").strip().lower()
+    if backend == "bigquery":
+        max_bytes = os.getenv("PURCHASE_QUERY_MAX_BYTES_BILLED", str(10**9))
+        return BigQueryPurchaseStore(
+            project=os.getenv("GOOGLE_CLOUD_PROJECT"),
+            maximum_bytes_billed=int(max_bytes) if max_bytes else None,
+        )
+    if backend == "sqlite":
+        path = os.getenv("PURCHASE_STORE_PATH", "purchase_history.db")
+        logger.info(f"Using local SQLite purchase store at {path}")
+        return SQLitePurchaseStore(path)
+    raise ValueError(f"Unknown PURCHASE_STORE backend: {backend}")
+
+
+if __name__ == "__main__":
+    # Snapshot the BigQuery table into a local SQLite file:
+    #   python -m tools.store purchase_history.db
+    import sys
+
+    target = sys.argv[1] if len(sys.argv) > 1 else "purchase_history.db"
+    source = BigQueryPurchaseStore(project=os.getenv("GOOGLE_CLOUD_PROJECT"))
+    written = SQLitePurchaseStore(target).load_orders(source.iter_orders())
+    print(f"Copied {written} orders from {source.table} into {target}")
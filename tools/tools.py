@@ -1,14 +1,21 @@
 import logging
-from typing import List, Dict, Any
-from googleapiclient.discovery import build
-from google.oauth2.service_account import Credentials
-import base64
-from email.mime.text import MIMEText
-import google.auth
-from google.cloud import bigquery
 import os
-from datetime import date
-
+import re
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from tools.cache import TTLCache
+from tools.gmail import gmail_client
+from tools.ledger import get_refund_ledger
+from tools.name_index import NameIndex
+from tools.outbox import get_email_outbox
+from tools.policy import get_policy_store
+from tools.records import group_orders, orders_to_state
+from tools.schemas import RefundConfirmation
+from tools.singleflight import SingleFlight
+from tools.store import get_purchase_store
 
 # Configure logging
 logging.basicConfig(
@@ -18,190 +25,319 @@ logger = logging.getLogger(__name__)
 
 
 # Constants
-ELIGIBLE_SHIPPING_METHODS = ["INSURED"]
-ELIGIBLE_REASONS = ["DAMAGED", "NEVER_ARRIVED", "LOST"]
+# Cap on line items returned per lookup, keeps latency and prompt size bounded
+MAX_PURCHASE_HISTORY_ROWS = int(os.getenv("PURCHASE_HISTORY_MAX_ROWS", "50"))
+# Order IDs look like "SG002-20250610": customer initials, sequence, order date
+ORDER_ID_PATTERN = re.compile(r"\b[A-Za-z]{2,}\d+-\d{8}\b")
+# Candidate name words in a user message
+NAME_WORD_PATTERN = re.compile(r"\b[A-Za-z][A-Za-z'-]+\b")
+# Approximate prompt-token budget for the orders returned by one lookup
+PURCHASE_HISTORY_TOKEN_BUDGET = int(os.getenv("PURCHASE_HISTORY_TOKEN_BUDGET", "1500"))
+
+
+# Purchase history is read-mostly, so keep recent lookups in process and only
+# go back to the purchase store after the TTL expires or a refund invalidates the entry.
+# Keys are (kind, key, max_rows): "order" and "customer" entries hold exact
+# matches and are shared with get_purchase_histories, "fragment" entries hold
+# name-fragment matches, which an exact lookup must never be served from.
+purchase_history_cache = TTLCache(
+    maxsize=int(os.getenv("PURCHASE_HISTORY_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("PURCHASE_HISTORY_CACHE_TTL", "300")),
+)
+
+# Concurrent lookups for the same key share a single store query
+purchase_history_flight = SingleFlight()
+
+# Trigram index over customer names; new customers are picked up on refresh
+customer_index = NameIndex()
+CUSTOMER_INDEX_MAX_AGE = float(os.getenv("CUSTOMER_INDEX_MAX_AGE", "600"))
+# Seconds to wait after a failed customer name scan before trying again
+CUSTOMER_INDEX_RETRY_AFTER = float(os.getenv("CUSTOMER_INDEX_RETRY_AFTER", "30"))
+
+# Refreshes of an already loaded index run here, off the request path
+customer_index_refresher = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="customer-index"
+)
+customer_index_flight = SingleFlight()
+_customer_index_refresh: "Future[None] | None" = None
+_customer_index_refresh_lock = threading.Lock()
+
+
+def _load_customer_index() -> None:
+    if not customer_index.is_stale(CUSTOMER_INDEX_MAX_AGE, CUSTOMER_INDEX_RETRY_AFTER):
+        return
+    try:
+        added = customer_index.refresh(get_purchase_store().iter_customer_names)
+        logger.info(
+            f"Customer index refreshed, {added} new name(s), {len(customer_index)} total"
+        )
+    except Exception as e:
+        logger.error(
+            f"Error refreshing customer index, retrying in {CUSTOMER_INDEX_RETRY_AFTER:.0f}s: {e}"
+        )
 
-_, project_id = google.auth.default()
-google_cloud_project = os.getenv("GOOGLE_CLOUD_PROJECT")
-client = bigquery.Client(project=google_cloud_project)
 
-# # Construct the query
-# query = f"""
-#     SELECT * FROM `{client.project}.refund_db.new_purchase_history`
-# """
+def _refresh_customer_index() -> None:
+    """
+    Keep the customer index current without holding up lookups.
 
-def get_purchase_history(purchaser: str) -> List[Dict[str, Any]]:
+    The first load blocks, shared by concurrent callers; a stale index keeps
+    serving while it is refreshed in the background.
     """
-    Retrieve purchase history for a given customer/order ID.
+    global _customer_index_refresh
+    if not customer_index.is_stale(CUSTOMER_INDEX_MAX_AGE, CUSTOMER_INDEX_RETRY_AFTER):
+        return
+    if customer_index.refreshed_at is None:
+        customer_index_flight.do("refresh", _load_customer_index)
+        return
+    with _customer_index_refresh_lock:
+        if _customer_index_refresh is None or _customer_index_refresh.done():
+            _customer_index_refresh = customer_index_refresher.submit(
+                customer_index_flight.do, "refresh", _load_customer_index
+            )
+
+
+def find_customers(name: str) -> list[dict[str, Any]]:
+    """
+    Find customers whose name matches a (possibly partial or misspelled) name.
 
     Args:
-        purchaser: Customer name or order ID fragment
+        name: Customer name or name fragment
 
     Returns:
-        List of purchase records containing order details
+        Candidate customers with a match score between 0 and 1, best first
     """
-    purchaser = purchaser.strip().lower()
-    logger.info(f"Retrieving purchase history for: {purchaser}")
+    _refresh_customer_index()
+    candidates = customer_index.search(name)
+    logger.info(f"Found {len(candidates)} candidate customer(s) for: {name}")
+    return [
+        {"customer_name": customer_name, "score": score}
+        for customer_name, score in candidates
+    ]
 
-    query = f"""
-        SELECT
-            customer_name,
-            order_id,
-            date,
-            item.product_name,
-            item.quantity,
-            item.price,
-            shipping_method,
-            total_amount,
-            customer_email_id
-        FROM
-            `{client.project}.refund_db.new_purchase_history`,
-            UNNEST(items) AS item
-        WHERE
-          LOWER(customer_name) LIKE '%{purchaser}%'
-    """
 
-    try:
-        query_job = client.query(query)
-        results = query_job.result()
+def mentioned_purchasers(text: str, limit: int = 2) -> list[str]:
+    """
+    Order IDs and known customer names mentioned in free text.
 
-        
-        history = []
-        for row in results:
-            row_dict = dict(row)
-            # Convert date to string if it's a date object
-            if isinstance(row_dict.get("date"), date):
-                row_dict["date"] = row_dict["date"].isoformat()
-            history.append(row_dict)
+    A word only counts as a name if it is a whole word of an indexed customer
+    name, so "my" does not match "Mya". Names are returned as written, which
+    is how intake passes them on to `get_purchase_history`.
 
+    Args:
+        text: A user message
+        limit: Maximum number of purchasers to return
 
-        if history:
-            logger.info(f"Found {len(history)} purchase(s) for {purchaser}")
+    Returns:
+        Order IDs if any are present, otherwise matching customer names
+    """
+    order_ids = [order_id.upper() for order_id in ORDER_ID_PATTERN.findall(text)]
+    if order_ids:
+        return list(dict.fromkeys(order_ids))[:limit]
+
+    _refresh_customer_index()
+    names: dict[str, str] = {}
+    for word in NAME_WORD_PATTERN.findall(text):
+        key = word.lower()
+        if key in names:
+            continue
+        if any(
+            key in candidate.lower().split()
+            for candidate, _ in customer_index.search(key)
+        ):
+            names[key] = word
+            if len(names) >= limit:
+                break
+    return list(names.values())
+
+
+def _cached_lookup(
+    cache_key: tuple[str, str, int],
+    fetch: Callable[[], list[dict[str, Any]]],
+    label: str,
+) -> list[dict[str, Any]]:
+    cached = purchase_history_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Cache hit for purchase history of: {label}")
+        return orders_to_state(cached, PURCHASE_HISTORY_TOKEN_BUDGET)
+
+    def load() -> tuple[Any, ...]:
+        orders = group_orders(fetch())
+
+        if orders:
+            logger.info(f"Found {len(orders)} purchase(s) for {label}")
         else:
-            logger.warning(f"No purchase history found for: {purchaser}")
+            logger.warning(f"No purchase history found for: {label}")
+
+        purchase_history_cache.set(cache_key, orders)
+        return orders
 
-        return history
+    try:
+        orders = purchase_history_flight.do(cache_key, load)
+        return orders_to_state(orders, PURCHASE_HISTORY_TOKEN_BUDGET)
 
     except Exception as e:
         logger.error(f"Error retrieving purchase history: {e}")
         return []
 
 
-
+def get_purchase_history(
+    purchaser: str, max_rows: int = MAX_PURCHASE_HISTORY_ROWS
+) -> list[dict[str, Any]]:
     """
-    Retrieve purchase history for a given customer.
+    Retrieve purchase history for a given customer/order ID.
+
+    Inputs containing an order ID (e.g. "SG002-20250610") are resolved with an
+    exact order_id lookup. Names that resolve to a single customer through the
+    customer index are fetched by exact name; anything else is matched against
+    every customer name.
 
     Args:
-        purchaser: Customer name
+        purchaser: Customer name or order ID fragment
+        max_rows: Maximum number of line items to return, most recent first
 
     Returns:
-        List of purchase records containing order details
+        One record per order with its items packed as
+        [product_name, quantity, price] lists, most recent first
     """
-    # Mock database of purchase history
-    # Run the query
-    # query_job = client.query(query)
-    # results = query_job.result()
-    
-    # # Display results
-    # if results.total_rows > 0:
-    #     print(f"Found {results.total_rows} records in the purchase_history table:")
-    #     for row in results:
-    #         print(f"Customer ID: {row.user_id}, Date: {row.purchase_date}, Item: {row.item_name}, Amount: {row.price}")
-    # else:
-    #     print("No records found in the purchase_history table.")
-
-    # Run the query
-    query_job = client.query(query)
-    history_data = query_job.result()
-    print(history_data)
-    
-    # Display results
-    if history_data.total_rows > 0:
-        print(f"Found {history_data.total_rows} records in the purchase_history table:")
-        # for row in results:
-        #     print(f"Customer ID: {row.user_id}, Date: {row.purchase_date}, Item: {row.item_name}, Amount: {row.price}")
-            
-        # Convert results to JSON format
-        # json_rows = []
-        # for row in results:
-        #     json_rows.append({
-        #         "customer_name":row.customer_name,
-        #         "order_id": row.order_id,
-        #         "date": str(row.purchase_date),
-        #         "item_name": row.item_name,
-        #         "user_id": row.user_id,
-        #         "item_name": row.item_name,
-        #         "shipping_method": row.shipping_method,
-        #         "total_amount": row.total_amount,
-        #         "email_id": row.email_id
-        #     })
-    else:
-        print("No records found in the purchase_history table.")
-
-    # history_data = {
-    #     "Alexis": [
-    #         {
-    #             "order_id": "JD001-20250415",
-    #             "date": "2025-04-15",
-    #             "items": [
-    #                 {
-    #                     "product_name": "Assorted Taffy 1lb Box",
-    #                     "quantity": 1,
-    #                     "price": 15.00,
-    #                 },
-    #                 {
-    #                     "product_name": "Watermelon Taffy 0.5lb Bag",
-    #                     "quantity": 1,
-    #                     "price": 8.00,
-    #                 },
-    #             ],
-    #             "shipping_method": "STANDARD",
-    #             "total_amount": 23.00,
-    #         }
-    #     ],
-    #     "David": [
-    #         {
-    #             "order_id": "SG002-20250610",
-    #             "date": "2025-06-03",
-    #             "items": [
-    #                 {
-    #                     "product_name": "Peanut Butter Taffy 0.5lb Bag",
-    #                     "quantity": 1,
-    #                     "price": 8.00,
-    #                 },
-    #                 {
-    #                     "product_name": "Sour Apple Taffy 0.5lb Bag",
-    #                     "quantity": 1,
-    #                     "price": 8.00,
-    #                 },
-    #             ],
-    #             "shipping_method": "INSURED",
-    #             "total_amount": 16.00,
-    #         },
-    #     ],
-    # }
-
-    # Normalize purchaser name
-    purchaser = purchaser.strip().title()
+    store = get_purchase_store()
+
+    order_match = ORDER_ID_PATTERN.search(purchaser)
+    if order_match:
+        order_id = order_match.group(0).upper()
+        logger.info(f"Retrieving purchase history for order: {order_id}")
+        return _cached_lookup(
+            ("order", order_id, max_rows),
+            lambda: store.get_order_history(order_id, max_rows),
+            order_id,
+        )
 
+    purchaser = purchaser.strip().lower()
     logger.info(f"Retrieving purchase history for: {purchaser}")
 
-    if purchaser not in history_data:
-        logger.warning(f"No purchase history found for: {purchaser}")
-        return []
+    _refresh_customer_index()
+    customer_name = customer_index.resolve(purchaser)
+    if customer_name is not None:
+        return _cached_lookup(
+            ("customer", customer_name.lower(), max_rows),
+            lambda: store.get_customer_history(customer_name, max_rows),
+            customer_name,
+        )
+
+    # Unknown or ambiguous name: fall back to matching every customer name
+    return _cached_lookup(
+        ("fragment", purchaser, max_rows),
+        lambda: store.get_purchase_history(purchaser, max_rows),
+        purchaser,
+    )
+
+
+def get_purchase_histories(
+    purchasers: list[str], max_rows: int = MAX_PURCHASE_HISTORY_ROWS
+) -> dict[str, list[dict[str, Any]]]:
+    """
+    Retrieve purchase histories for many customers/order IDs with one query.
+
+    Names are matched exactly (case-insensitive) rather than as fragments.
+    Cached exact-match entries are reused and every fetched history is written
+    back to the purchase history cache, so later single lookups that resolve
+    to the same customer or order are served warm.
 
-    history = history_data[purchaser]
-    logger.info(f"Found {len(history)} purchase(s) for {purchaser}")
-    return history
+    Args:
+        purchasers: Full customer names and/or order IDs
+        max_rows: Maximum number of line items per customer/order
+
+    Returns:
+        Mapping of each input string to its order records, in the same
+        shape as `get_purchase_history`
+    """
+    keys: dict[str, tuple[str, str, int]] = {}
+    for purchaser in purchasers:
+        order_match = ORDER_ID_PATTERN.search(purchaser)
+        keys[purchaser] = (
+            ("order", order_match.group(0).upper(), max_rows)
+            if order_match
+            else ("customer", purchaser.strip().lower(), max_rows)
+        )
 
+    resolved: dict[tuple[str, str, int], Any] = {}
+    for cache_key in set(keys.values()):
+        cached = purchase_history_cache.get(cache_key)
+        if cached is not None:
+            resolved[cache_key] = cached
+    missing = set(keys.values()) - resolved.keys()
+    logger.info(
+        f"Batch purchase history lookup: {len(keys)} input(s), "
+        f"{len(resolved)} cached, {len(missing)} to fetch"
+    )
 
-def check_refund_eligibility(reason: str, shipping_method: str) -> bool:
+    if missing:
+        order_ids = [key for kind, key, _ in missing if kind == "order"]
+        customer_names = [key for kind, key, _ in missing if kind == "customer"]
+        rows_by_key: dict[tuple[str, str, int], list[dict[str, Any]]] = {
+            cache_key: [] for cache_key in missing
+        }
+        try:
+            for row in get_purchase_store().iter_batch_history(
+                customer_names, order_ids
+            ):
+                for cache_key in (
+                    ("order", row["order_id"], max_rows),
+                    ("customer", row["customer_name"].lower(), max_rows),
+                ):
+                    rows = rows_by_key.get(cache_key)
+                    if rows is not None and len(rows) < max_rows:
+                        rows.append(row)
+
+            for cache_key, rows in rows_by_key.items():
+                orders = group_orders(rows)
+                purchase_history_cache.set(cache_key, orders)
+                resolved[cache_key] = orders
+
+        except Exception as e:
+            logger.error(f"Error retrieving batch purchase history: {e}")
+            resolved.update((cache_key, ()) for cache_key in missing)
+
+    return {
+        purchaser: orders_to_state(resolved[cache_key], PURCHASE_HISTORY_TOKEN_BUDGET)
+        for purchaser, cache_key in keys.items()
+    }
+
+
+def invalidate_purchase_history(order_id: str) -> int:
     """
-    Check if a refund request is eligible based on reason and shipping method.
+    Drop cached purchase histories that contain the given order.
+
+    Args:
+        order_id: Order ID whose cached history is now stale
+
+    Returns:
+        Number of cache entries removed
+    """
+    removed = purchase_history_cache.invalidate_if(
+        lambda _, orders: any(order.order_id == order_id for order in orders)
+    )
+    logger.info(f"Invalidated {removed} cached purchase history entries for {order_id}")
+    return removed
+
+
+def check_refund_eligibility(
+    reason: str,
+    shipping_method: str,
+    amount: float = 0.0,
+    order_date: str = "",
+    customer_name: str = "",
+) -> bool:
+    """
+    Check if a refund request is eligible based on reason, shipping method,
+    the order's amount and date, and the customer's earlier refunds.
 
     Args:
         reason: Refund reason
         shipping_method: Shipping method used for the order
+        amount: Order total in dollars, or 0 if unknown
+        order_date: Order date as YYYY-MM-DD, or empty if unknown
+        customer_name: The order's customer_name, or empty if unknown
 
     Returns:
         True if refund is eligible, False otherwise
@@ -210,42 +346,113 @@ def check_refund_eligibility(reason: str, shipping_method: str) -> bool:
     shipping_upper = shipping_method.strip().upper()
 
     logger.info(
-        f"Checking refund eligibility - Reason: {reason_upper}, Shipping: {shipping_upper}"
+        f"Checking refund eligibility - Reason: {reason_upper}, Shipping: {shipping_upper}, "
+        f"Amount: {amount or 'unknown'}, Date: {order_date or 'unknown'}"
     )
 
-    # Check eligibility based on shipping method and reason
-    is_eligible = (
-        shipping_upper in ELIGIBLE_SHIPPING_METHODS and reason_upper in ELIGIBLE_REASONS
+    # Check eligibility against the (hot-reloadable) refund policy file;
+    # unknown amounts, dates and customers skip their limits, as in the batch engine
+    policy = get_policy_store().current()
+    prior_refunds = None
+    if policy.max_refunds_per_customer is not None and customer_name.strip():
+        prior_refunds = get_refund_ledger().refund_count(customer_name)
+    is_eligible = policy.evaluate(
+        reason_upper,
+        shipping_upper,
+        amount=amount or None,
+        order_date=order_date or None,
+        prior_refunds=prior_refunds,
     )
 
     logger.info(f"Refund eligibility result: {is_eligible}")
     return is_eligible
 
 
-def process_refund(amount: float, order_id: str) -> str:
+def process_refund(
+    amount: float, order_id: str, customer_name: str = ""
+) -> dict[str, Any]:
     """
     Process a refund for the given amount and order.
 
     Args:
         amount: Refund amount in dollars
         order_id: Order ID to refund
+        customer_name: The order's customer_name, counted towards their
+            refund limit
 
     Returns:
-        Success message with refund details
+        Refund status (REFUNDED, ALREADY_REFUNDED or FAILED), order ID,
+        amount, refund ID and a customer-facing message
     """
     logger.info(f"Processing refund - Order: {order_id}, Amount: ${amount:.2f}")
 
     # In a real system, this would interact with payment processors
     # For now, we'll simulate a successful refund
-    refund_id = f"REF-{order_id}-{int(amount*100)}"
+    refund_id = f"REF-{order_id}-{int(amount * 100)}"
+    try:
+        record, created = get_refund_ledger().record(
+            order_id, refund_id, amount, customer_name
+        )
+    except Exception as e:
+        logger.error(f"Error recording refund for {order_id}: {e}")
+        return RefundConfirmation(
+            status="FAILED",
+            order_id=order_id,
+            amount=amount,
+            message=f"Refund for order {order_id} could not be processed right now. Please try again later.",
+        ).model_dump()
+
+    if not created:
+        logger.warning(
+            f"Duplicate refund request for {order_id}, already refunded as {record.refund_id}"
+        )
+        return RefundConfirmation(
+            status="ALREADY_REFUNDED",
+            order_id=order_id,
+            amount=record.amount,
+            refund_id=record.refund_id,
+            message=f"Order {order_id} was already refunded ({record.refund_id}) for ${record.amount:.2f}. No new refund was issued.",
+        ).model_dump()
+
     logger.info(f"Refund processed successfully - Refund ID: {refund_id}")
 
-    return f"✅ Refund {refund_id} successful! We will credit ${amount:.2f} to your account within 2 business days."
+    invalidate_purchase_history(order_id)
 
+    return RefundConfirmation(
+        status="REFUNDED",
+        order_id=order_id,
+        amount=amount,
+        refund_id=refund_id,
+        message=f"✅ Refund {refund_id} successful! We will credit ${amount:.2f} to your account within 2 business days.",
+    ).model_dump()
 
 
-def send_email_tool(to: str, subject: str, body: str) -> str:
-    return send_email(to, subject, body)
+def send_email_tool(to: str, subject: str, body: str, refund_id: str = "") -> str:
+    """
+    Queue an email to a customer for background delivery.
+
+    Args:
+        to: Recipient email address
+        subject: Email subject line
+        body: Plain-text email body
+        refund_id: Refund ID the email confirms, if any; only one email is
+            sent per refund ID
+
+    Returns:
+        Confirmation that the email was queued, with its message key
+    """
+    logger.info(f"Queueing mail to {to}")
+    try:
+        key = get_email_outbox().enqueue(
+            to,
+            subject,
+            body,
+            idempotency_key=f"refund:{refund_id}" if refund_id else None,
+        )
+        return f"Email to {to} queued for delivery with ID: {key}"
+    except Exception as e:
+        logger.error(f"Error queueing email: {e}")
+        return f"Error occurred in sending mail to {to}"
 
 
 # def send_email(to: str, subject: str, body: str) -> str:
@@ -261,24 +468,12 @@ def send_email_tool(to: str, subject: str, body: str) -> str:
 #     sent = service.users().messages().send(userId="me", body=message_body).execute()
 #     return f"Email sent to {to} with ID: {sent['id']}"
 
+
 def send_email(to: str, subject: str, body: str) -> str:
     logger.info(f"Going to send mail to {to}")
     try:
-        impersonated_user = "krishnendud@gmail.com"
-        creds = Credentials.from_service_account_file("/home/student_00_8e26a808a0c5/tools/service-account.json", 
-                scopes=["https://www.googleapis.com/auth/gmail.send"],                
-                subject=impersonated_user
-        )
-        service = build("gmail", "v1", credentials=creds)
-
-        message = MIMEText(body)
-        message["to"] = to
-        message["subject"] = subject
-        raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        message_body = {"raw": raw}
-
-        sent = service.users().messages().send(userId="me", body=message_body).execute()
-        return f"Email sent to {to} with ID: {sent['id']}"
+        message_id = gmail_client.send(to, subject, body)
+        return f"Email sent to {to} with ID: {message_id}"
     except Exception as e:
         logger.error(f"Error sending email: {e}")
-        return f"Error occured in sending mail to {to}"
\ No newline at end of file
+        return f"Error occurred in sending mail to {to}"